@@ -41,95 +41,299 @@
 #
 
 
+import heapq
+import itertools
+import threading
 import time
+from collections import OrderedDict, deque
 from ipaddress import IPv4Address
 
 import loguru
 
 import ps_arp
 import stack
+from mac_address import MAC_BROADCAST, MAC_UNSPECIFIED
 
-ARP_ENTRY_MAX_AGE = 3600
-ARP_ENTRY_REFRESH_TIME = 300
+ARP_REACHABLE_TIME = 30  # Time neighbor is considered reachable after last reachability confirmation
+ARP_DELAY_FIRST_PROBE_TIME = 5  # Time upper layers have to confirm reachability of stale neighbor that is in use before it gets probed
+ARP_RETRANS_TIMER = 1  # Time between two consecutive ARP requests sent for the same neighbor
+ARP_MAX_MULTICAST_SOLICIT = 3  # Number of broadcast ARP requests sent while resolving neighbor before giving up
+ARP_MAX_UNICAST_SOLICIT = 3  # Number of unicast ARP requests sent while probing neighbor before giving up
+
+ARP_GC_STALE_TIME = 60  # Stale entries not used for that long may be garbage collected
+ARP_GC_THRESHOLD_SOFT = 512  # Cache size over which unused stale entries get garbage collected
+ARP_GC_THRESHOLD_HARD = 1024  # Cache size limit, least recently used entries get evicted to stay under it
+
+ARP_PENDING_QUEUE_LEN = 16  # Maximum number of packets held for single neighbor while its address is being resolved
+
+ARP_TIMER_INTERVAL = 100  # Interval in which expired entry timers are processed
 
 
 class ArpCache:
-    """ Support for ARP cache operations """
+    """ Support for ARP cache operations, entries follow RFC 4861 Neighbor Unreachability Detection state machine """
 
     class CacheEntry:
         """ Container class for cache entries """
 
-        def __init__(self, mac_address, permanent=False):
+        def __init__(self, mac_address=MAC_UNSPECIFIED, state="INCOMPLETE", permanent=False):
             self.mac_address = mac_address
+            self.state = state
             self.permanent = permanent
             self.creation_time = time.time()
+            self.confirmation_time = self.creation_time
+            self.used_time = self.creation_time
+            self.probe_count = 0
             self.hit_count = 0
+            self.timer = None  # Id of the only expiry heap event that is still valid for this entry
+            self.packets = deque(maxlen=ARP_PENDING_QUEUE_LEN) if state == "INCOMPLETE" else None  # Packets waiting for address to be resolved
+
+        def __str__(self):
+            """ Cache entry log string """
+
+            return f"{self.mac_address} {self.state}, age {time.time() - self.creation_time:.0f}s, hit_count {self.hit_count}"
 
     def __init__(self):
         """ Class constructor """
 
         stack.arp_cache = self
 
-        self.arp_cache = {}
+        self.arp_cache = OrderedDict()  # Kept in least recently used order
+        self.timers = []  # Expiry heap of (deadline, timer id, address) events, superseded events are skipped when popped
+        self.timer_ids = itertools.count()
+
+        self.lock = threading.RLock()
 
         self.logger = loguru.logger.bind(object_name="arp_cache.")
 
-        # Setup timer to execute ARP Cache maintainer every second
-        stack.stack_timer.register_method(method=self.maintain_cache, delay=1000)
+        # Setup timer to execute ARP Cache maintainer
+        stack.stack_timer.register_method(method=self.maintain_cache, delay=ARP_TIMER_INTERVAL)
 
         self.logger.debug("Started ARP cache")
 
     def maintain_cache(self):
-        """ Method responsible for maintaining ARP cache entries """
+        """ Method responsible for maintaining ARP cache entries, only entries whose timers expired are processed """
+
+        now = time.time()
+
+        with self.lock:
+            while self.timers and self.timers[0][0] <= now:
+                _, timer, ipv4_address = heapq.heappop(self.timers)
+
+                # Skip events that got superseded by state change after they had been scheduled
+                if not (cache_entry := self.arp_cache.get(ipv4_address)) or cache_entry.timer != timer:
+                    continue
+
+                cache_entry.timer = None
+                self.__expire_timer(ipv4_address, cache_entry, now)
+
+    def __expire_timer(self, ipv4_address, cache_entry, now):
+        """ Run state transition triggered by entry's timer """
+
+        # Keep on resolving neighbor till it answers or the request limit is reached
+        if cache_entry.state == "INCOMPLETE":
+            if cache_entry.probe_count < ARP_MAX_MULTICAST_SOLICIT:
+                self.__send_probe(ipv4_address, cache_entry)
+                return
+            self.__remove_entry(ipv4_address, "unable to resolve")
+            return
 
-        for ipv4_address in list(self.arp_cache):
+        # Reachability confirmations only record their time, so the entry is due to stay reachable if one arrived since its timer had been set
+        if cache_entry.state == "REACHABLE":
+            if now - cache_entry.confirmation_time < ARP_REACHABLE_TIME:
+                self.__schedule(ipv4_address, cache_entry, cache_entry.confirmation_time + ARP_REACHABLE_TIME - now)
+                return
 
-            # Skip permanent entries
-            if self.arp_cache[ipv4_address].permanent:
-                continue
+            # Entry that is still in use gets verified right away, otherwise flows using it are invalidated so their next packet goes through cache lookup
+            if cache_entry.hit_count or stack.flow_cache.next_hop_hit_count(ipv4_address):
+                cache_entry.hit_count = 0
+                self.__change_state(ipv4_address, cache_entry, "DELAY")
+                self.__schedule(ipv4_address, cache_entry, ARP_DELAY_FIRST_PROBE_TIME)
+                return
+            self.__change_state(ipv4_address, cache_entry, "STALE")
+            stack.flow_cache.invalidate_next_hop(ipv4_address)
+            return
 
-            # If entry age is over maximum age then discard the entry
-            if time.time() - self.arp_cache[ipv4_address].creation_time > ARP_ENTRY_MAX_AGE:
-                mac_address = self.arp_cache.pop(ipv4_address).mac_address
-                self.logger.debug(f"Discarded expired ARP cache entry - {ipv4_address} -> {mac_address}")
+        # Upper layers didn't confirm reachability in time, start probing neighbor directly
+        if cache_entry.state == "DELAY":
+            self.__change_state(ipv4_address, cache_entry, "PROBE")
+            cache_entry.probe_count = 0
+            self.__send_probe(ipv4_address, cache_entry)
+            return
 
-            # If entry age is close to maximum age but the entry has been used since last refresh then send out request in attempt to refresh it
-            elif (time.time() - self.arp_cache[ipv4_address].creation_time > ARP_ENTRY_MAX_AGE - ARP_ENTRY_REFRESH_TIME) and self.arp_cache[
-                ipv4_address
-            ].hit_count:
-                self.arp_cache[ipv4_address].hit_count = 0
-                self.__send_arp_request(ipv4_address)
-                self.logger.debug(f"Trying to refresh expiring ARP cache entry for {ipv4_address} -> {self.arp_cache[ipv4_address].mac_address}")
+        if cache_entry.state == "PROBE":
+            if cache_entry.probe_count < ARP_MAX_UNICAST_SOLICIT:
+                self.__send_probe(ipv4_address, cache_entry)
+                return
+            self.__remove_entry(ipv4_address, "neighbor unreachable")
+            return
 
-    def add_entry(self, ipv4_address, mac_address):
-        """ Add / refresh entry in cache """
+    def add_entry(self, ipv4_address, mac_address, confirmed=False):
+        """ Add / refresh entry in cache, confirmed means mapping came from reply to our own request """
 
-        self.arp_cache[ipv4_address] = self.CacheEntry(mac_address)
+        with self.lock:
+            cache_entry = self.arp_cache.get(ipv4_address)
+
+            if cache_entry and cache_entry.permanent:
+                return
+
+            if cache_entry is None:
+                self.__collect_garbage()
+                cache_entry = self.arp_cache[ipv4_address] = self.CacheEntry(mac_address, state="STALE")
+
+            mac_address_changed = cache_entry.state != "INCOMPLETE" and cache_entry.mac_address != mac_address
+
+            # Flows sent via this neighbor need to pick up its new MAC address
+            if mac_address_changed:
+                stack.flow_cache.invalidate_next_hop(ipv4_address)
+
+            cache_entry.mac_address = mac_address
+            self.arp_cache.move_to_end(ipv4_address)
+
+            # Reply to our request proves neighbor is reachable, unsolicited mapping is only good enough to be used and verified later
+            if confirmed:
+                cache_entry.confirmation_time = time.time()
+                if cache_entry.state != "REACHABLE":
+                    self.__change_state(ipv4_address, cache_entry, "REACHABLE")
+                    self.__schedule(ipv4_address, cache_entry, ARP_REACHABLE_TIME)
+            elif cache_entry.state == "INCOMPLETE" or mac_address_changed:
+                self.__change_state(ipv4_address, cache_entry, "STALE")
+                cache_entry.timer = None
+
+            packets, cache_entry.packets = cache_entry.packets, None
+
+        # Send out packets that have been waiting for this neighbor's address to be resolved
+        if packets:
+            self.logger.debug(f"Resolved {ipv4_address} -> {mac_address}, sending out {len(packets)} pending packet(s)")
+            for ether_packet_tx, urgent in packets:
+                ether_packet_tx.ether_dst = mac_address
+                stack.tx_ring.enqueue(ether_packet_tx, urgent=urgent)
 
     def find_entry(self, ipv4_address):
-        """ Find entry in cache and return MAC address """
+        """ Find entry in cache and return MAC address, start address resolution if there is none """
+
+        with self.lock:
+            if (cache_entry := self.arp_cache.get(ipv4_address)) is None:
+                self.logger.debug(f"Unable to find entry for {ipv4_address}")
+                self.__create_incomplete_entry(ipv4_address)
+                return None
+
+            if cache_entry.state == "INCOMPLETE":
+                return None
+
+            cache_entry.hit_count += 1
+            cache_entry.used_time = time.time()
+            self.arp_cache.move_to_end(ipv4_address)
+
+            # Stale entry is being used, give upper layers chance to confirm neighbor's reachability before probing it
+            if cache_entry.state == "STALE":
+                self.__change_state(ipv4_address, cache_entry, "DELAY")
+                self.__schedule(ipv4_address, cache_entry, ARP_DELAY_FIRST_PROBE_TIME)
 
-        if arp_entry := self.arp_cache.get(ipv4_address, None):
-            arp_entry.hit_count += 1
-            self.logger.debug(
-                f"Found {ipv4_address} -> {arp_entry.mac_address} entry, age {time.time() - arp_entry.creation_time:.0f}s, hit_count {arp_entry.hit_count}"
-            )
-            return arp_entry.mac_address
+        self.logger.debug(f"Found {ipv4_address} -> {cache_entry}")
+        return cache_entry.mac_address
 
-        self.logger.debug(f"Unable to find entry for {ipv4_address}, sending ARP request")
-        self.__send_arp_request(ipv4_address)
+    def confirm_reachability(self, ipv4_address):
+        """ Take reachability confirmation from upper layer protocol (eg. TCP ACK for new data) """
+
+        if not (cache_entry := self.arp_cache.get(ipv4_address)) or cache_entry.state == "INCOMPLETE" or cache_entry.permanent:
+            return
+
+        # Confirmation of reachable entry is just noted, its timer takes it into account when it expires
+        cache_entry.confirmation_time = time.time()
+
+        if cache_entry.state != "REACHABLE":
+            with self.lock:
+                self.__change_state(ipv4_address, cache_entry, "REACHABLE")
+                self.__schedule(ipv4_address, cache_entry, ARP_REACHABLE_TIME)
+
+    def hold_packet(self, ipv4_address, ether_packet_tx, urgent=False):
+        """ Hold packet till neighbor's address gets resolved, return MAC address if it has been resolved in the meantime """
+
+        with self.lock:
+            if (cache_entry := self.arp_cache.get(ipv4_address)) is None:
+                cache_entry = self.__create_incomplete_entry(ipv4_address)
+            elif cache_entry.state != "INCOMPLETE":
+                return cache_entry.mac_address
+            cache_entry.packets.append((ether_packet_tx, urgent))
+
+        self.logger.debug(f"{ether_packet_tx.tracker} - Holding packet till {ipv4_address} gets resolved, {len(cache_entry.packets)} packet(s) pending")
         return None
 
+    def __create_incomplete_entry(self, ipv4_address):
+        """ Create entry for neighbor that needs to be resolved and send out first ARP request """
+
+        self.__collect_garbage()
+        cache_entry = self.arp_cache[ipv4_address] = self.CacheEntry()
+        self.logger.debug(f"Created {ipv4_address} -> {cache_entry}")
+        self.__send_probe(ipv4_address, cache_entry)
+        return cache_entry
+
+    def __collect_garbage(self):
+        """ Make room for new entry, unused stale entries go once cache is over soft threshold, least recently used ones once it hits hard threshold """
+
+        if len(self.arp_cache) < ARP_GC_THRESHOLD_SOFT:
+            return
+
+        # Cache is kept in least recently used order so only its head needs to be looked at
+        now = time.time()
+        victims = []
+        for ipv4_address, cache_entry in self.arp_cache.items():
+            if len(self.arp_cache) - len(victims) < ARP_GC_THRESHOLD_SOFT or now - cache_entry.used_time < ARP_GC_STALE_TIME:
+                break
+            if cache_entry.state == "STALE" and not cache_entry.permanent:
+                victims.append(ipv4_address)
+
+        for ipv4_address in victims:
+            self.__remove_entry(ipv4_address, "garbage collected")
+
+        if len(self.arp_cache) < ARP_GC_THRESHOLD_HARD:
+            return
+
+        for ipv4_address, cache_entry in self.arp_cache.items():
+            if not cache_entry.permanent:
+                self.__remove_entry(ipv4_address, "evicted")
+                return
+
+    def __remove_entry(self, ipv4_address, reason):
+        """ Remove entry from cache along with packets that might be waiting for it """
+
+        cache_entry = self.arp_cache.pop(ipv4_address)
+        if cache_entry.state != "INCOMPLETE":
+            stack.flow_cache.invalidate_next_hop(ipv4_address)
+        self.logger.debug(
+            f"Removed {ipv4_address} -> {cache_entry}, {reason}" + (f", dropped {len(cache_entry.packets)} pending packet(s)" if cache_entry.packets else "")
+        )
+
+    def __change_state(self, ipv4_address, cache_entry, state):
+        """ Change entry's state """
+
+        self.logger.debug(f"{ipv4_address} -> {cache_entry.mac_address} state {cache_entry.state} -> {state}")
+        cache_entry.state = state
+
+    def __schedule(self, ipv4_address, cache_entry, delay):
+        """ Set entry's timer, timer set previously is superseded """
+
+        cache_entry.timer = next(self.timer_ids)
+        heapq.heappush(self.timers, (time.time() + delay, cache_entry.timer, ipv4_address))
+
+    def __send_probe(self, ipv4_address, cache_entry):
+        """ Send out ARP request for neighbor, broadcast one when resolving it and unicast one when probing it, then set retransmission timer """
+
+        cache_entry.probe_count += 1
+        self.logger.debug(f"Sending ARP request #{cache_entry.probe_count} for {ipv4_address}")
+        self.__schedule(ipv4_address, cache_entry, ARP_RETRANS_TIMER)
+        self.__send_arp_request(ipv4_address, MAC_BROADCAST if cache_entry.state == "INCOMPLETE" else cache_entry.mac_address)
+
     @staticmethod
-    def __send_arp_request(arp_tpa):
+    def __send_arp_request(arp_tpa, ether_dst=MAC_BROADCAST):
         """ Enqueue ARP request packet with TX ring """
 
         stack.packet_handler.phtx_arp(
             ether_src=stack.packet_handler.stack_mac_unicast[0],
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=ether_dst,
             arp_oper=ps_arp.ARP_OP_REQUEST,
             arp_sha=stack.packet_handler.stack_mac_unicast[0],
             arp_spa=stack.packet_handler.stack_ipv4_unicast[0] if stack.packet_handler.stack_ipv4_unicast else IPv4Address("0.0.0.0"),
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=arp_tpa,
         )
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# bench_ph_rx.py - tool used to measure cost of inbound packet address filtering and protocol dispatch
+#
+
+
+import sys
+import time
+from ipaddress import IPv4Address, IPv4Interface, IPv6Address
+
+import loguru
+
+import ps_arp
+import ps_ether
+import ps_icmpv4
+import ps_icmpv6
+import ps_ipv4
+import ps_ipv6
+import ps_tcp
+import ps_udp
+import stack
+from flow_cache import FlowCache
+from mac_address import MAC_BROADCAST, MacAddress
+from ph import PacketHandler
+from phrx_ipv4 import handle_ipv4_fragmentation
+
+PACKET_COUNT = 200000
+
+
+def create_frame(ip_packet):
+    """ Build Ethernet frame destined to the stack """
+
+    return bytes(ps_ether.EtherPacket(ether_src="02:00:00:77:77:01", ether_dst="02:00:00:77:77:77", child_packet=ip_packet).get_tx_buffer().data)
+
+
+def legacy_phrx_ether(self, ether_packet_rx):
+    """ Inbound Ethernet packet handling the way it was done before, new address set and if chain for each packet """
+
+    self.logger.debug(f"{ether_packet_rx.tracker} - {ether_packet_rx}")
+
+    if ether_packet_rx.ether_type < ps_ether.ETHER_TYPE_MIN:
+        return
+
+    if ether_packet_rx.ether_dst not in {*self.stack_mac_unicast, *self.stack_mac_multicast, *self.stack_mac_broadcast}:
+        return
+
+    if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_ARP and stack.ipv4_support:
+        self.phrx_arp(ether_packet_rx, ps_arp.ArpPacket(ether_packet_rx))
+        return
+
+    if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_IP4 and stack.ipv4_support:
+        legacy_phrx_ipv4(self, ps_ipv4.Ip4Packet(ether_packet_rx))
+        return
+
+    if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_IP6 and stack.ipv6_support:
+        legacy_phrx_ipv6(self, ps_ipv6.Ip6Packet(ether_packet_rx))
+        return
+
+
+def legacy_phrx_ipv4(self, ipv4_packet_rx):
+    """ Inbound IPv4 packet handling the way it was done before, new address set and if chain for each packet """
+
+    self.logger.debug(f"{ipv4_packet_rx.tracker} - {ipv4_packet_rx}")
+
+    if self.stack_ipv4_unicast and ipv4_packet_rx.ipv4_dst not in {*self.stack_ipv4_unicast, *self.stack_ipv4_multicast, *self.stack_ipv4_broadcast}:
+        return
+
+    if not ipv4_packet_rx.validate_cksum():
+        return
+
+    ipv4_packet_rx = handle_ipv4_fragmentation(ipv4_packet_rx)
+    if not ipv4_packet_rx:
+        return
+
+    if ipv4_packet_rx.ipv4_proto == ps_ipv4.IP4_PROTO_ICMP4:
+        self.phrx_icmpv4(ipv4_packet_rx, ps_icmpv4.Icmp4Packet(ipv4_packet_rx))
+        return
+
+    if ipv4_packet_rx.ipv4_proto == ps_ipv4.IP4_PROTO_UDP:
+        self.phrx_udp(ipv4_packet_rx, ps_udp.UdpPacket(ipv4_packet_rx))
+        return
+
+    if ipv4_packet_rx.ipv4_proto == ps_ipv4.IP4_PROTO_TCP:
+        self.phrx_tcp(ipv4_packet_rx, ps_tcp.TcpPacket(ipv4_packet_rx))
+        return
+
+
+def legacy_phrx_ipv6(self, ipv6_packet_rx):
+    """ Inbound IPv6 packet handling the way it was done before, new address set and if chain for each packet """
+
+    self.logger.debug(f"{ipv6_packet_rx.tracker} - {ipv6_packet_rx}")
+
+    if ipv6_packet_rx.ipv6_dst not in {*self.stack_ipv6_unicast, *self.stack_ipv6_multicast}:
+        return
+
+    if ipv6_packet_rx.ipv6_next == ps_ipv6.IP6_NEXT_HEADER_ICMP6:
+        self.phrx_icmpv6(ipv6_packet_rx, ps_icmpv6.Icmp6Packet(ipv6_packet_rx))
+        return
+
+    if ipv6_packet_rx.ipv6_next == ps_ipv6.IP6_NEXT_HEADER_UDP:
+        self.phrx_udp(ipv6_packet_rx, ps_udp.UdpPacket(ipv6_packet_rx))
+        return
+
+    if ipv6_packet_rx.ipv6_next == ps_ipv6.IP6_NEXT_HEADER_TCP:
+        self.phrx_tcp(ipv6_packet_rx, ps_tcp.TcpPacket(ipv6_packet_rx))
+        return
+
+
+def create_packet_handler():
+    """ Create packet handler with typical addressing but without starting its worker threads and address configuration """
+
+    packet_handler = PacketHandler.__new__(PacketHandler)
+    packet_handler.logger = loguru.logger
+    packet_handler.stack_mac_unicast = [MacAddress("02:00:00:77:77:77")]
+    packet_handler.stack_mac_multicast = [MacAddress("33:33:00:00:00:01"), MacAddress("33:33:ff:00:00:07")]
+    packet_handler.stack_mac_broadcast = [MAC_BROADCAST]
+    packet_handler.stack_ipv6_unicast = [IPv6Address("fe80::7"), IPv6Address("2001:db8::7")]
+    packet_handler.stack_ipv6_multicast = [IPv6Address("ff02::1"), IPv6Address("ff02::1:ff00:7")]
+    packet_handler.stack_ipv4_address = [IPv4Interface("10.0.0.7/24")]
+    packet_handler.stack_ipv4_unicast = [IPv4Address("10.0.0.7")]
+    packet_handler.stack_ipv4_multicast = []
+    packet_handler.stack_ipv4_broadcast = [IPv4Address("255.255.255.255"), IPv4Address("10.0.0.255")]
+    packet_handler.update_stack_address_sets()
+    packet_handler.update_dispatch_tables()
+
+    # Stop processing at transport layer, only filtering and dispatch cost is being measured
+    packet_handler.phrx_udp = lambda ip_packet_rx, udp_packet_rx: None
+
+    return packet_handler
+
+
+def run(name, phrx_ether, packet_handler, frame):
+    """ Push PACKET_COUNT frames through given Ethernet handler and report its performance """
+
+    start = time.perf_counter()
+    for _ in range(PACKET_COUNT):
+        phrx_ether(packet_handler, ps_ether.EtherPacket(frame))
+    elapsed = time.perf_counter() - start
+    print(f"{name:>20}: {PACKET_COUNT / elapsed:10.0f} packets/s, {elapsed / PACKET_COUNT * 1e6:6.2f} us/packet")
+
+
+def main():
+    loguru.logger.remove()
+    FlowCache()
+    packet_handler = create_packet_handler()
+    udp_packet = ps_udp.UdpPacket(udp_sport=8080, udp_dport=53, raw_data=b"")
+    frames = {
+        "IPv4": create_frame(ps_ipv4.Ip4Packet(ipv4_src="10.0.0.1", ipv4_dst="10.0.0.7", child_packet=udp_packet)),
+        "IPv6": create_frame(ps_ipv6.Ip6Packet(ipv6_src="fe80::1", ipv6_dst="fe80::7", child_packet=udp_packet)),
+    }
+    for protocol, frame in frames.items():
+        run(f"{protocol} legacy", legacy_phrx_ether, packet_handler, frame)
+        run(f"{protocol} frozen sets", PacketHandler.phrx_ether, packet_handler, frame)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
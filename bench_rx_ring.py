@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# bench_rx_ring.py - tool used to measure RX ring performance in single frame and batch modes
+#
+
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import loguru
+
+import stack
+from rx_ring import RxRing
+
+FRAME_COUNT = 100000
+
+# IPv4 / UDP frame padded to full 1514 bytes
+FRAME = bytes.fromhex("02000077777702000077770108004500") + bytes(1498)
+
+# Sockets need to be kept open after each run as the RX ring thread keeps polling them
+sockets = []
+
+
+def run(batch_mode):
+    """ Push FRAME_COUNT frames through RX ring and report its performance counters """
+
+    stack.rx_ring_batch_mode = batch_mode
+
+    tap, peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sockets.extend((tap, peer))
+    rx_ring = RxRing([tap.fileno()])
+
+    def __thread_sender():
+        for _ in range(FRAME_COUNT):
+            peer.send(FRAME)
+
+    start = time.perf_counter()
+    threading.Thread(target=__thread_sender, daemon=True).start()
+
+    frame_count = 0
+    while frame_count < FRAME_COUNT:
+        frame_count += len(rx_ring.dequeue())
+
+    elapsed = time.perf_counter() - start
+    stats = rx_ring.stats
+    print(
+        f"{'batch' if batch_mode else 'single':>6} mode: {frame_count / elapsed:10.0f} frames/s, {stats['frames_per_wakeup']:6.2f} frames/wakeup"
+        + f", {stats['buffer_allocations_per_frame']:.4f} buffer allocations/frame, drops {stats['drops']}"
+    )
+
+
+def main():
+    loguru.logger.remove()
+    run(batch_mode=False)
+    run(batch_mode=True)
+    # RX ring threads run forever, so exit without waiting for them
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
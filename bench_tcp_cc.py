@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# bench_tcp_cc.py - tool used to compare TCP congestion control algorithms sending over shared bottleneck link
+#
+
+
+import sys
+import threading
+import time
+from ipaddress import IPv4Address
+
+import loguru
+
+import stack
+from flow_cache import FlowCache
+from link_emulator import LinkEmulator
+from stack_timer import StackTimer
+from tcp_metadata import TcpMetadata
+from tcp_socket import TcpSocket
+
+LINK_RATE = 10_000_000  # Bottleneck link rate (bit/s)
+LINK_RTT = 0.04  # Round trip time of the path without queuing delay (s)
+LINK_QUEUE = 32_000  # Drop tail queue of the bottleneck link (bytes)
+MEASURE_TIME = 10  # Duration of each scenario (s)
+SCENARIOS = (("newreno",), ("cubic",), ("newreno", "newreno"), ("cubic", "cubic"), ("newreno", "cubic"))
+
+PEER_IP_ADDRESS = IPv4Address("10.0.0.2")
+PEER_PORT = 7
+PEER_ISN = 1000
+PEER_WIN = 65535
+
+
+class Path(LinkEmulator):
+    """ Path with the bottleneck link, data packets go through its drop tail queue, ACK packets come back without queuing """
+
+    def __init__(self):
+        """ Class constructor """
+
+        super().__init__(LINK_RATE, LINK_RTT, LINK_QUEUE)
+        self.peers = {}
+
+    def phtx_tcp(self, ip_src, ip_dst, tcp_sport, tcp_dport, tcp_seq=0, tcp_ack=0, tcp_flag_syn=False, tcp_flag_fin=False, raw_data=b"", **kwargs):
+        """ Take packet sent out by the local TCP session and pass it to the peer through the bottleneck link """
+
+        if tcp_flag_syn:
+            peer = self.peers[tcp_sport] = {"rcv_ini": tcp_seq + 1, "rcv_nxt": tcp_seq + 1, "ooo": {}, "sent": 0, "retransmitted": 0}
+            syn_ack = self.__ack(ip_src, tcp_sport, peer, kwargs.get("tcp_timestamp"), flag_syn=True)
+            self.schedule(time.monotonic() + LINK_RTT, self.deliver, syn_ack)
+            return
+
+        if not (peer := self.peers.get(tcp_sport)) or not raw_data and not tcp_flag_fin:
+            return
+
+        if (deadline := self.enqueue(len(raw_data))) is None:
+            return
+
+        if tcp_seq < peer["sent"]:
+            peer["retransmitted"] += len(raw_data)
+        peer["sent"] = max(peer["sent"], tcp_seq + len(raw_data))
+
+        self.schedule(deadline, self.__receive, ip_src, tcp_sport, tcp_seq, len(raw_data) + tcp_flag_fin, kwargs.get("tcp_timestamp"))
+
+    def __receive(self, ip_src, tcp_sport, seq, length, timestamp):
+        """ Peer received data packet, acknowledge it right away the way Linux does when it sees packet loss """
+
+        peer = self.peers[tcp_sport]
+        if seq > peer["rcv_nxt"]:
+            peer["ooo"][seq] = max(peer["ooo"].get(seq, 0), seq + length)
+        elif seq + length > peer["rcv_nxt"]:
+            peer["rcv_nxt"] = seq + length
+            while peer["ooo"]:
+                seq = min(peer["ooo"])
+                if seq > peer["rcv_nxt"]:
+                    break
+                peer["rcv_nxt"] = max(peer["rcv_nxt"], peer["ooo"].pop(seq))
+        self.schedule(time.monotonic() + LINK_RTT / 2, self.deliver, self.__ack(ip_src, tcp_sport, peer, timestamp))
+
+    def __ack(self, ip_src, tcp_sport, peer, timestamp, flag_syn=False):
+        """ Create ACK packet peer sends back, it carries SACK blocks describing out of order data """
+
+        blocks = []
+        for seq in sorted(peer["ooo"]):
+            if blocks and seq <= blocks[-1][1]:
+                blocks[-1][1] = max(blocks[-1][1], peer["ooo"][seq])
+            else:
+                blocks.append([seq, peer["ooo"][seq]])
+
+        return TcpMetadata(
+            local_ip_address=ip_src,
+            local_port=tcp_sport,
+            remote_ip_address=PEER_IP_ADDRESS,
+            remote_port=PEER_PORT,
+            flag_syn=flag_syn,
+            flag_ack=True,
+            flag_fin=False,
+            flag_rst=False,
+            seq=PEER_ISN if flag_syn else PEER_ISN + 1,
+            ack=peer["rcv_nxt"],
+            win=PEER_WIN,
+            wscale=None,
+            mss=1460,
+            sackperm=flag_syn or None,
+            sack=[tuple(_) for _ in blocks[-3:]] or None,
+            timestamp=(int(time.monotonic() * 1000) & 0xFFFFFFFF, timestamp[0]) if timestamp else None,
+            raw_data=b"",
+            tracker=None,
+        )
+
+
+def run(algorithms):
+    """ Let each of the algorithms send data over the shared bottleneck link and measure throughput they achieved """
+
+    path = stack.packet_handler = Path()
+    sockets = []
+    for algorithm in algorithms:
+        tcp_socket = TcpSocket()
+        tcp_socket.bind(IPv4Address("10.0.0.1"), 0)
+        tcp_socket.congestion_control = algorithm
+        assert tcp_socket.connect(PEER_IP_ADDRESS, PEER_PORT)
+        threading.Thread(target=tcp_socket.send, args=(bytes(LINK_RATE * MEASURE_TIME // 8),), daemon=True).start()
+        sockets.append(tcp_socket)
+
+    time.sleep(MEASURE_TIME)
+
+    for tcp_socket in sockets:
+        peer = path.peers[tcp_socket.tcp_session.local_port]
+        print(
+            f"{tcp_socket.congestion_control:>10}: {(peer['rcv_nxt'] - peer['rcv_ini']) * 8 / MEASURE_TIME / 1_000_000:5.2f} Mbit/s, "
+            + f"{peer['retransmitted'] / max(peer['sent'] - peer['rcv_ini'], 1) * 100:5.2f}% retransmitted, {tcp_socket.tcp_session.cc}"
+        )
+    print(f"{'link':>10}: {path.link_bytes * 8 / MEASURE_TIME / LINK_RATE * 100:5.1f}% utilization, {path.link_drops} packets dropped")
+    print()
+
+    path.running = False
+    stack.tcp_sessions.clear()
+
+
+def main():
+    loguru.logger.remove()
+    StackTimer()
+    FlowCache()
+    print(f"Bottleneck {LINK_RATE / 1_000_000} Mbit/s, RTT {LINK_RTT * 1000} ms, queue {LINK_QUEUE} bytes, {MEASURE_TIME} s per scenario\n")
+    for algorithms in SCENARIOS:
+        run(algorithms)
+
+    # Let the timer thread exit
+    stack.stack_timer.run_stack_timer = False
+    stack.stack_timer.register_method(method=lambda: None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# bench_tcp_idle.py - tool used to measure CPU time consumed by idle TCP sessions
+#
+
+
+import sys
+import time
+
+import loguru
+
+import stack
+from flow_cache import FlowCache
+from stack_timer import StackTimer
+from tcp_session_alt import TcpSession
+
+SESSION_COUNTS = (0, 100, 1000, 5000)
+MEASURE_TIME = 2
+
+
+def create_sessions(session_count, polling):
+    """ Create listening sessions, optionally with the per session 1 ms FSM polling task sessions used to register """
+
+    for port in range(1, session_count + 1):
+        tcp_session = TcpSession(local_ip_address="0.0.0.0", local_port=port, remote_ip_address="*", remote_port="*")
+        stack.tcp_sessions[tcp_session.tcp_session_id] = tcp_session
+        tcp_session.listen()
+        if polling:
+            tcp_session.polling_task = stack.stack_timer.register_method(method=tcp_session.tcp_fsm, kwargs={"timer": True})
+
+
+def remove_sessions():
+    """ Remove all sessions along with their polling tasks """
+
+    for tcp_session in stack.tcp_sessions.values():
+        if polling_task := getattr(tcp_session, "polling_task", None):
+            stack.stack_timer.cancel(polling_task)
+    stack.tcp_sessions.clear()
+
+
+def run(name, session_count, polling):
+    """ Measure CPU time the process consumes while given number of sessions sits idle """
+
+    create_sessions(session_count, polling)
+    time.sleep(0.1)
+    start = time.process_time()
+    time.sleep(MEASURE_TIME)
+    cpu_load = (time.process_time() - start) / MEASURE_TIME
+    remove_sessions()
+    print(f"{name:>15}: {session_count:5} idle sessions, {cpu_load * 100:6.1f}% CPU")
+
+
+def main():
+    loguru.logger.remove()
+    StackTimer()
+    FlowCache()
+    for session_count in SESSION_COUNTS:
+        run("1 ms polling", session_count, polling=True)
+        run("event driven", session_count, polling=False)
+
+    # Let the timer thread exit
+    stack.stack_timer.run_stack_timer = False
+    stack.stack_timer.register_method(method=lambda: None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
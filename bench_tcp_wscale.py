@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# bench_tcp_wscale.py - tool used to measure TCP throughput over high latency link with and without window scaling
+#
+
+
+import sys
+import threading
+import time
+from ipaddress import IPv4Address
+
+import loguru
+
+import stack
+from flow_cache import FlowCache
+from link_emulator import LinkEmulator
+from stack_timer import StackTimer
+from tcp_socket import TcpSocket
+
+LINK_RATE = 20_000_000  # Link rate (bit/s)
+LINK_RTT = 0.1  # Round trip time of the link without queuing delay (s)
+LINK_QUEUE = 2 * stack.tcp_rcvbuf  # Drop tail queue of the link, fits whole receive window so throughput is limited only by the window (bytes)
+MEASURE_TIME = 10  # Duration of each scenario (s)
+SCENARIOS = (("wscale off", False), ("wscale on", True))
+
+CLIENT_IP_ADDRESS = IPv4Address("10.0.0.1")
+SERVER_IP_ADDRESS = IPv4Address("10.0.0.2")
+SERVER_PORT = 7
+
+
+def run(name, wscale_support):
+    """ Send data over the link and measure throughput receiving application achieved """
+
+    stack.tcp_wscale_support = wscale_support
+    link = stack.packet_handler = LinkEmulator(LINK_RATE, LINK_RTT, LINK_QUEUE)
+
+    server_socket = TcpSocket()
+    server_socket.bind(SERVER_IP_ADDRESS, SERVER_PORT)
+    server_socket.listen()
+
+    received = [0]
+
+    def receiver():
+        tcp_socket = server_socket.accept()
+        while data := tcp_socket.receive():
+            received[0] += len(data)
+
+    threading.Thread(target=receiver, daemon=True).start()
+
+    client_socket = TcpSocket()
+    client_socket.bind(CLIENT_IP_ADDRESS, 0)
+    assert client_socket.connect(SERVER_IP_ADDRESS, SERVER_PORT)
+    threading.Thread(target=client_socket.send, args=(bytes(LINK_RATE * MEASURE_TIME // 8),), daemon=True).start()
+
+    time.sleep(MEASURE_TIME)
+
+    tcp_session = client_socket.tcp_session
+    print(
+        f"{name:>10}: {received[0] * 8 / MEASURE_TIME / 1_000_000:6.2f} Mbit/s, "
+        + f"peer window {tcp_session.snd_wnd} bytes (wscale {tcp_session.snd_wsc}), {link.link_drops} packets dropped, {tcp_session.cc}"
+    )
+
+    link.running = False
+    stack.tcp_sessions.clear()
+
+
+def main():
+    loguru.logger.remove()
+    StackTimer()
+    FlowCache()
+    print(f"Link {LINK_RATE / 1_000_000} Mbit/s, RTT {LINK_RTT * 1000} ms, receive buffer {stack.tcp_rcvbuf} bytes, {MEASURE_TIME} s per scenario")
+    print(f"Throughput limit without window scaling is {65535 * 8 / LINK_RTT / 1_000_000:.2f} Mbit/s\n")
+    for name, wscale_support in SCENARIOS:
+        run(name, wscale_support)
+
+    # Let the timer thread exit
+    stack.stack_timer.run_stack_timer = False
+    stack.stack_timer.register_method(method=lambda: None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
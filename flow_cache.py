@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# flow_cache.py - module contains class supporting TX flow cache
+#
+
+
+import threading
+
+import loguru
+
+import stack
+
+FLOW_CACHE_MAX_SIZE = 4096
+
+
+class FlowCache:
+    """ Support for TX flow cache, memoizes validated source address and next hop of outbound flows so the steady state TX path is single lookup """
+
+    class Flow:
+        """ Container class for flow cache entries, sockets may keep reference to their flow and use it as long as it stays valid """
+
+        def __init__(self, ip_src, ip_dst, next_hop):
+            self.ip_src = ip_src
+            self.ip_dst = ip_dst
+            self.next_hop = next_hop
+            self.valid = True
+            self.hit_count = 0
+
+        def __str__(self):
+            """ Flow log string """
+
+            return f"{self.ip_src} > {self.ip_dst}, {self.next_hop}"
+
+    def __init__(self):
+        """ Class constructor """
+
+        stack.flow_cache = self
+
+        self.flows = {}
+
+        self.lock = threading.Lock()
+
+        self.logger = loguru.logger.bind(object_name="flow_cache.")
+
+        self.logger.debug("Started flow cache")
+
+    def find_flow(self, ip_src, ip_dst):
+        """ Find flow for given source and destination addresses as requested by sender """
+
+        return self.flows.get((ip_src, ip_dst))
+
+    def add_flow(self, ip_src, ip_dst, ip_src_validated, next_hop, ip_dst_validated=None):
+        """ Add flow to cache, only flows with resolved next hop should be cached """
+
+        flow = self.Flow(ip_src_validated, ip_dst_validated or ip_dst, next_hop)
+
+        with self.lock:
+            if len(self.flows) >= FLOW_CACHE_MAX_SIZE:
+                self.__invalidate_flows(list(self.flows))
+            self.flows[(ip_src, ip_dst)] = flow
+
+        self.logger.debug(f"Added flow {flow}")
+        return flow
+
+    def invalidate(self):
+        """ Invalidate all flows, used when stack addressing or routing changes """
+
+        with self.lock:
+            self.__invalidate_flows(list(self.flows))
+
+    def invalidate_next_hop(self, ip_address):
+        """ Invalidate flows sent via given next hop, used when its MAC address changes or expires """
+
+        with self.lock:
+            self.__invalidate_flows([key for key, flow in self.flows.items() if flow.next_hop.ip_address == ip_address])
+
+    def next_hop_hit_count(self, ip_address):
+        """ Get number of packets sent via given next hop since last call, used by ARP and ND caches to decide if entry is worth refreshing """
+
+        hit_count = 0
+        for flow in list(self.flows.values()):
+            if flow.next_hop.ip_address == ip_address:
+                hit_count += flow.hit_count
+                flow.hit_count = 0
+
+        return hit_count
+
+    def __invalidate_flows(self, keys):
+        """ Remove flows from cache and mark them invalid so sockets holding them make new lookup """
+
+        for key in keys:
+            flow = self.flows.pop(key)
+            flow.valid = False
+            self.logger.debug(f"Invalidated flow {flow}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# flow_hash.py - module contains function used to steer packets of the same flow to the same queue
+#
+
+
+import ps_ether
+import ps_ipv4
+import ps_ipv6
+
+FLOW_HASH_PORTS = {ps_ipv4.IP4_PROTO_TCP, ps_ipv4.IP4_PROTO_UDP}
+
+
+def flow_hash(ether_type, raw_data):
+    """ Compute hash of packet's 5-tuple (IP addresses, protocol and ports) out of raw IP packet, IPv4 packets are hashed on addresses and protocol only """
+
+    # Fields are copied out of the view as views of outbound packets are backed by mutable buffer and as such are not hashable
+    if ether_type == ps_ether.ETHER_TYPE_IP4 and len(raw_data) >= ps_ipv4.IP4_HEADER_LEN:
+        # Any IPv4 packet may get fragmented on its way and only first fragment carries ports, hashing all packets on addresses and protocol keeps
+        # fragmented and unfragmented packets of the same session together and gets fragments reassembled by the same worker
+        return hash((bytes(raw_data[12:20]), raw_data[9]))
+
+    if ether_type == ps_ether.ETHER_TYPE_IP6 and len(raw_data) >= ps_ipv6.IP6_HEADER_LEN:
+        next_header = raw_data[6]
+        if next_header in FLOW_HASH_PORTS:
+            return hash((bytes(raw_data[8:40]), next_header, bytes(raw_data[40:44])))
+        return hash((bytes(raw_data[8:40]), next_header))
+
+    return 0
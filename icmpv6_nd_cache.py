@@ -41,7 +41,11 @@
 #
 
 
+import heapq
+import itertools
+import threading
 import time
+from collections import OrderedDict, deque
 from ipaddress import IPv6Address
 
 import loguru
@@ -49,82 +53,285 @@ import loguru
 import ps_icmpv6
 import stack
 from ipv6_helper import ipv6_solicited_node_multicast
+from mac_address import MAC_UNSPECIFIED
 
-ND_ENTRY_MAX_AGE = 3600
-ND_ENTRY_REFRESH_TIME = 300
+ND_REACHABLE_TIME = 30  # Time neighbor is considered reachable after last reachability confirmation
+ND_DELAY_FIRST_PROBE_TIME = 5  # Time upper layers have to confirm reachability of stale neighbor that is in use before it gets probed
+ND_RETRANS_TIMER = 1  # Time between two consecutive Neighbor Solicitation messages sent for the same neighbor
+ND_MAX_MULTICAST_SOLICIT = 3  # Number of multicast Neighbor Solicitation messages sent while resolving neighbor before giving up
+ND_MAX_UNICAST_SOLICIT = 3  # Number of unicast Neighbor Solicitation messages sent while probing neighbor before giving up
+
+ND_GC_STALE_TIME = 60  # Stale entries not used for that long may be garbage collected
+ND_GC_THRESHOLD_SOFT = 512  # Cache size over which unused stale entries get garbage collected
+ND_GC_THRESHOLD_HARD = 1024  # Cache size limit, least recently used entries get evicted to stay under it
+
+ND_PENDING_QUEUE_LEN = 16  # Maximum number of packets held for single neighbor while its address is being resolved
+
+ND_TIMER_INTERVAL = 100  # Interval in which expired entry timers are processed
 
 
 class ICMPv6NdCache:
-    """ Support for ICMPv6 ND cache operations """
+    """ Support for ICMPv6 ND cache operations, entries follow RFC 4861 Neighbor Unreachability Detection state machine """
 
     class CacheEntry:
-        """ Container class fo cache entries """
+        """ Container class for cache entries """
 
-        def __init__(self, mac_address, permanent=False):
+        def __init__(self, mac_address=MAC_UNSPECIFIED, state="INCOMPLETE", permanent=False):
             self.mac_address = mac_address
+            self.state = state
             self.permanent = permanent
             self.creation_time = time.time()
+            self.confirmation_time = self.creation_time
+            self.used_time = self.creation_time
+            self.probe_count = 0
             self.hit_count = 0
+            self.timer = None  # Id of the only expiry heap event that is still valid for this entry
+            self.packets = deque(maxlen=ND_PENDING_QUEUE_LEN) if state == "INCOMPLETE" else None  # Packets waiting for address to be resolved
+
+        def __str__(self):
+            """ Cache entry log string """
+
+            return f"{self.mac_address} {self.state}, age {time.time() - self.creation_time:.0f}s, hit_count {self.hit_count}"
 
     def __init__(self):
         """ Class constructor """
 
         stack.icmpv6_nd_cache = self
 
-        self.nd_cache = {}
+        self.nd_cache = OrderedDict()  # Kept in least recently used order
+        self.timers = []  # Expiry heap of (deadline, timer id, address) events, superseded events are skipped when popped
+        self.timer_ids = itertools.count()
+
+        self.lock = threading.RLock()
 
         self.logger = loguru.logger.bind(object_name="icmpv6_nd_cache.")
 
-        # Setup timer to execute ND Cache maintainer every second
-        stack.stack_timer.register_method(method=self.maintain_cache, delay=1000)
+        # Setup timer to execute ND Cache maintainer
+        stack.stack_timer.register_method(method=self.maintain_cache, delay=ND_TIMER_INTERVAL)
 
         self.logger.debug("Started ICMPv6 Neighbor Discovery cache")
 
     def maintain_cache(self):
-        """ Method responsible for maintaining ND cache entries """
+        """ Method responsible for maintaining ND cache entries, only entries whose timers expired are processed """
+
+        now = time.time()
+
+        with self.lock:
+            while self.timers and self.timers[0][0] <= now:
+                _, timer, ipv6_address = heapq.heappop(self.timers)
+
+                # Skip events that got superseded by state change after they had been scheduled
+                if not (cache_entry := self.nd_cache.get(ipv6_address)) or cache_entry.timer != timer:
+                    continue
+
+                cache_entry.timer = None
+                self.__expire_timer(ipv6_address, cache_entry, now)
+
+    def __expire_timer(self, ipv6_address, cache_entry, now):
+        """ Run state transition triggered by entry's timer """
+
+        # Keep on resolving neighbor till it answers or the request limit is reached
+        if cache_entry.state == "INCOMPLETE":
+            if cache_entry.probe_count < ND_MAX_MULTICAST_SOLICIT:
+                self.__send_probe(ipv6_address, cache_entry)
+                return
+            self.__remove_entry(ipv6_address, "unable to resolve")
+            return
 
-        for ipv6_address in list(self.nd_cache):
+        # Reachability confirmations only record their time, so the entry is due to stay reachable if one arrived since its timer had been set
+        if cache_entry.state == "REACHABLE":
+            if now - cache_entry.confirmation_time < ND_REACHABLE_TIME:
+                self.__schedule(ipv6_address, cache_entry, cache_entry.confirmation_time + ND_REACHABLE_TIME - now)
+                return
 
-            # Skip permanent entries
-            if self.nd_cache[ipv6_address].permanent:
-                continue
+            # Entry that is still in use gets verified right away, otherwise flows using it are invalidated so their next packet goes through cache lookup
+            if cache_entry.hit_count or stack.flow_cache.next_hop_hit_count(ipv6_address):
+                cache_entry.hit_count = 0
+                self.__change_state(ipv6_address, cache_entry, "DELAY")
+                self.__schedule(ipv6_address, cache_entry, ND_DELAY_FIRST_PROBE_TIME)
+                return
+            self.__change_state(ipv6_address, cache_entry, "STALE")
+            stack.flow_cache.invalidate_next_hop(ipv6_address)
+            return
 
-            # If entry age is over maximum age then discard the entry
-            if time.time() - self.nd_cache[ipv6_address].creation_time > ND_ENTRY_MAX_AGE:
-                mac_address = self.nd_cache.pop(ipv6_address).mac_address
-                self.logger.debug(f"Discarded expired ICMPv6 ND cache entry - {ipv6_address} -> {mac_address}")
+        # Upper layers didn't confirm reachability in time, start probing neighbor directly
+        if cache_entry.state == "DELAY":
+            self.__change_state(ipv6_address, cache_entry, "PROBE")
+            cache_entry.probe_count = 0
+            self.__send_probe(ipv6_address, cache_entry)
+            return
 
-            # If entry age is close to maximum age but the entry has been used since last refresh then send out request in attempt to refresh it
-            elif (time.time() - self.nd_cache[ipv6_address].creation_time > ND_ENTRY_MAX_AGE - ND_ENTRY_REFRESH_TIME) and self.nd_cache[ipv6_address].hit_count:
-                self.nd_cache[ipv6_address].hit_count = 0
-                self.__send_icmpv6_neighbor_solicitation(ipv6_address)
-                self.logger.debug(f"Trying to refresh expiring ICMPv6 ND cache entry for {ipv6_address} -> {self.nd_cache[ipv6_address].mac_address}")
+        if cache_entry.state == "PROBE":
+            if cache_entry.probe_count < ND_MAX_UNICAST_SOLICIT:
+                self.__send_probe(ipv6_address, cache_entry)
+                return
+            self.__remove_entry(ipv6_address, "neighbor unreachable")
+            return
 
-    def add_entry(self, ipv6_address, mac_address):
-        """ Add / refresh entry in cache """
+    def add_entry(self, ipv6_address, mac_address, confirmed=False):
+        """ Add / refresh entry in cache, confirmed means mapping came from reply to our own request """
 
-        self.nd_cache[ipv6_address] = self.CacheEntry(mac_address)
+        with self.lock:
+            cache_entry = self.nd_cache.get(ipv6_address)
+
+            if cache_entry and cache_entry.permanent:
+                return
+
+            if cache_entry is None:
+                self.__collect_garbage()
+                cache_entry = self.nd_cache[ipv6_address] = self.CacheEntry(mac_address, state="STALE")
+
+            mac_address_changed = cache_entry.state != "INCOMPLETE" and cache_entry.mac_address != mac_address
+
+            # Flows sent via this neighbor need to pick up its new MAC address
+            if mac_address_changed:
+                stack.flow_cache.invalidate_next_hop(ipv6_address)
+
+            cache_entry.mac_address = mac_address
+            self.nd_cache.move_to_end(ipv6_address)
+
+            # Reply to our request proves neighbor is reachable, unsolicited mapping is only good enough to be used and verified later
+            if confirmed:
+                cache_entry.confirmation_time = time.time()
+                if cache_entry.state != "REACHABLE":
+                    self.__change_state(ipv6_address, cache_entry, "REACHABLE")
+                    self.__schedule(ipv6_address, cache_entry, ND_REACHABLE_TIME)
+            elif cache_entry.state == "INCOMPLETE" or mac_address_changed:
+                self.__change_state(ipv6_address, cache_entry, "STALE")
+                cache_entry.timer = None
+
+            packets, cache_entry.packets = cache_entry.packets, None
+
+        # Send out packets that have been waiting for this neighbor's address to be resolved
+        if packets:
+            self.logger.debug(f"Resolved {ipv6_address} -> {mac_address}, sending out {len(packets)} pending packet(s)")
+            for ether_packet_tx, urgent in packets:
+                ether_packet_tx.ether_dst = mac_address
+                stack.tx_ring.enqueue(ether_packet_tx, urgent=urgent)
 
     def find_entry(self, ipv6_address):
-        """ Find entry in cache and return MAC address """
+        """ Find entry in cache and return MAC address, start address resolution if there is none """
+
+        with self.lock:
+            if (cache_entry := self.nd_cache.get(ipv6_address)) is None:
+                self.logger.debug(f"Unable to find entry for {ipv6_address}")
+                self.__create_incomplete_entry(ipv6_address)
+                return None
+
+            if cache_entry.state == "INCOMPLETE":
+                return None
+
+            cache_entry.hit_count += 1
+            cache_entry.used_time = time.time()
+            self.nd_cache.move_to_end(ipv6_address)
+
+            # Stale entry is being used, give upper layers chance to confirm neighbor's reachability before probing it
+            if cache_entry.state == "STALE":
+                self.__change_state(ipv6_address, cache_entry, "DELAY")
+                self.__schedule(ipv6_address, cache_entry, ND_DELAY_FIRST_PROBE_TIME)
 
-        if nd_entry := self.nd_cache.get(ipv6_address, None):
-            nd_entry.hit_count += 1
-            self.logger.debug(
-                f"Found {ipv6_address} -> {nd_entry.mac_address} entry, age {time.time() - nd_entry.creation_time:.0f}s, hit_count {nd_entry.hit_count}"
-            )
-            return nd_entry.mac_address
+        self.logger.debug(f"Found {ipv6_address} -> {cache_entry}")
+        return cache_entry.mac_address
 
-        self.logger.debug(f"Unable to find entry for {ipv6_address}, sending ICMPv6 Neighbor Solicitation message")
-        self.__send_icmpv6_neighbor_solicitation(ipv6_address)
+    def confirm_reachability(self, ipv6_address):
+        """ Take reachability confirmation from upper layer protocol (eg. TCP ACK for new data) """
+
+        if not (cache_entry := self.nd_cache.get(ipv6_address)) or cache_entry.state == "INCOMPLETE" or cache_entry.permanent:
+            return
+
+        # Confirmation of reachable entry is just noted, its timer takes it into account when it expires
+        cache_entry.confirmation_time = time.time()
+
+        if cache_entry.state != "REACHABLE":
+            with self.lock:
+                self.__change_state(ipv6_address, cache_entry, "REACHABLE")
+                self.__schedule(ipv6_address, cache_entry, ND_REACHABLE_TIME)
+
+    def hold_packet(self, ipv6_address, ether_packet_tx, urgent=False):
+        """ Hold packet till neighbor's address gets resolved, return MAC address if it has been resolved in the meantime """
+
+        with self.lock:
+            if (cache_entry := self.nd_cache.get(ipv6_address)) is None:
+                cache_entry = self.__create_incomplete_entry(ipv6_address)
+            elif cache_entry.state != "INCOMPLETE":
+                return cache_entry.mac_address
+            cache_entry.packets.append((ether_packet_tx, urgent))
+
+        self.logger.debug(f"{ether_packet_tx.tracker} - Holding packet till {ipv6_address} gets resolved, {len(cache_entry.packets)} packet(s) pending")
         return None
 
+    def __create_incomplete_entry(self, ipv6_address):
+        """ Create entry for neighbor that needs to be resolved and send out first Neighbor Solicitation message """
+
+        self.__collect_garbage()
+        cache_entry = self.nd_cache[ipv6_address] = self.CacheEntry()
+        self.logger.debug(f"Created {ipv6_address} -> {cache_entry}")
+        self.__send_probe(ipv6_address, cache_entry)
+        return cache_entry
+
+    def __collect_garbage(self):
+        """ Make room for new entry, unused stale entries go once cache is over soft threshold, least recently used ones once it hits hard threshold """
+
+        if len(self.nd_cache) < ND_GC_THRESHOLD_SOFT:
+            return
+
+        # Cache is kept in least recently used order so only its head needs to be looked at
+        now = time.time()
+        victims = []
+        for ipv6_address, cache_entry in self.nd_cache.items():
+            if len(self.nd_cache) - len(victims) < ND_GC_THRESHOLD_SOFT or now - cache_entry.used_time < ND_GC_STALE_TIME:
+                break
+            if cache_entry.state == "STALE" and not cache_entry.permanent:
+                victims.append(ipv6_address)
+
+        for ipv6_address in victims:
+            self.__remove_entry(ipv6_address, "garbage collected")
+
+        if len(self.nd_cache) < ND_GC_THRESHOLD_HARD:
+            return
+
+        for ipv6_address, cache_entry in self.nd_cache.items():
+            if not cache_entry.permanent:
+                self.__remove_entry(ipv6_address, "evicted")
+                return
+
+    def __remove_entry(self, ipv6_address, reason):
+        """ Remove entry from cache along with packets that might be waiting for it """
+
+        cache_entry = self.nd_cache.pop(ipv6_address)
+        if cache_entry.state != "INCOMPLETE":
+            stack.flow_cache.invalidate_next_hop(ipv6_address)
+        self.logger.debug(
+            f"Removed {ipv6_address} -> {cache_entry}, {reason}" + (f", dropped {len(cache_entry.packets)} pending packet(s)" if cache_entry.packets else "")
+        )
+
+    def __change_state(self, ipv6_address, cache_entry, state):
+        """ Change entry's state """
+
+        self.logger.debug(f"{ipv6_address} -> {cache_entry.mac_address} state {cache_entry.state} -> {state}")
+        cache_entry.state = state
+
+    def __schedule(self, ipv6_address, cache_entry, delay):
+        """ Set entry's timer, timer set previously is superseded """
+
+        cache_entry.timer = next(self.timer_ids)
+        heapq.heappush(self.timers, (time.time() + delay, cache_entry.timer, ipv6_address))
+
+    def __send_probe(self, ipv6_address, cache_entry):
+        """ Send out Neighbor Solicitation for neighbor, multicast one when resolving it and unicast one when probing it, then set retransmission timer """
+
+        cache_entry.probe_count += 1
+        self.logger.debug(f"Sending ICMPv6 Neighbor Solicitation message #{cache_entry.probe_count} for {ipv6_address}")
+        self.__schedule(ipv6_address, cache_entry, ND_RETRANS_TIMER)
+        self.__send_icmpv6_neighbor_solicitation(ipv6_address, multicast=cache_entry.state == "INCOMPLETE")
+
     @staticmethod
-    def __send_icmpv6_neighbor_solicitation(icmpv6_ns_target_address):
+    def __send_icmpv6_neighbor_solicitation(icmpv6_ns_target_address, multicast=True):
         """ Enqueue ICMPv6 Neighbor Solicitation packet with TX ring """
+
         stack.packet_handler.phtx_icmpv6(
             ipv6_src=IPv6Address(stack.packet_handler.stack_ipv6_unicast[0] if stack.packet_handler.stack_ipv6_unicast else "::"),
-            ipv6_dst=ipv6_solicited_node_multicast(icmpv6_ns_target_address),
+            ipv6_dst=ipv6_solicited_node_multicast(icmpv6_ns_target_address) if multicast else icmpv6_ns_target_address,
             ipv6_hop=255,
             icmpv6_type=ps_icmpv6.ICMP6_NEIGHBOR_SOLICITATION,
             icmpv6_ns_target_address=icmpv6_ns_target_address,
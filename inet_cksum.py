@@ -37,17 +37,35 @@
 
 
 #
-# inet_cksum.py - module contains function used to compute Internet Checksum
+# inet_cksum.py - module contains functions used to compute and update Internet Checksum
 #
 
 
-import struct
+def compute_sum(data):
+    """ Compute 16 bit one's complement sum of data, summing it as single wide integer is valid as 2^16 is congruent to 1 modulo 0xFFFF """
 
+    # Data of odd length gets padded with zero byte, shifting the integer left does the same without copying it
+    value = int.from_bytes(data, "big") << (8 if len(data) & 1 else 0)
 
-def compute_cksum(data):
-    """ Compute Internet Checksum used by IP/TCP/UDP/ICMPv4 protocols """
+    # One's complement sum is equal to the remainder modulo 0xFFFF except it can't be zero unless all of the data is zero
+    return value % 0xFFFF or (0xFFFF if value else 0)
 
-    data = data + (b"\0" if len(data) & 1 else b"")
-    cksum = sum(struct.unpack(f"! {len(data) >> 1}H", data))
+
+def combine_sums(*sums):
+    """ Combine partial sums of data parts, each part except the last one needs to be of even length """
+
+    cksum = sum(sums)
     cksum = (cksum >> 16) + (cksum & 0xFFFF)
-    return ~(cksum + (cksum >> 16)) & 0xFFFF
+    return (cksum >> 16) + (cksum & 0xFFFF)
+
+
+def compute_cksum(data, init=0):
+    """ Compute Internet Checksum used by IP/TCP/UDP/ICMPv4 protocols, 'init' carries sum of data checksumed separately (eg. IP pseudo header) """
+
+    return ~combine_sums(init, compute_sum(data)) & 0xFFFF
+
+
+def update_cksum(cksum, old_data, new_data):
+    """ Update checksum after part of the data covered by it changed from 'old_data' to 'new_data' of the same even length (RFC 1624, eqn. 3) """
+
+    return ~combine_sums(~cksum & 0xFFFF, ~compute_sum(old_data) & 0xFFFF, compute_sum(new_data)) & 0xFFFF
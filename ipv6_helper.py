@@ -42,7 +42,8 @@
 
 
 from ipaddress import IPv6Address, IPv6Interface, IPv6Network
-from re import sub
+
+from mac_address import MacAddress
 
 
 def ipv6_eui64(mac, prefix=IPv6Network("fe80::/64")):
@@ -50,11 +51,9 @@ def ipv6_eui64(mac, prefix=IPv6Network("fe80::/64")):
 
     assert prefix.prefixlen == 64
 
-    eui64 = sub(r"[.:-]", "", mac).lower()
-    eui64 = eui64[0:6] + "fffe" + eui64[6:]
-    eui64 = hex(int(eui64[0:2], 16) ^ 2)[2:].zfill(2) + eui64[2:]
-    eui64 = ":".join(eui64[_ : _ + 4] for _ in range(0, 16, 4))
-    return IPv6Interface(prefix.network_address.exploded[0:20] + eui64 + "/" + str(prefix.prefixlen))
+    mac = MacAddress(mac)
+    eui64 = bytes([mac[0] ^ 0x02]) + mac[1:3] + b"\xff\xfe" + mac[3:6]
+    return IPv6Interface((IPv6Address(prefix.network_address.packed[:8] + eui64), prefix.prefixlen))
 
 
 def ipv6_solicited_node_multicast(ipv6_address):
@@ -66,4 +65,4 @@ def ipv6_solicited_node_multicast(ipv6_address):
 def ipv6_multicast_mac(ipv6_multicast_address):
     """ Create IPv6 multicast MAC address """
 
-    return "33:33:" + ":".join(["".join(ipv6_multicast_address.exploded[-9:].split(":"))[_ : _ + 2] for _ in range(0, 8, 2)])
+    return MacAddress(b"\x33\x33" + ipv6_multicast_address.packed[-4:])
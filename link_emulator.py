@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# link_emulator.py - module contains emulated link connecting local TCP sessions, used by TCP benchmark tools
+#
+
+
+import heapq
+import itertools
+import threading
+import time
+
+import stack
+from tcp_metadata import TcpMetadata
+
+
+class LinkEmulator:
+    """ Link with fixed latency connecting local TCP sessions, data packets go through its drop tail queue, ACK packets go through without queuing """
+
+    def __init__(self, rate, rtt, queue):
+        """ Class constructor, rate in bit/s, round trip time without queuing delay in seconds and queue size in bytes """
+
+        self.rate = rate
+        self.rtt = rtt
+        self.queue = queue
+
+        self.events = []
+        self.event_id = itertools.count()
+        self.lock = threading.Condition()
+        self.link_free = 0
+        self.link_bytes = 0
+        self.link_drops = 0
+        self.running = True
+        threading.Thread(target=self.__thread_events, daemon=True).start()
+
+    def __thread_events(self):
+        """ Execute scheduled methods at their time """
+
+        while self.running:
+            with self.lock:
+                if not self.events or self.events[0][0] > time.monotonic():
+                    self.lock.wait(self.events[0][0] - time.monotonic() if self.events else 0.1)
+                    continue
+                _, _, method, args = heapq.heappop(self.events)
+            method(*args)
+
+    def schedule(self, deadline, method, *args):
+        """ Schedule method to be executed at given time """
+
+        with self.lock:
+            heapq.heappush(self.events, (deadline, next(self.event_id), method, args))
+            self.lock.notify()
+
+    def enqueue(self, data_len):
+        """ Put data packet into drop tail queue, returns time it reaches the other end of the link or None if it got dropped """
+
+        now = time.monotonic()
+        backlog = max(self.link_free - now, 0) * self.rate / 8
+        if backlog + data_len > self.queue:
+            self.link_drops += 1
+            return None
+        self.link_free = max(self.link_free, now) + (data_len + 40) * 8 / self.rate
+        self.link_bytes += data_len
+        return self.link_free + self.rtt / 2
+
+    def deliver(self, packet):
+        """ Deliver packet to the TCP session it belongs to, SYN packets may also go to the listening session """
+
+        if tcp_session := stack.tcp_sessions.get(packet.tcp_session_id):
+            tcp_session.tcp_fsm(packet=packet)
+            return
+
+        if packet.flag_syn and not packet.flag_ack:
+            for tcp_session_listening_pattern in packet.tcp_session_listening_patterns:
+                if tcp_session := stack.tcp_sessions.get(tcp_session_listening_pattern):
+                    tcp_session.tcp_fsm(packet=packet)
+                    return
+
+    def phtx_tcp(
+        self,
+        ip_src,
+        ip_dst,
+        tcp_sport,
+        tcp_dport,
+        tcp_seq=0,
+        tcp_ack=0,
+        tcp_flag_syn=False,
+        tcp_flag_ack=False,
+        tcp_flag_fin=False,
+        tcp_flag_rst=False,
+        tcp_win=0,
+        tcp_wscale=None,
+        tcp_mss=None,
+        tcp_sackperm=False,
+        tcp_sack=None,
+        tcp_timestamp=None,
+        raw_data=b"",
+        **kwargs,
+    ):
+        """ Take packet sent out by local TCP session and deliver it to the other end of the link """
+
+        if raw_data:
+            if (deadline := self.enqueue(len(raw_data))) is None:
+                return
+        else:
+            deadline = time.monotonic() + self.rtt / 2
+
+        packet = TcpMetadata(
+            local_ip_address=ip_dst,
+            local_port=tcp_dport,
+            remote_ip_address=ip_src,
+            remote_port=tcp_sport,
+            flag_syn=tcp_flag_syn,
+            flag_ack=tcp_flag_ack,
+            flag_fin=tcp_flag_fin,
+            flag_rst=tcp_flag_rst,
+            seq=tcp_seq,
+            ack=tcp_ack,
+            win=tcp_win,
+            wscale=None if tcp_wscale is None else 1 << tcp_wscale,
+            mss=tcp_mss,
+            sackperm=tcp_sackperm or None,
+            sack=tcp_sack,
+            timestamp=tcp_timestamp,
+            raw_data=bytes(raw_data),
+            tracker=None,
+        )
+        self.schedule(deadline, self.deliver, packet)
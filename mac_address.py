@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# mac_address.py - module contains class representing MAC address
+#
+
+
+class MacAddress(bytes):
+    """ MAC address stored in its 6 byte binary form, colon separated string form is used only for logging """
+
+    def __new__(cls, address):
+        """ Class constructor, accepts colon separated string, 6 byte binary or integer form """
+
+        if isinstance(address, MacAddress):
+            return address
+
+        if isinstance(address, str):
+            try:
+                address = bytes.fromhex(address.replace(":", ""))
+            except ValueError:
+                raise ValueError(f"Invalid MAC address: {address!r}") from None
+
+        elif isinstance(address, int):
+            address = address.to_bytes(6, "big")
+
+        mac_address = super().__new__(cls, address)
+
+        if len(mac_address) != 6:
+            raise ValueError(f"Invalid MAC address: {address!r}")
+
+        return mac_address
+
+    def __str__(self):
+        """ Colon separated string form """
+
+        return ":".join([f"{_:0>2x}" for _ in self])
+
+    def __repr__(self):
+        """ Object representation """
+
+        return f"MacAddress('{self}')"
+
+    @property
+    def packed(self):
+        """ Binary form """
+
+        return bytes(self)
+
+    @property
+    def is_unspecified(self):
+        """ Check if address is all zeros """
+
+        return self == MAC_UNSPECIFIED
+
+    @property
+    def is_broadcast(self):
+        """ Check if address is the broadcast address """
+
+        return self == MAC_BROADCAST
+
+    @property
+    def is_multicast(self):
+        """ Check if address has group bit set, this includes broadcast address """
+
+        return bool(self[0] & 0b00000001)
+
+
+MAC_UNSPECIFIED = MacAddress(b"\x00\x00\x00\x00\x00\x00")
+MAC_BROADCAST = MacAddress(b"\xff\xff\xff\xff\xff\xff")
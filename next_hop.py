@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# next_hop.py - module contains storage class for routing decision passed from IP layer to Ethernet layer
+#
+
+
+import stack
+from mac_address import MAC_UNSPECIFIED
+
+
+class NextHop:
+    """ Store next hop routing decision """
+
+    def __init__(self, ip_address, mac_address=MAC_UNSPECIFIED, egress_address=None):
+        self.ip_address = ip_address
+        self.mac_address = mac_address
+        self.egress_address = egress_address
+
+    def __str__(self):
+        """ Next hop log string """
+
+        return f"next hop {self.ip_address}, MAC {self.mac_address}" + (f", via {self.egress_address}" if self.egress_address else "")
+
+    @property
+    def is_resolved(self):
+        """ Check if next hop's MAC address is known """
+
+        return not self.mac_address.is_unspecified
+
+    def confirm_reachability(self):
+        """ Pass reachability confirmation from upper layer protocol to neighbor cache """
+
+        neighbor_cache = stack.arp_cache if self.ip_address.version == 4 else stack.icmpv6_nd_cache
+        neighbor_cache.confirm_reachability(self.ip_address)
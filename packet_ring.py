@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# packet_ring.py - module contains fixed capacity ring buffers used by RX and TX rings to queue packets
+#
+
+
+import threading
+import time
+
+OVERFLOW_TAIL_DROP = "tail_drop"  # Drop packet being enqueued
+OVERFLOW_HEAD_DROP = "head_drop"  # Drop oldest packet in the queue to make room for the one being enqueued
+OVERFLOW_BLOCK = "block"  # Block producer till there is room in the queue
+
+OVERFLOW_POLICIES = {OVERFLOW_TAIL_DROP, OVERFLOW_HEAD_DROP, OVERFLOW_BLOCK}
+
+
+class RingBuffer:
+    """ Fixed capacity FIFO queue with O(1) push and pop operations """
+
+    def __init__(self, capacity):
+        """ Class constructor """
+
+        assert capacity > 0, "Ring buffer capacity must be greater than zero"
+
+        self.slots = [None] * capacity
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        """ Number of items in the buffer """
+
+        return self.count
+
+    @property
+    def full(self):
+        """ Check if there is no free slot left in the buffer """
+
+        return self.count == self.capacity
+
+    def push(self, item):
+        """ Put item at the tail of the buffer, caller needs to make sure buffer is not full """
+
+        self.slots[(self.head + self.count) % self.capacity] = item
+        self.count += 1
+
+    def pop(self):
+        """ Take item from the head of the buffer, caller needs to make sure buffer is not empty """
+
+        item = self.slots[self.head]
+        self.slots[self.head] = None
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        return item
+
+
+class PacketRing:
+    """ Bounded packet queue with separate high priority lane, dequeue always serves high priority lane first """
+
+    def __init__(self, capacity, urgent_capacity, overflow_policy=OVERFLOW_TAIL_DROP):
+        """ Class constructor """
+
+        assert overflow_policy in OVERFLOW_POLICIES, f"Not supported overflow policy: {overflow_policy}"
+
+        self.normal = RingBuffer(capacity)
+        self.urgent = RingBuffer(urgent_capacity)
+        self.overflow_policy = overflow_policy
+
+        self.drops_normal = 0
+        self.drops_urgent = 0
+
+        self.lock = threading.Lock()
+        self.packet_enqueued = threading.Condition(self.lock)
+        self.packet_dequeued = threading.Condition(self.lock)
+
+    def __len__(self):
+        """ Number of packets in both lanes """
+
+        return len(self.normal) + len(self.urgent)
+
+    @property
+    def drops(self):
+        """ Drop counters for each lane """
+
+        return {"normal": self.drops_normal, "urgent": self.drops_urgent}
+
+    def __push(self, packet, urgent):
+        """ Put packet into appropriate lane applying overflow policy, needs to be called with lock acquired """
+
+        lane = self.urgent if urgent else self.normal
+
+        if lane.full:
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                while lane.full:
+                    self.packet_enqueued.notify()
+                    self.packet_dequeued.wait()
+            else:
+                if urgent:
+                    self.drops_urgent += 1
+                else:
+                    self.drops_normal += 1
+                if self.overflow_policy == OVERFLOW_TAIL_DROP:
+                    return False
+                lane.pop()
+
+        lane.push(packet)
+        return True
+
+    def enqueue(self, packet, urgent=False):
+        """ Enqueue single packet, return False if packet has been dropped """
+
+        with self.lock:
+            enqueued = self.__push(packet, urgent)
+            self.packet_enqueued.notify()
+        return enqueued
+
+    def enqueue_batch(self, packets, urgent_test):
+        """ Enqueue batch of packets waking up consumer only once, 'urgent_test' decides which lane each packet goes to, return number of dropped packets """
+
+        drops = 0
+        with self.lock:
+            for packet in packets:
+                drops += not self.__push(packet, urgent_test(packet))
+            self.packet_enqueued.notify()
+        return drops
+
+    def __pop(self):
+        """ Take packet from the queue, needs to be called with lock acquired and at least one packet in the queue """
+
+        return self.urgent.pop() if len(self.urgent) else self.normal.pop()
+
+    def dequeue(self):
+        """ Dequeue single packet, wait if queue is empty """
+
+        with self.lock:
+            while not len(self):
+                self.packet_enqueued.wait()
+            packet = self.__pop()
+            self.packet_dequeued.notify_all()
+        return packet
+
+    def dequeue_batch(self, max_count=None, min_count=1, max_latency=None):
+        """ Dequeue all the packets available in the queue (up to max_count), wait if queue is empty """
+
+        with self.lock:
+            while not len(self):
+                self.packet_enqueued.wait()
+
+            # Optionally hold on till there is at least min_count packets to dequeue, urgent packets or max_latency expiration flush the queue right away
+            if min_count > 1 and max_latency:
+                deadline = time.monotonic() + max_latency
+                while len(self) < min_count and not len(self.urgent) and (timeout := deadline - time.monotonic()) > 0:
+                    self.packet_enqueued.wait(timeout)
+
+            packets = [self.__pop() for _ in range(len(self) if max_count is None else min(max_count, len(self)))]
+            self.packet_dequeued.notify_all()
+        return packets
@@ -44,15 +44,23 @@
 import random
 import threading
 import time
-from ipaddress import AddressValueError, IPv4Address, IPv4Interface, IPv6Address
+from ipaddress import AddressValueError, IPv4Address, IPv4Interface, IPv4Network, IPv6Address, IPv6Network
 
 import loguru
 
 import ps_arp
 import ps_dhcp
+import ps_ether
+import ps_icmpv4
 import ps_icmpv6
+import ps_ipv4
+import ps_ipv6
+import ps_tcp
+import ps_udp
 import stack
 from ipv6_helper import ipv6_eui64, ipv6_multicast_mac, ipv6_solicited_node_multicast
+from mac_address import MAC_BROADCAST, MAC_UNSPECIFIED, MacAddress
+from routing_table import ROUTE_CONNECTED, ROUTE_DHCP, ROUTE_STATIC
 from udp_metadata import UdpMetadata
 from udp_socket import UdpSocket
 
@@ -88,9 +96,9 @@ class PacketHandler:
         # IPv6 unicast addresses can be tied to the same SNM address (and the same multicast MAC). This is important when removing one of unicast addresses,
         # so the other ones keep it's SNM entry in multicast list. Its the simplest solution and imho perfectly valid one in this case.
 
-        self.stack_mac_unicast = stack.mac_address_candidate
+        self.stack_mac_unicast = [MacAddress(_) for _ in stack.mac_address_candidate]
         self.stack_mac_multicast = []
-        self.stack_mac_broadcast = ["ff:ff:ff:ff:ff:ff"]
+        self.stack_mac_broadcast = [MAC_BROADCAST]
 
         self.stack_ipv6_address_candidate = stack.ipv6_address_candidate
         self.stack_ipv6_address = []
@@ -102,6 +110,15 @@ class PacketHandler:
         self.stack_ipv4_multicast = []
         self.stack_ipv4_broadcast = [IPv4Address("255.255.255.255")]
 
+        # Used to tell apart default route obtained from DHCP server
+        self.ipv4_address_dhcp = None
+
+        # Frozen sets of the above addresses used by packet handlers for membership tests, rebuilt every time stack addressing changes
+        self.update_stack_address_sets()
+
+        # Protocol dispatch tables used by packet handlers, rebuilt every time IPv4 or IPv6 protocol support gets enabled or disabled
+        self.update_dispatch_tables()
+
         self.arp_probe_unicast_conflict = set()
 
         # Used for the ICMPv6 ND DAD process
@@ -116,9 +133,10 @@ class PacketHandler:
         # Used to keep IPv4 packet ID last value
         self.ipv4_packet_id = 0
 
-        # Start packed handler so we can receive packets from network
-        threading.Thread(target=self.__thread_packet_handler).start()
-        self.logger.debug("Started packet handler")
+        # Start packed handler workers so we can receive packets from network, each worker serves its own RX queue
+        for worker_id in range(stack.packet_handler_worker_count):
+            threading.Thread(target=self.__thread_packet_handler, args=(worker_id,)).start()
+        self.logger.debug(f"Started packet handler, {stack.packet_handler_worker_count} worker(s)")
 
         if stack.ipv6_support:
             # Assign All IPv6 Nodes multicast address
@@ -132,13 +150,17 @@ class PacketHandler:
                 address, gateway = self.__dhcp_client()
                 if address:
                     stack.ipv4_address_candidate.append((address, gateway))
+                    self.ipv4_address_dhcp = address
             self.stack_ipv4_address_candidate = self.parse_stack_ipv4_address_candidate()
             self.create_stack_ipv4_addressing()
 
+        # Install statically configured routes
+        self.create_stack_static_routes()
+
         # Log all the addresses stack will listen on
-        self.logger.info(f"Stack listening on unicast MAC addresses: {self.stack_mac_unicast}")
-        self.logger.info(f"Stack listening on multicast MAC addresses: {list(set(self.stack_mac_multicast))}")
-        self.logger.info(f"Stack listening on brodcast MAC addresses: {self.stack_mac_broadcast}")
+        self.logger.info(f"Stack listening on unicast MAC addresses: {[str(_) for _ in self.stack_mac_unicast]}")
+        self.logger.info(f"Stack listening on multicast MAC addresses: {[str(_) for _ in set(self.stack_mac_multicast)]}")
+        self.logger.info(f"Stack listening on brodcast MAC addresses: {[str(_) for _ in self.stack_mac_broadcast]}")
 
         if stack.ipv6_support:
             self.logger.info(f"Stack listening on unicast IPv6 addresses: {[str(_) for _ in self.stack_ipv6_unicast]}")
@@ -149,11 +171,12 @@ class PacketHandler:
             self.logger.info(f"Stack listening on multicast IPv4 addresses: {[str(_) for _ in self.stack_ipv4_multicast]}")
             self.logger.info(f"Stack listening on brodcast IPv4 addresses: {[str(_) for _ in self.stack_ipv4_broadcast]}")
 
-    def __thread_packet_handler(self):
-        """ Thread picks up incoming packets from RX ring and process them """
+    def __thread_packet_handler(self, worker_id):
+        """ Thread picks up incoming packets from worker's RX queue and process them """
 
         while True:
-            self.phrx_ether(stack.rx_ring.dequeue())
+            for ether_packet_rx in stack.rx_ring.dequeue(worker_id):
+                self.phrx_ether(ether_packet_rx)
 
     def perform_ipv6_nd_dad(self, ipv6_unicast_candidate):
         """ Perform IPv6 ND Duplicate Address Detection, return True if passed """
@@ -195,6 +218,7 @@ class PacketHandler:
         if not self.stack_ipv6_address:
             self.logger.warning("Unable to assign any IPv6 link local address, disabling IPv6 protocol")
             stack.ipv6_support = False
+            self.update_dispatch_tables()
             return
 
         # Check if there are any other statically assigned addresses
@@ -219,6 +243,10 @@ class PacketHandler:
                     self.stack_ipv6_address.append(ipv6_address_candidate)
                     self.assign_ipv6_unicast(ipv6_address_candidate.ip)
 
+        # Install connected route of each address in the address's own routing table
+        for ipv6_address in self.stack_ipv6_address:
+            stack.routing_table.add_route(ipv6_address.network, egress_address=ipv6_address, origin=ROUTE_CONNECTED)
+
     def parse_stack_ipv4_address_candidate(self):
         """ Parse IPv4 candidate addresses configured in stack.py module """
 
@@ -284,6 +312,7 @@ class PacketHandler:
         if not self.stack_ipv4_address:
             self.logger.warning("Unable to assign any IPv4 address, disabling IPv4 protocol")
             stack.ipv4_support = False
+            self.update_dispatch_tables()
             return
 
         # Create list containing IP unicast adresses stack shuld listen to
@@ -300,16 +329,44 @@ class PacketHandler:
             if ipv4_address.network.broadcast_address not in self.stack_ipv4_broadcast:
                 self.stack_ipv4_broadcast.append(ipv4_address.network.broadcast_address)
 
+        self.update_stack_address_sets()
+
+        # Install connected route and default route (if gateway is set) of each address in the address's own routing table
+        for ipv4_address in self.stack_ipv4_address:
+            stack.routing_table.add_route(ipv4_address.network, egress_address=ipv4_address, origin=ROUTE_CONNECTED)
+            if ipv4_address.gateway:
+                stack.routing_table.add_route(
+                    IPv4Network("0.0.0.0/0"),
+                    gateway=ipv4_address.gateway,
+                    egress_address=ipv4_address,
+                    origin=ROUTE_DHCP if ipv4_address == self.ipv4_address_dhcp else ROUTE_STATIC,
+                )
+
+    def create_stack_static_routes(self):
+        """ Install static routes configured in stack.py module """
+
+        for ip_network, ip_address, static_routes, support in (
+            (IPv4Network, IPv4Address, stack.ipv4_static_routes, stack.ipv4_support),
+            (IPv6Network, IPv6Address, stack.ipv6_static_routes, stack.ipv6_support),
+        ):
+            if not support:
+                continue
+            for prefix, gateway in static_routes:
+                try:
+                    stack.routing_table.add_route(ip_network(prefix), gateway=ip_address(gateway), origin=ROUTE_STATIC)
+                except ValueError:
+                    self.logger.warning(f"Invalid static route ('{prefix}', '{gateway}') configured, skiping...")
+
     def send_arp_probe(self, ipv4_unicast):
         """ Send out ARP probe to detect possible IP conflict """
 
         self.phtx_arp(
             ether_src=self.stack_mac_unicast[0],
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REQUEST,
             arp_sha=self.stack_mac_unicast[0],
             arp_spa=IPv4Address("0.0.0.0"),
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=ipv4_unicast,
         )
         self.logger.debug(f"Sent out ARP probe for {ipv4_unicast}")
@@ -319,11 +376,11 @@ class PacketHandler:
 
         self.phtx_arp(
             ether_src=self.stack_mac_unicast[0],
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REQUEST,
             arp_sha=self.stack_mac_unicast[0],
             arp_spa=ipv4_unicast,
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=ipv4_unicast,
         )
         self.logger.debug(f"Sent out ARP Announcement for {ipv4_unicast}")
@@ -333,11 +390,11 @@ class PacketHandler:
 
         self.phtx_arp(
             ether_src=self.stack_mac_unicast[0],
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REPLY,
             arp_sha=self.stack_mac_unicast[0],
             arp_spa=ipv4_unicast,
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=ipv4_unicast,
         )
         self.logger.debug(f"Sent out Gratitous ARP for {ipv4_unicast}")
@@ -385,10 +442,47 @@ class PacketHandler:
         )
         self.logger.debug("Sent out ICMPv6 ND Router Solicitation")
 
+    def update_stack_address_sets(self):
+        """ Rebuild frozen sets of addresses stack listens on and sends from, each set is replaced in single assignment so workers never see partial update """
+
+        self.stack_mac_rx_set = frozenset({*self.stack_mac_unicast, *self.stack_mac_multicast, *self.stack_mac_broadcast})
+        self.stack_ipv4_rx_set = frozenset({*self.stack_ipv4_unicast, *self.stack_ipv4_multicast, *self.stack_ipv4_broadcast})
+        self.stack_ipv4_tx_set = self.stack_ipv4_rx_set | {IPv4Address("0.0.0.0")}
+        self.stack_ipv6_rx_set = frozenset({*self.stack_ipv6_unicast, *self.stack_ipv6_multicast})
+        self.stack_ipv6_tx_set = self.stack_ipv6_rx_set | {IPv6Address("::")}
+
+        # Cached flows may carry source address that is no longer valid
+        stack.flow_cache.invalidate()
+
+    def update_dispatch_tables(self):
+        """ Rebuild tables mapping Ethernet type, IPv4 protocol and IPv6 next header values to inbound packet handlers of enabled protocols """
+
+        ether_type_dispatch = {}
+        ipv4_proto_dispatch = {}
+        ipv6_next_dispatch = {}
+
+        if stack.ipv4_support:
+            ether_type_dispatch[ps_ether.ETHER_TYPE_ARP] = lambda ether_packet_rx: self.phrx_arp(ether_packet_rx, ps_arp.ArpPacket(ether_packet_rx))
+            ether_type_dispatch[ps_ether.ETHER_TYPE_IP4] = lambda ether_packet_rx: self.phrx_ipv4(ps_ipv4.Ip4Packet(ether_packet_rx))
+            ipv4_proto_dispatch[ps_ipv4.IP4_PROTO_ICMP4] = lambda ipv4_packet_rx: self.phrx_icmpv4(ipv4_packet_rx, ps_icmpv4.Icmp4Packet(ipv4_packet_rx))
+            ipv4_proto_dispatch[ps_ipv4.IP4_PROTO_UDP] = lambda ipv4_packet_rx: self.phrx_udp(ipv4_packet_rx, ps_udp.UdpPacket(ipv4_packet_rx))
+            ipv4_proto_dispatch[ps_ipv4.IP4_PROTO_TCP] = lambda ipv4_packet_rx: self.phrx_tcp(ipv4_packet_rx, ps_tcp.TcpPacket(ipv4_packet_rx))
+
+        if stack.ipv6_support:
+            ether_type_dispatch[ps_ether.ETHER_TYPE_IP6] = lambda ether_packet_rx: self.phrx_ipv6(ps_ipv6.Ip6Packet(ether_packet_rx))
+            ipv6_next_dispatch[ps_ipv6.IP6_NEXT_HEADER_ICMP6] = lambda ipv6_packet_rx: self.phrx_icmpv6(ipv6_packet_rx, ps_icmpv6.Icmp6Packet(ipv6_packet_rx))
+            ipv6_next_dispatch[ps_ipv6.IP6_NEXT_HEADER_UDP] = lambda ipv6_packet_rx: self.phrx_udp(ipv6_packet_rx, ps_udp.UdpPacket(ipv6_packet_rx))
+            ipv6_next_dispatch[ps_ipv6.IP6_NEXT_HEADER_TCP] = lambda ipv6_packet_rx: self.phrx_tcp(ipv6_packet_rx, ps_tcp.TcpPacket(ipv6_packet_rx))
+
+        self.ether_type_dispatch = ether_type_dispatch
+        self.ipv4_proto_dispatch = ipv4_proto_dispatch
+        self.ipv6_next_dispatch = ipv6_next_dispatch
+
     def assign_ipv6_unicast(self, ipv6_unicast):
         """ Assign IPv6 unicast address to the list stack listens on """
 
         self.stack_ipv6_unicast.append(ipv6_unicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Assigned IPv6 unicast {ipv6_unicast}")
         self.assign_ipv6_multicast(ipv6_solicited_node_multicast(ipv6_unicast))
 
@@ -396,6 +490,7 @@ class PacketHandler:
         """ Remove IPv6 unicast address from the list stack listens on """
 
         self.stack_ipv6_unicast.remove(ipv6_unicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Removed IPv6 unicast {ipv6_unicast}")
         self.remove_ipv6_multicast(ipv6_solicited_node_multicast(ipv6_unicast))
 
@@ -403,6 +498,7 @@ class PacketHandler:
         """ Assign IPv6 multicast address to the list stack listens on """
 
         self.stack_ipv6_multicast.append(ipv6_multicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Assigned IPv6 multicast {ipv6_multicast}")
         self.assign_mac_multicast(ipv6_multicast_mac(ipv6_multicast))
 
@@ -414,6 +510,7 @@ class PacketHandler:
         """ Remove IPv6 multicast address from the list stack listens on """
 
         self.stack_ipv6_multicast.remove(ipv6_multicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Removed IPv6 multicast {ipv6_multicast}")
         self.remove_mac_multicast(ipv6_multicast_mac(ipv6_multicast))
 
@@ -421,24 +518,28 @@ class PacketHandler:
         """ Assign MAC unicast address to the list stack listens on """
 
         self.stack_mac_unicast.append(mac_unicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Assigned MAC unicast {mac_unicast}")
 
     def remove_mac_unicast(self, mac_unicast):
         """ Remove MAC unicast address from the list stack listens on """
 
         self.stack_mac_unicast.remove(mac_unicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Removed MAC unicast {mac_unicast}")
 
     def assign_mac_multicast(self, mac_multicast):
         """ Assign MAC multicast address to the list stack listens on """
 
         self.stack_mac_multicast.append(mac_multicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Assigned MAC multicast {mac_multicast}")
 
     def remove_mac_multicast(self, mac_multicast):
         """ Remove MAC multicast address from the list stack listens on """
 
         self.stack_mac_multicast.remove(mac_multicast)
+        self.update_stack_address_sets()
         self.logger.debug(f"Removed MAC multicast {mac_multicast}")
 
     def __dhcp_client(self):
@@ -99,11 +99,11 @@ def phrx_arp(self, ether_packet_rx, arp_packet_rx):
         # Update ARP cache with maping received as direct ARP reply
         if ether_packet_rx.ether_dst == self.stack_mac_unicast[0]:
             self.logger.debug(f"Adding/refreshing ARP cache entry from direct reply - {arp_packet_rx.arp_spa} -> {arp_packet_rx.arp_sha}")
-            stack.arp_cache.add_entry(arp_packet_rx.arp_spa, arp_packet_rx.arp_sha)
+            stack.arp_cache.add_entry(arp_packet_rx.arp_spa, arp_packet_rx.arp_sha, confirmed=True)
             return
 
         # Update ARP cache with maping received as gratuitous ARP reply
-        if ether_packet_rx.ether_dst == "ff:ff:ff:ff:ff:ff" and arp_packet_rx.arp_spa == arp_packet_rx.arp_tpa and ARP_CACHE_UPDATE_FROM_GRATUITOUS_REPLY:
+        if ether_packet_rx.ether_dst.is_broadcast and arp_packet_rx.arp_spa == arp_packet_rx.arp_tpa and ARP_CACHE_UPDATE_FROM_GRATUITOUS_REPLY:
             self.logger.debug(f"Adding/refreshing ARP cache entry from gratuitous reply - {arp_packet_rx.arp_spa} -> {arp_packet_rx.arp_sha}")
             stack.arp_cache.add_entry(arp_packet_rx.arp_spa, arp_packet_rx.arp_sha)
             return
@@ -41,11 +41,7 @@
 #
 
 
-import ps_arp
 import ps_ether
-import ps_ipv4
-import ps_ipv6
-import stack
 
 
 def phrx_ether(self, ether_packet_rx):
@@ -59,18 +55,10 @@ def phrx_ether(self, ether_packet_rx):
         return
 
     # Check if received packet matches any of stack MAC addresses
-    if ether_packet_rx.ether_dst not in {*self.stack_mac_unicast, *self.stack_mac_multicast, *self.stack_mac_broadcast}:
+    if ether_packet_rx.ether_dst not in self.stack_mac_rx_set:
         self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker} - Ethernet packet not destined for this stack, droping")
         return
 
-    if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_ARP and stack.ipv4_support:
-        self.phrx_arp(ether_packet_rx, ps_arp.ArpPacket(ether_packet_rx))
-        return
-
-    if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_IP4 and stack.ipv4_support:
-        self.phrx_ipv4(ps_ipv4.Ip4Packet(ether_packet_rx))
-        return
-
-    if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_IP6 and stack.ipv6_support:
-        self.phrx_ipv6(ps_ipv6.Ip6Packet(ether_packet_rx))
-        return
+    # Pass packet to the handler of its protocol, packets of unsupported or disabled protocols are silently dropped
+    if handler := self.ether_type_dispatch.get(ether_packet_rx.ether_type):
+        handler(ether_packet_rx)
@@ -65,6 +65,7 @@ def phrx_icmpv4(self, ipv4_packet_rx, icmpv4_packet_rx):
             icmpv4_ec_id=icmpv4_packet_rx.icmpv4_ec_id,
             icmpv4_ec_seq=icmpv4_packet_rx.icmpv4_ec_seq,
             icmpv4_ec_raw_data=icmpv4_packet_rx.icmpv4_ec_raw_data,
+            icmpv4_ec_request_cksum=icmpv4_packet_rx.icmpv4_cksum,
             echo_tracker=icmpv4_packet_rx.tracker,
         )
         return
@@ -41,8 +41,11 @@
 #
 
 
+from ipaddress import IPv6Network
+
 import ps_icmpv6
 import stack
+from routing_table import ROUTE_RA
 
 
 def phrx_icmpv6(self, ipv6_packet_rx, icmpv6_packet_rx):
@@ -112,7 +115,9 @@ def phrx_icmpv6(self, ipv6_packet_rx, icmpv6_packet_rx):
 
         # Update ICMPv6 ND cache
         if icmpv6_packet_rx.icmpv6_nd_opt_tlla:
-            stack.icmpv6_nd_cache.add_entry(icmpv6_packet_rx.icmpv6_na_target_address, icmpv6_packet_rx.icmpv6_nd_opt_tlla)
+            stack.icmpv6_nd_cache.add_entry(
+                icmpv6_packet_rx.icmpv6_na_target_address, icmpv6_packet_rx.icmpv6_nd_opt_tlla, confirmed=icmpv6_packet_rx.icmpv6_na_flag_s
+            )
             return
 
         return
@@ -129,6 +134,26 @@ def phrx_icmpv6(self, ipv6_packet_rx, icmpv6_packet_rx):
 
         self.logger.debug(f"Received ICMPv6 Router Advertisement packet from {ipv6_packet_rx.ipv6_src}")
 
+        # Install or withdraw default route via the advertising router, router lifetime of zero means router should not be used as default one
+        # and the route gets withdrawn only if it points to that router, otherwise it expires when router lifetime runs out
+        if icmpv6_packet_rx.icmpv6_ra_router_lifetime:
+            stack.routing_table.add_route(
+                IPv6Network("::/0"), gateway=ipv6_packet_rx.ipv6_src, origin=ROUTE_RA, lifetime=icmpv6_packet_rx.icmpv6_ra_router_lifetime
+            )
+        else:
+            stack.routing_table.remove_route(IPv6Network("::/0"), gateway=ipv6_packet_rx.ipv6_src, origin=ROUTE_RA)
+
+        # Install routes for advertised on-link prefixes, they expire when prefix valid lifetime runs out (all ones means infinity)
+        for icmpv6_nd_option in icmpv6_packet_rx.icmpv6_nd_options:
+            if icmpv6_nd_option.opt_code == ps_icmpv6.ICMP6_ND_OPT_PI and icmpv6_nd_option.opt_flag_l:
+                if icmpv6_nd_option.opt_valid_lifetime == 0:
+                    stack.routing_table.remove_route(icmpv6_nd_option.opt_prefix, origin=ROUTE_RA)
+                    continue
+                lifetime = icmpv6_nd_option.opt_valid_lifetime
+                stack.routing_table.add_route(
+                    icmpv6_nd_option.opt_prefix, origin=ROUTE_RA, lifetime=None if lifetime == ps_icmpv6.ICMP6_ND_OPT_PI_LIFETIME_INFINITY else lifetime
+                )
+
         # Make note of prefixes that can be used for address autoconfiguration
         self.icmpv6_ra_prefixes = icmpv6_packet_rx.icmpv6_nd_opt_pi
         self.event_icmpv6_ra.release()
@@ -146,6 +171,8 @@ def phrx_icmpv6(self, ipv6_packet_rx, icmpv6_packet_rx):
             icmpv6_ec_id=icmpv6_packet_rx.icmpv6_ec_id,
             icmpv6_ec_seq=icmpv6_packet_rx.icmpv6_ec_seq,
             icmpv6_ec_raw_data=icmpv6_packet_rx.icmpv6_ec_raw_data,
+            icmpv6_ec_request_cksum=icmpv6_packet_rx.icmpv6_cksum,
+            icmpv6_ec_request_ip_pseudo_header=ipv6_packet_rx.ip_pseudo_header,
             echo_tracker=icmpv6_packet_rx.tracker,
         )
         return
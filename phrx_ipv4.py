@@ -42,10 +42,6 @@
 
 
 import inet_cksum
-import ps_icmpv4
-import ps_ipv4
-import ps_tcp
-import ps_udp
 
 ipv4_fragments = {}
 
@@ -53,29 +49,33 @@ ipv4_fragments = {}
 def handle_ipv4_fragmentation(ipv4_packet_rx):
     """ Check if packet is fragmented """
 
+    # Fragments are identified by addresses, protocol and packet id, flow hash steers all of them to the same packet handler worker
+    # so each fragment flow is only ever touched by single worker
+    fragment_flow_id = (ipv4_packet_rx.ipv4_src, ipv4_packet_rx.ipv4_dst, ipv4_packet_rx.ipv4_proto, ipv4_packet_rx.ipv4_packet_id)
+
     # Check if IP packet is a first fragment
     if ipv4_packet_rx.ipv4_frag_offset == 0 and ipv4_packet_rx.ipv4_frag_mf:
-        ipv4_fragments[ipv4_packet_rx.ipv4_packet_id] = {}
-        ipv4_fragments[ipv4_packet_rx.ipv4_packet_id][ipv4_packet_rx.ipv4_frag_offset] = ipv4_packet_rx.raw_data
+        ipv4_fragments[fragment_flow_id] = {}
+        ipv4_fragments[fragment_flow_id][ipv4_packet_rx.ipv4_frag_offset] = ipv4_packet_rx.raw_data
         return None
 
     # Check if IP packet is one of middle fragments
     if ipv4_packet_rx.ipv4_frag_offset != 0 and ipv4_packet_rx.ipv4_frag_mf:
         # Check if packet is part of existing fagment flow
-        if ipv4_fragments.get(ipv4_packet_rx.ipv4_packet_id, None):
-            ipv4_fragments[ipv4_packet_rx.ipv4_packet_id][ipv4_packet_rx.ipv4_frag_offset] = ipv4_packet_rx.raw_data
+        if ipv4_fragments.get(fragment_flow_id, None):
+            ipv4_fragments[fragment_flow_id][ipv4_packet_rx.ipv4_frag_offset] = ipv4_packet_rx.raw_data
         return None
 
     # Check if IP packet is last fragment
     if ipv4_packet_rx.ipv4_frag_offset != 0 and not ipv4_packet_rx.ipv4_frag_mf:
 
         # Check if packet is part of existing fagment flow
-        if ipv4_fragments.get(ipv4_packet_rx.ipv4_packet_id, None):
-            ipv4_fragments[ipv4_packet_rx.ipv4_packet_id][ipv4_packet_rx.ipv4_frag_offset] = ipv4_packet_rx.raw_data
+        if ipv4_fragments.get(fragment_flow_id, None):
+            ipv4_fragments[fragment_flow_id][ipv4_packet_rx.ipv4_frag_offset] = ipv4_packet_rx.raw_data
 
             raw_data = b""
-            for offset in sorted(ipv4_fragments[ipv4_packet_rx.ipv4_packet_id]):
-                raw_data += ipv4_fragments[ipv4_packet_rx.ipv4_packet_id][offset]
+            for offset in sorted(ipv4_fragments[fragment_flow_id]):
+                raw_data += ipv4_fragments[fragment_flow_id][offset]
 
             # Craft complete IP packet based on last fragment for further processing
             ipv4_packet_rx.ipv4_frag_mf = False
@@ -94,7 +94,7 @@ def phrx_ipv4(self, ipv4_packet_rx):
     self.logger.debug(f"{ipv4_packet_rx.tracker} - {ipv4_packet_rx}")
 
     # Check if received packet has been sent to us directly or by unicast/broadcast, allow any destination if no unicast address is configured (for DHCP client)
-    if self.stack_ipv4_unicast and ipv4_packet_rx.ipv4_dst not in {*self.stack_ipv4_unicast, *self.stack_ipv4_multicast, *self.stack_ipv4_broadcast}:
+    if self.stack_ipv4_unicast and ipv4_packet_rx.ipv4_dst not in self.stack_ipv4_rx_set:
         self.logger.debug(f"{ipv4_packet_rx.tracker} - IP packet not destined for this stack, droping")
         return
 
@@ -108,14 +108,5 @@ def phrx_ipv4(self, ipv4_packet_rx):
     if not ipv4_packet_rx:
         return
 
-    if ipv4_packet_rx.ipv4_proto == ps_ipv4.IP4_PROTO_ICMP4:
-        self.phrx_icmpv4(ipv4_packet_rx, ps_icmpv4.Icmp4Packet(ipv4_packet_rx))
-        return
-
-    if ipv4_packet_rx.ipv4_proto == ps_ipv4.IP4_PROTO_UDP:
-        self.phrx_udp(ipv4_packet_rx, ps_udp.UdpPacket(ipv4_packet_rx))
-        return
-
-    if ipv4_packet_rx.ipv4_proto == ps_ipv4.IP4_PROTO_TCP:
-        self.phrx_tcp(ipv4_packet_rx, ps_tcp.TcpPacket(ipv4_packet_rx))
-        return
+    if handler := self.ipv4_proto_dispatch.get(ipv4_packet_rx.ipv4_proto):
+        handler(ipv4_packet_rx)
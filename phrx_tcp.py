@@ -52,8 +52,8 @@ def phrx_tcp(self, ip_packet_rx, tcp_packet_rx):
 
     self.logger.opt(ansi=True).info(f"<green>{tcp_packet_rx.tracker}</green> - {tcp_packet_rx}")
 
-    # Validate TCP packet checksum
-    if not tcp_packet_rx.validate_cksum(ip_packet_rx.ip_pseudo_header):
+    # Validate TCP packet checksum, unless kernel already did it
+    if not (tcp_packet_rx.vnet_header and tcp_packet_rx.vnet_header.cksum_valid) and not tcp_packet_rx.validate_cksum(ip_packet_rx.ip_pseudo_header):
         self.logger.debug(f"{tcp_packet_rx.tracker} - TCP packet has invalid checksum, droping")
         return
 
@@ -76,6 +76,9 @@ def phrx_tcp(self, ip_packet_rx, tcp_packet_rx):
         win=tcp_packet_rx.tcp_win,
         wscale=tcp_packet_rx.tcp_wscale,
         mss=tcp_packet_rx.tcp_mss,
+        sackperm=tcp_packet_rx.tcp_sackperm,
+        sack=tcp_packet_rx.tcp_sack,
+        timestamp=tcp_packet_rx.tcp_timestamp,
         raw_data=tcp_packet_rx.raw_data,
         tracker=tcp_packet_rx.tracker,
     )
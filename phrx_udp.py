@@ -56,8 +56,8 @@ def phrx_udp(self, ip_packet_rx, udp_packet_rx):
 
     self.logger.opt(ansi=True).info(f"<green>{udp_packet_rx.tracker}</green> - {udp_packet_rx}")
 
-    # Validate UDP packet checksum
-    if not udp_packet_rx.validate_cksum(ip_packet_rx.ip_pseudo_header):
+    # Validate UDP packet checksum, unless kernel already did it
+    if not (udp_packet_rx.vnet_header and udp_packet_rx.vnet_header.cksum_valid) and not udp_packet_rx.validate_cksum(ip_packet_rx.ip_pseudo_header):
         self.logger.debug(f"{udp_packet_rx.tracker} - UDP packet has invalid checksum, droping")
         return
 
@@ -71,7 +71,7 @@ def phrx_udp(self, ip_packet_rx, udp_packet_rx):
         local_port=udp_packet_rx.udp_dport,
         remote_ip_address=ip_packet_rx.ip_src,
         remote_port=udp_packet_rx.udp_sport,
-        raw_data=udp_packet_rx.raw_data,
+        raw_data=bytes(udp_packet_rx.raw_data),
         tracker=udp_packet_rx.tracker,
     )
 
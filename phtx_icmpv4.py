@@ -54,6 +54,7 @@ def phtx_icmpv4(
     icmpv4_ec_id=None,
     icmpv4_ec_seq=None,
     icmpv4_ec_raw_data=None,
+    icmpv4_ec_request_cksum=None,
     icmpv4_un_raw_data=None,
     echo_tracker=None,
 ):
@@ -69,6 +70,7 @@ def phtx_icmpv4(
         icmpv4_ec_id=icmpv4_ec_id,
         icmpv4_ec_seq=icmpv4_ec_seq,
         icmpv4_ec_raw_data=icmpv4_ec_raw_data,
+        icmpv4_ec_request_cksum=icmpv4_ec_request_cksum,
         icmpv4_un_raw_data=icmpv4_un_raw_data,
         echo_tracker=echo_tracker,
     )
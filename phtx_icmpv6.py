@@ -56,6 +56,8 @@ def phtx_icmpv6(
     icmpv6_ec_id=None,
     icmpv6_ec_seq=None,
     icmpv6_ec_raw_data=None,
+    icmpv6_ec_request_cksum=None,
+    icmpv6_ec_request_ip_pseudo_header=None,
     icmpv6_ns_target_address=None,
     icmpv6_na_flag_r=False,
     icmpv6_na_flag_s=False,
@@ -78,6 +80,8 @@ def phtx_icmpv6(
         icmpv6_ec_id=icmpv6_ec_id,
         icmpv6_ec_seq=icmpv6_ec_seq,
         icmpv6_ec_raw_data=icmpv6_ec_raw_data,
+        icmpv6_ec_request_cksum=icmpv6_ec_request_cksum,
+        icmpv6_ec_request_ip_pseudo_header=icmpv6_ec_request_ip_pseudo_header,
         icmpv6_ns_target_address=icmpv6_ns_target_address,
         icmpv6_na_flag_r=icmpv6_na_flag_r,
         icmpv6_na_flag_s=icmpv6_na_flag_s,
@@ -41,20 +41,22 @@
 #
 
 
-import socket
-import struct
 from ipaddress import IPv4Address
 
 import ps_ether
 import ps_ipv4
 import stack
+from flow_cache import FlowCache
+from mac_address import MAC_BROADCAST, MAC_UNSPECIFIED
+from next_hop import NextHop
+from routing_table import ROUTE_CONNECTED
 
 
 def validate_src_ipv4_address(self, ipv4_src):
     """ Make sure source ip address is valid, supplemt with valid one as appropriate """
 
     # Check if the the source IP address belongs to this stack or its set to all zeros (for DHCP client comunication)
-    if ipv4_src not in {*self.stack_ipv4_unicast, *self.stack_ipv4_multicast, *self.stack_ipv4_broadcast, IPv4Address("0.0.0.0")}:
+    if ipv4_src not in self.stack_ipv4_tx_set:
         self.logger.warning(f"Unable to sent out IPv4 packet, stack doesn't own IPv4 address {ipv4_src}")
         return None
 
@@ -89,54 +91,103 @@ def validate_src_ipv4_address(self, ipv4_src):
     return ipv4_src
 
 
-def phtx_ipv4(self, child_packet, ipv4_dst, ipv4_src):
-    """ Handle outbound IP packets """
+def find_next_hop_ipv4(self, ipv4_src, ipv4_dst):
+    """ Make routing decision for packet, return next hop or None if packet cannot be routed """
+
+    # Packets destined to limited broadcast address are sent to broadcast MAC
+    if ipv4_dst == IPv4Address("255.255.255.255"):
+        return NextHop(ipv4_dst, MAC_BROADCAST)
+
+    if not (route := stack.routing_table.find_route(ipv4_dst, ipv4_src)):
+        # Packets sent from all zeros address (DHCP client comunication) are assumed to be destined to on-link host
+        if ipv4_src.is_unspecified:
+            return NextHop(ipv4_dst, stack.arp_cache.find_entry(ipv4_dst) or MAC_UNSPECIFIED)
+        self.logger.debug(f"No route to {ipv4_dst} from {ipv4_src} source address, unable to route packet")
+        return None
+
+    # Packets routed via gateway are sent to gateway's MAC
+    if route.gateway:
+        return NextHop(route.gateway, stack.arp_cache.find_entry(route.gateway) or MAC_UNSPECIFIED, route.egress_address)
+
+    # Packets destined to directed broadcast or network address of connected network are sent to broadcast MAC
+    if route.origin == ROUTE_CONNECTED and ipv4_dst in {route.prefix.network_address, route.prefix.broadcast_address}:
+        return NextHop(ipv4_dst, MAC_BROADCAST, route.egress_address)
+
+    return NextHop(ipv4_dst, stack.arp_cache.find_entry(ipv4_dst) or MAC_UNSPECIFIED, route.egress_address)
+
+
+def find_flow_ipv4(self, ipv4_src, ipv4_dst):
+    """ Find flow in flow cache, if there is none then validate source address, make routing decision and cache it """
+
+    if flow := stack.flow_cache.find_flow(ipv4_src, ipv4_dst):
+        return flow
+
+    # Validate source address
+    ipv4_src_validated = validate_src_ipv4_address(self, ipv4_src)
+    if not ipv4_src_validated:
+        return None
+
+    # Make routing decision
+    next_hop = find_next_hop_ipv4(self, ipv4_src_validated, ipv4_dst)
+    if not next_hop:
+        return None
+
+    # Flows with unresolved next hop are not cached so the next packet makes another resolution attempt
+    if not next_hop.is_resolved:
+        return FlowCache.Flow(ipv4_src_validated, ipv4_dst, next_hop)
+
+    return stack.flow_cache.add_flow(ipv4_src, ipv4_dst, ipv4_src_validated, next_hop)
+
+
+def phtx_ipv4(self, child_packet, ipv4_dst, ipv4_src, urgent=False, flow=None):
+    """ Handle outbound IP packets, sender may pass its pinned flow cache entry to skip the lookup """
 
     # Check if IPv4 protocol support is enabled, if not then silently drop the packet
     if not stack.ipv4_support:
         return
 
-    # Make sure source and destination addresses are the right object type
-    ipv4_src = IPv4Address(ipv4_src)
-    ipv4_dst = IPv4Address(ipv4_dst)
+    # Use flow pinned by sender as long as it's valid, otherwise find it making sure addresses are the right object type
+    if not (flow and flow.valid):
+        flow = find_flow_ipv4(self, IPv4Address(ipv4_src), IPv4Address(ipv4_dst))
+        if not flow:
+            return
 
-    # Validate source address
-    ipv4_src = validate_src_ipv4_address(self, ipv4_src)
-    if not ipv4_src:
-        return
+    # All fragments of the packet share the same routing decision
+    flow.hit_count += 1
+    ipv4_src = flow.ip_src
+    ipv4_dst = flow.ip_dst
+    next_hop = flow.next_hop
 
     # Generate new IPv4 ID
     self.ipv4_packet_id += 1
     if self.ipv4_packet_id > 65535:
         self.ipv4_packet_id = 1
 
-    # Check if packet can be sent out without fragmentation, if so send it out
-    if ps_ipv4.IP4_HEADER_LEN + len(child_packet.raw_packet) <= stack.mtu:
+    # Check if packet can be sent out without fragmentation, if so send it out (packets to be segmented by kernel never get fragmented)
+    vnet_header = getattr(child_packet, "vnet_header", None)
+    if ps_ipv4.IP4_HEADER_LEN + len(child_packet) <= stack.mtu or (vnet_header and vnet_header.vnet_gso_size):
         ipv4_packet_tx = ps_ipv4.Ip4Packet(ipv4_src=ipv4_src, ipv4_dst=ipv4_dst, ipv4_packet_id=self.ipv4_packet_id, child_packet=child_packet)
 
         self.logger.debug(f"{ipv4_packet_tx.tracker} - {ipv4_packet_tx}")
-        self.phtx_ether(child_packet=ipv4_packet_tx)
+        self.phtx_ether(child_packet=ipv4_packet_tx, next_hop=next_hop, urgent=urgent)
         return
 
     # Fragment packet and send all fragments out
     self.logger.debug("Packet exceedes available MTU, IP fragmentation needed...")
 
+    # Checksum cannot be offloaded to kernel as fragments don't carry complete transport header
+    if vnet_header:
+        child_packet.vnet_header = None
+
     if child_packet.protocol == "ICMPv4":
         ipv4_proto = ps_ipv4.IP4_PROTO_ICMP4
-        raw_data = child_packet.get_raw_packet()
+        raw_data = child_packet.get_tx_buffer().data
 
     if child_packet.protocol in {"UDP", "TCP"}:
         ipv4_proto = ps_ipv4.IP4_PROTO_UDP if child_packet.protocol == "UDP" else ps_ipv4.IP4_PROTO_TCP
-        raw_data = child_packet.get_raw_packet(
-            struct.pack(
-                "! 4s 4s BBH",
-                socket.inet_aton(ipv4_src),
-                socket.inet_aton(ipv4_dst),
-                0,
-                ipv4_proto,
-                len(child_packet.raw_packet),
-            )
-        )
+        raw_data = child_packet.get_tx_buffer(
+            ps_ipv4.IP4_PSEUDO_HEADER_STRUCT.pack(ipv4_src.packed, ipv4_dst.packed, 0, ipv4_proto, len(child_packet))
+        ).data
 
     raw_data_mtu = (stack.mtu - ps_ether.ETHER_HEADER_LEN - ps_ipv4.IP4_HEADER_LEN) & 0b1111111111111000
     raw_data_fragments = [raw_data[_ : raw_data_mtu + _] for _ in range(0, len(raw_data), raw_data_mtu)]
@@ -159,6 +210,6 @@ def phtx_ipv4(self, child_packet, ipv4_dst, ipv4_src):
         offset += len(raw_data_fragment)
 
         self.logger.debug(f"{ipv4_packet_tx.tracker} - {ipv4_packet_tx}")
-        self.phtx_ether(child_packet=ipv4_packet_tx)
+        self.phtx_ether(child_packet=ipv4_packet_tx, next_hop=next_hop, urgent=urgent)
 
     return
@@ -45,13 +45,17 @@ from ipaddress import IPv6Address
 
 import ps_ipv6
 import stack
+from flow_cache import FlowCache
+from ipv6_helper import ipv6_multicast_mac
+from mac_address import MAC_UNSPECIFIED
+from next_hop import NextHop
 
 
 def validate_src_ipv6_address(self, ipv6_src):
     """ Make sure source ip address is valid, supplemt with valid one as appropriate """
 
     # Check if the the source IP address belongs to this stack or its set to all zeros (for ND DAD)
-    if ipv6_src not in {*self.stack_ipv6_unicast, *self.stack_ipv6_multicast, IPv6Address("::")}:
+    if ipv6_src not in self.stack_ipv6_tx_set:
         self.logger.warning(f"Unable to sent out IPv6 packet, stack doesn't own IPv6 address {ipv6_src}")
         return None
 
@@ -86,33 +90,79 @@ def validate_dst_ipv6_address(ipv6_dst):
     return ipv6_dst
 
 
-def phtx_ipv6(self, child_packet, ipv6_dst, ipv6_src, ipv6_hop=64):
-    """ Handle outbound IP packets """
+def find_next_hop_ipv6(self, ipv6_src, ipv6_dst):
+    """ Make routing decision for packet, return next hop or None if packet cannot be routed """
 
-    # Check if IPv6 protocol support is enabled, if not then silently drop the packet
-    if not stack.ipv6_support:
-        return
+    # Packets destined to multicast address are sent to multicast MAC derived from it
+    if ipv6_dst.is_multicast:
+        return NextHop(ipv6_dst, ipv6_multicast_mac(ipv6_dst))
+
+    if not (route := stack.routing_table.find_route(ipv6_dst, ipv6_src)):
+        # Link local destinations are always on-link
+        if ipv6_dst.is_link_local:
+            return NextHop(ipv6_dst, stack.icmpv6_nd_cache.find_entry(ipv6_dst) or MAC_UNSPECIFIED)
+        self.logger.debug(f"No route to {ipv6_dst} from {ipv6_src} source address, unable to route packet")
+        return None
+
+    # Packets routed via gateway are sent to gateway's MAC
+    if route.gateway:
+        return NextHop(route.gateway, stack.icmpv6_nd_cache.find_entry(route.gateway) or MAC_UNSPECIFIED, route.egress_address)
 
-    # Make sure source and destination addresses are the right object type
-    ipv6_src = IPv6Address(ipv6_src)
-    ipv6_dst = IPv6Address(ipv6_dst)
+    return NextHop(ipv6_dst, stack.icmpv6_nd_cache.find_entry(ipv6_dst) or MAC_UNSPECIFIED, route.egress_address)
+
+
+def find_flow_ipv6(self, ipv6_src, ipv6_dst):
+    """ Find flow in flow cache, if there is none then validate addresses, make routing decision and cache it """
+
+    if flow := stack.flow_cache.find_flow(ipv6_src, ipv6_dst):
+        return flow
 
     # Validate source address
-    ipv6_src = validate_src_ipv6_address(self, ipv6_src)
-    if not ipv6_src:
-        return
+    ipv6_src_validated = validate_src_ipv6_address(self, ipv6_src)
+    if not ipv6_src_validated:
+        return None
 
     # Validate destination address
-    ipv6_dst = validate_dst_ipv6_address(ipv6_dst)
-    if not ipv6_dst:
+    ipv6_dst_validated = validate_dst_ipv6_address(ipv6_dst)
+    if not ipv6_dst_validated:
+        return None
+
+    # Make routing decision
+    next_hop = find_next_hop_ipv6(self, ipv6_src_validated, ipv6_dst_validated)
+    if not next_hop:
+        return None
+
+    # Flows with unresolved next hop are not cached so the next packet makes another resolution attempt
+    if not next_hop.is_resolved:
+        return FlowCache.Flow(ipv6_src_validated, ipv6_dst_validated, next_hop)
+
+    return stack.flow_cache.add_flow(ipv6_src, ipv6_dst, ipv6_src_validated, next_hop, ipv6_dst_validated)
+
+
+def phtx_ipv6(self, child_packet, ipv6_dst, ipv6_src, ipv6_hop=64, urgent=False, flow=None):
+    """ Handle outbound IP packets, sender may pass its pinned flow cache entry to skip the lookup """
+
+    # Check if IPv6 protocol support is enabled, if not then silently drop the packet
+    if not stack.ipv6_support:
         return
 
+    # Use flow pinned by sender as long as it's valid, otherwise find it making sure addresses are the right object type
+    if not (flow and flow.valid):
+        flow = find_flow_ipv6(self, IPv6Address(ipv6_src), IPv6Address(ipv6_dst))
+        if not flow:
+            return
+
+    flow.hit_count += 1
+    ipv6_src = flow.ip_src
+    ipv6_dst = flow.ip_dst
+    next_hop = flow.next_hop
+
     # Check if IP packet can be sent out without fragmentation, if so send it out
-    if ps_ipv6.IP6_HEADER_LEN + len(child_packet.raw_packet) <= stack.mtu:
+    if ps_ipv6.IP6_HEADER_LEN + len(child_packet) <= stack.mtu:
         ipv6_packet_tx = ps_ipv6.Ip6Packet(ipv6_src=ipv6_src, ipv6_dst=ipv6_dst, ipv6_hop=ipv6_hop, child_packet=child_packet)
 
         self.logger.debug(f"{ipv6_packet_tx.tracker} - {ipv6_packet_tx}")
-        self.phtx_ether(child_packet=ipv6_packet_tx)
+        self.phtx_ether(child_packet=ipv6_packet_tx, next_hop=next_hop, urgent=urgent)
         return
 
     # Fragment packet and send all fragments out *** Need to add this functionality ***
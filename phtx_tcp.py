@@ -44,7 +44,7 @@
 from ipaddress import IPv4Address, IPv6Address
 
 import stack
-from ps_tcp import TcpOptMss, TcpOptNop, TcpOptWscale, TcpPacket
+from ps_tcp import TcpOptMss, TcpOptNop, TcpOptSack, TcpOptSackPerm, TcpOptTimestamp, TcpOptWscale, TcpPacket
 
 PACKET_LOSS = False
 
@@ -67,13 +67,19 @@ def phtx_tcp(
     tcp_flag_syn=False,
     tcp_flag_fin=False,
     tcp_mss=None,
+    tcp_wscale=None,
+    tcp_sackperm=False,
+    tcp_sack=None,
+    tcp_timestamp=None,
     tcp_win=0,
     tcp_urp=0,
     raw_data=b"",
     tracker=None,
     echo_tracker=None,
+    tcp_gso_size=0,
+    flow=None,
 ):
-    """ Handle outbound TCP packets """
+    """ Handle outbound TCP packets, in virtio-net header mode packets carrying more than 'tcp_gso_size' bytes of data are segmented by kernel """
 
     # Check if IPv4 protocol support is enabled, if not then silently drop the IPv4 packet
     if not stack.ipv4_support and ip_dst.version == 4:
@@ -87,8 +93,25 @@ def phtx_tcp(
 
     if tcp_mss:
         tcp_options.append(TcpOptMss(opt_mss=tcp_mss))
+
+    if tcp_wscale is not None:
+        tcp_options.append(TcpOptNop())
+        tcp_options.append(TcpOptWscale(opt_wscale=tcp_wscale))
+
+    if tcp_sackperm:
         tcp_options.append(TcpOptNop())
-        tcp_options.append(TcpOptWscale(opt_wscale=0))
+        tcp_options.append(TcpOptNop())
+        tcp_options.append(TcpOptSackPerm())
+
+    if tcp_sack:
+        tcp_options.append(TcpOptNop())
+        tcp_options.append(TcpOptNop())
+        tcp_options.append(TcpOptSack(opt_blocks=tcp_sack))
+
+    if tcp_timestamp:
+        tcp_options.append(TcpOptNop())
+        tcp_options.append(TcpOptNop())
+        tcp_options.append(TcpOptTimestamp(opt_tsval=tcp_timestamp[0], opt_tsecr=tcp_timestamp[1]))
 
     tcp_packet_tx = TcpPacket(
         tcp_sport=tcp_sport,
@@ -110,6 +133,8 @@ def phtx_tcp(
         raw_data=raw_data,
         tracker=tracker,
         echo_tracker=echo_tracker,
+        tcp_cksum_offload=stack.tap_vnet_hdr,
+        tcp_gso_size=tcp_gso_size if stack.tap_vnet_hdr and len(raw_data) > tcp_gso_size else 0,
     )
 
     self.logger.opt(ansi=True).info(f"<magenta>{tcp_packet_tx.tracker}</magenta> - {tcp_packet_tx}")
@@ -125,8 +150,11 @@ def phtx_tcp(
     assert type(ip_src) in {IPv4Address, IPv6Address}
     assert type(ip_dst) in {IPv4Address, IPv6Address}
 
+    # TCP control packets (SYN, RST and pure ACK) are sent using TX ring high priority lane, FIN uses normal lane so it can't overtake data sent before it
+    urgent = tcp_flag_syn or tcp_flag_rst or not (raw_data or tcp_flag_fin)
+
     if ip_src.version == 6 and ip_dst.version == 6:
-        self.phtx_ipv6(ipv6_src=ip_src, ipv6_dst=ip_dst, child_packet=tcp_packet_tx)
+        self.phtx_ipv6(ipv6_src=ip_src, ipv6_dst=ip_dst, child_packet=tcp_packet_tx, urgent=urgent, flow=flow)
 
     if ip_src.version == 4 and ip_dst.version == 4:
-        self.phtx_ipv4(ipv4_src=ip_src, ipv4_dst=ip_dst, child_packet=tcp_packet_tx)
+        self.phtx_ipv4(ipv4_src=ip_src, ipv4_dst=ip_dst, child_packet=tcp_packet_tx, urgent=urgent, flow=flow)
@@ -47,8 +47,8 @@ import ps_udp
 import stack
 
 
-def phtx_udp(self, ip_src, ip_dst, udp_sport, udp_dport, raw_data=b"", echo_tracker=None):
-    """ Handle outbound UDP packets """
+def phtx_udp(self, ip_src, ip_dst, udp_sport, udp_dport, raw_data=b"", echo_tracker=None, flow=None):
+    """ Handle outbound UDP packets, sender may pass its pinned flow cache entry """
 
     # Check if IPv4 protocol support is enabled, if not then silently drop the IPv4 packet
     if not stack.ipv4_support and ip_dst.version == 4:
@@ -58,7 +58,9 @@ def phtx_udp(self, ip_src, ip_dst, udp_sport, udp_dport, raw_data=b"", echo_trac
     if not stack.ipv6_support and ip_dst.version == 6:
         return
 
-    udp_packet_tx = ps_udp.UdpPacket(udp_sport=udp_sport, udp_dport=udp_dport, raw_data=raw_data, echo_tracker=echo_tracker)
+    udp_packet_tx = ps_udp.UdpPacket(
+        udp_sport=udp_sport, udp_dport=udp_dport, raw_data=raw_data, echo_tracker=echo_tracker, udp_cksum_offload=stack.tap_vnet_hdr
+    )
 
     self.logger.opt(ansi=True).info(f"<magenta>{udp_packet_tx.tracker}</magenta> - {udp_packet_tx}")
 
@@ -66,7 +68,7 @@ def phtx_udp(self, ip_src, ip_dst, udp_sport, udp_dport, raw_data=b"", echo_trac
     assert type(ip_dst) in {IPv4Address, IPv6Address}
 
     if ip_src.version == 6 and ip_dst.version == 6:
-        self.phtx_ipv6(ipv6_src=ip_src, ipv6_dst=ip_dst, child_packet=udp_packet_tx)
+        self.phtx_ipv6(ipv6_src=ip_src, ipv6_dst=ip_dst, child_packet=udp_packet_tx, flow=flow)
 
     if ip_src.version == 4 and ip_dst.version == 4:
-        self.phtx_ipv4(ipv4_src=ip_src, ipv4_dst=ip_dst, child_packet=udp_packet_tx)
+        self.phtx_ipv4(ipv4_src=ip_src, ipv4_dst=ip_dst, child_packet=udp_packet_tx, flow=flow)
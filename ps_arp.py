@@ -44,7 +44,9 @@
 import struct
 from ipaddress import IPv4Address
 
+from mac_address import MAC_UNSPECIFIED, MacAddress
 from tracker import Tracker
+from tx_buffer import TxBuffer
 
 # ARP packet header - IPv4 stack version only
 
@@ -67,6 +69,8 @@ from tracker import Tracker
 
 ARP_HEADER_LEN = 28
 
+ARP_HEADER_STRUCT = struct.Struct("! HH BBH 6s 4s 6s 4s")
+
 ARP_OP_REQUEST = 1
 ARP_OP_REPLY = 2
 
@@ -76,25 +80,29 @@ class ArpPacket:
 
     protocol = "ARP"
 
-    def __init__(self, parent_packet=None, arp_sha=None, arp_spa=None, arp_tpa=None, arp_tha="00:00:00:00:00:00", arp_oper=ARP_OP_REQUEST, echo_tracker=None):
+    def __init__(self, parent_packet=None, arp_sha=None, arp_spa=None, arp_tpa=None, arp_tha=MAC_UNSPECIFIED, arp_oper=ARP_OP_REQUEST, echo_tracker=None):
         """ Class constructor """
 
         # Packet parsing
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
-            raw_header = raw_packet[:ARP_HEADER_LEN]
-
-            self.arp_hrtype = struct.unpack("!H", raw_header[0:2])[0]
-            self.arp_prtype = struct.unpack("!H", raw_header[2:4])[0]
-            self.arp_hrlen = raw_header[4]
-            self.arp_prlen = raw_header[5]
-            self.arp_oper = struct.unpack("!H", raw_header[6:8])[0]
-            self.arp_sha = ":".join([f"{_:0>2x}" for _ in raw_header[8:14]])
-            self.arp_spa = IPv4Address(raw_header[14:18])
-            self.arp_tha = ":".join([f"{_:0>2x}" for _ in raw_header[18:24]])
-            self.arp_tpa = IPv4Address(raw_header[24:28])
+            (
+                self.arp_hrtype,
+                self.arp_prtype,
+                self.arp_hrlen,
+                self.arp_prlen,
+                self.arp_oper,
+                arp_sha,
+                arp_spa,
+                arp_tha,
+                arp_tpa,
+            ) = ARP_HEADER_STRUCT.unpack_from(parent_packet.raw_data)
+
+            self.arp_sha = MacAddress(arp_sha)
+            self.arp_spa = IPv4Address(arp_spa)
+            self.arp_tha = MacAddress(arp_tha)
+            self.arp_tpa = IPv4Address(arp_tpa)
 
         # Packet building
         else:
@@ -105,9 +113,9 @@ class ArpPacket:
             self.arp_hrlen = 6
             self.arp_prlen = 4
             self.arp_oper = arp_oper
-            self.arp_sha = arp_sha
+            self.arp_sha = MacAddress(arp_sha)
             self.arp_spa = IPv4Address(arp_spa)
-            self.arp_tha = arp_tha
+            self.arp_tha = MacAddress(arp_tha)
             self.arp_tpa = IPv4Address(arp_tpa)
 
     def __str__(self):
@@ -122,23 +130,31 @@ class ArpPacket:
     def __len__(self):
         """ Length of the packet """
 
-        return len(self.raw_packet)
+        return ARP_HEADER_LEN
 
     @property
     def raw_header(self):
         """ Packet header in raw format """
 
-        return struct.pack(
-            "!HH BBH 6s 4s 6s 4s",
+        raw_header = bytearray(ARP_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
+
+    def pack_header_into(self, buffer, offset=0):
+        """ Write packet header into buffer at given offset """
+
+        ARP_HEADER_STRUCT.pack_into(
+            buffer,
+            offset,
             self.arp_hrtype,
             self.arp_prtype,
             self.arp_hrlen,
             self.arp_prlen,
             self.arp_oper,
-            bytes.fromhex(self.arp_sha.replace(":", "")),
-            IPv4Address(self.arp_spa).packed,
-            bytes.fromhex(self.arp_tha.replace(":", "")),
-            IPv4Address(self.arp_tpa).packed,
+            self.arp_sha,
+            self.arp_spa.packed,
+            self.arp_tha,
+            self.arp_tpa.packed,
         )
 
     @property
@@ -147,7 +163,9 @@ class ArpPacket:
 
         return self.raw_header
 
-    def get_raw_packet(self):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+    def get_tx_buffer(self):
+        """ Get buffer with packet ready to be processed by lower level protocol """
 
-        return self.raw_packet
+        tx_buffer = TxBuffer()
+        self.pack_header_into(tx_buffer.buffer, tx_buffer.push(ARP_HEADER_LEN))
+        return tx_buffer
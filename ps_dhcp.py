@@ -45,6 +45,8 @@ import binascii
 import struct
 from ipaddress import IPv4Address
 
+from mac_address import MacAddress
+
 # DHCP packet header (RFC 2131)
 
 # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
@@ -182,7 +184,7 @@ class DhcpPacket:
             self.dhcp_yiaddr = IPv4Address(raw_header[16:20])
             self.dhcp_siaddr = IPv4Address(raw_header[20:24])
             self.dhcp_giaddr = IPv4Address(raw_header[24:28])
-            self.dhcp_chaddr = raw_header[28 : 28 + self.dhcp_hlen]
+            self.dhcp_chaddr = MacAddress(raw_header[28:34]) if self.dhcp_hlen == 6 else raw_header[28 : 28 + self.dhcp_hlen]
             self.dhcp_sname = raw_header[44:108]
             self.dhcp_file = raw_header[108:236]
 
@@ -295,7 +297,7 @@ class DhcpPacket:
             self.dhcp_yiaddr.packed,
             self.dhcp_siaddr.packed,
             self.dhcp_giaddr.packed,
-            (bytes.fromhex(self.dhcp_chaddr.replace(":", "")) + b"\0" * 16)[:16],
+            (bytes(self.dhcp_chaddr) + b"\0" * 16)[:16],
             self.dhcp_sname,
             self.dhcp_file,
             b"\x63\x82\x53\x63",
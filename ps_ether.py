@@ -43,6 +43,8 @@
 
 import struct
 
+from lazy_fields import LazyFields
+from mac_address import MAC_UNSPECIFIED, MacAddress
 from tracker import Tracker
 
 # Ethernet packet header
@@ -60,6 +62,8 @@ from tracker import Tracker
 
 ETHER_HEADER_LEN = 14
 
+ETHER_HEADER_STRUCT = struct.Struct("! 6s 6s H")
+
 ETHER_TYPE_MIN = 0x0600
 ETHER_TYPE_ARP = 0x0806
 ETHER_TYPE_IP4 = 0x0800
@@ -69,31 +73,29 @@ ETHER_TYPE_IP6 = 0x86DD
 ETHER_TYPE_TABLE = {ETHER_TYPE_ARP: "ARP", ETHER_TYPE_IP4: "IPv4", ETHER_TYPE_IP6: "IPv6"}
 
 
-class EtherPacket:
+class EtherPacket(LazyFields):
     """ Ethernet packet support class """
 
     protocol = "ETHER"
 
-    def __init__(self, raw_packet=None, ether_src="00:00:00:00:00:00", ether_dst="00:00:00:00:00:00", child_packet=None):
+    vnet_header = None
+
+    def __init__(self, raw_packet=None, ether_src=MAC_UNSPECIFIED, ether_dst=MAC_UNSPECIFIED, child_packet=None):
         """ Class constructor """
 
         # Packet parsing
         if raw_packet:
             self.tracker = Tracker("RX")
 
-            raw_header = raw_packet[:ETHER_HEADER_LEN]
-
-            self.raw_data = raw_packet[ETHER_HEADER_LEN:]
-            self.ether_dst = ":".join([f"{_:0>2x}" for _ in raw_header[0:6]])
-            self.ether_src = ":".join([f"{_:0>2x}" for _ in raw_header[6:12]])
-            self.ether_type = struct.unpack("!H", raw_header[12:14])[0]
+            # Frame gets copied only if it sits in reusable RX buffer, fields are decoded on first access and upper layers get zero copy view of it
+            self._frame = memoryview(bytes(raw_packet))
 
         # Packet building
         else:
             self.tracker = child_packet.tracker
 
-            self.ether_dst = ether_dst
-            self.ether_src = ether_src
+            self.ether_dst = MacAddress(ether_dst)
+            self.ether_src = MacAddress(ether_src)
 
             assert child_packet.protocol in {"IPv6", "IPv4", "ARP"}, f"Not supported protocol: {child_packet.protocol}"
 
@@ -106,7 +108,13 @@ class EtherPacket:
             if child_packet.protocol == "ARP":
                 self.ether_type = ETHER_TYPE_ARP
 
-            self.raw_data = child_packet.get_raw_packet()
+            self.tx_buffer = child_packet.get_tx_buffer()
+            self.raw_data = self.tx_buffer.data
+
+            # Account for Ethernet header in the offload information passed to kernel
+            self.vnet_header = getattr(child_packet, "vnet_header", None)
+            if self.vnet_header:
+                self.vnet_header.add_header_len(ETHER_HEADER_LEN)
 
     def __str__(self):
         """ Short packet log string """
@@ -116,13 +124,15 @@ class EtherPacket:
     def __len__(self):
         """ Length of the packet """
 
-        return len(self.raw_packet)
+        return ETHER_HEADER_LEN + len(self.raw_data)
 
     @property
     def raw_header(self):
         """ Packet header in raw format """
 
-        return struct.pack("! 6s 6s H", bytes.fromhex(self.ether_dst.replace(":", "")), bytes.fromhex(self.ether_src.replace(":", "")), self.ether_type)
+        raw_header = bytearray(ETHER_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
 
     @property
     def raw_packet(self):
@@ -130,7 +140,22 @@ class EtherPacket:
 
         return self.raw_header + self.raw_data
 
-    def get_raw_packet(self):
-        """ Get packet in raw frmat ready to be sent out """
+    def pack_header_into(self, buffer, offset=0):
+        """ Write packet header into buffer at given offset """
+
+        ETHER_HEADER_STRUCT.pack_into(buffer, offset, self.ether_dst, self.ether_src, self.ether_type)
+
+    def get_tx_buffer(self):
+        """ Get buffer with packet ready to be sent out, header is put in front of the data already in it """
+
+        self.pack_header_into(self.tx_buffer.buffer, self.tx_buffer.push(ETHER_HEADER_LEN))
+        return self.tx_buffer
 
-        return self.raw_packet
+    # Decoders of the fields of parsed packet, each field is decoded on first access
+    _decoders = {
+        "raw_data": lambda self: self._frame[ETHER_HEADER_LEN:],
+        "_header": lambda self: ETHER_HEADER_STRUCT.unpack_from(self._frame),
+        "ether_dst": lambda self: MacAddress(self._header[0]),
+        "ether_src": lambda self: MacAddress(self._header[1]),
+        "ether_type": lambda self: self._header[2],
+    }
@@ -45,6 +45,7 @@ import struct
 
 import inet_cksum
 from tracker import Tracker
+from tx_buffer import TxBuffer
 
 # Echo reply message (0/0)
 
@@ -104,6 +105,12 @@ ICMP4_UNREACHABLE_FAGMENTATION = 4
 ICMP4_UNREACHABLE_SOURCE_ROUTE_FAILED = 5
 ICMP4_ECHOREQUEST = 8
 
+ICMP4_HEADER_LEN = 8
+
+ICMP4_HEADER_STRUCT = struct.Struct("! BBH")
+ICMP4_ECHO_STRUCT = struct.Struct("! BBH HH")
+ICMP4_UNREACHABLE_STRUCT = struct.Struct("! BBH L")
+
 
 class Icmp4Packet:
     """ ICMPv4 packet support class """
@@ -118,6 +125,7 @@ class Icmp4Packet:
         icmpv4_ec_id=None,
         icmpv4_ec_seq=None,
         icmpv4_ec_raw_data=b"",
+        icmpv4_ec_request_cksum=None,
         icmpv4_un_raw_data=b"",
         echo_tracker=None,
     ):
@@ -127,25 +135,18 @@ class Icmp4Packet:
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
+            raw_packet = bytes(parent_packet.raw_data)
 
-            self.icmpv4_type = raw_packet[0]
-            self.icmpv4_code = raw_packet[1]
-            self.icmpv4_cksum = struct.unpack("!H", raw_packet[2:4])[0]
+            if raw_packet[0] in {ICMP4_ECHOREPLY, ICMP4_ECHOREQUEST}:
+                self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_ec_id, self.icmpv4_ec_seq = ICMP4_ECHO_STRUCT.unpack_from(raw_packet)
+                self.icmpv4_ec_raw_data = raw_packet[ICMP4_HEADER_LEN:]
 
-            if self.icmpv4_type == ICMP4_ECHOREPLY:
-                self.icmpv4_ec_id = struct.unpack("!H", raw_packet[4:6])[0]
-                self.icmpv4_ec_seq = struct.unpack("!H", raw_packet[6:8])[0]
-                self.icmpv4_ec_raw_data = raw_packet[8:]
+            elif raw_packet[0] == ICMP4_UNREACHABLE:
+                self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_un_reserved = ICMP4_UNREACHABLE_STRUCT.unpack_from(raw_packet)
+                self.icmpv4_un_raw_data = raw_packet[ICMP4_HEADER_LEN:]
 
-            if self.icmpv4_type == ICMP4_UNREACHABLE:
-                self.icmpv4_un_reserved = struct.unpack("!L", raw_packet[4:6])[0]
-                self.icmpv4_un_raw_data = raw_packet[8:]
-
-            if self.icmpv4_type == ICMP4_ECHOREQUEST:
-                self.icmpv4_ec_id = struct.unpack("!H", raw_packet[4:6])[0]
-                self.icmpv4_ec_seq = struct.unpack("!H", raw_packet[6:8])[0]
-                self.icmpv4_ec_raw_data = raw_packet[8:]
+            else:
+                self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum = ICMP4_HEADER_STRUCT.unpack_from(raw_packet)
 
         # Packet building
         else:
@@ -159,6 +160,7 @@ class Icmp4Packet:
                 self.icmpv4_ec_id = icmpv4_ec_id
                 self.icmpv4_ec_seq = icmpv4_ec_seq
                 self.icmpv4_ec_raw_data = icmpv4_ec_raw_data
+                self.icmpv4_ec_request_cksum = icmpv4_ec_request_cksum
 
             if self.icmpv4_type == ICMP4_UNREACHABLE and self.icmpv4_code == ICMP4_UNREACHABLE_PORT:
                 self.icmpv4_un_reserved = 0
@@ -196,15 +198,15 @@ class Icmp4Packet:
 
         if self.icmpv4_type == ICMP4_ECHOREPLY:
             return (
-                struct.pack("! BBH HH", self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_ec_id, self.icmpv4_ec_seq) + self.icmpv4_ec_raw_data
+                ICMP4_ECHO_STRUCT.pack(self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_ec_id, self.icmpv4_ec_seq) + self.icmpv4_ec_raw_data
             )
 
         if self.icmpv4_type == ICMP4_UNREACHABLE and self.icmpv4_code == ICMP4_UNREACHABLE_PORT:
-            return struct.pack("! BBH L", self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_un_reserved) + self.icmpv4_un_raw_data
+            return ICMP4_UNREACHABLE_STRUCT.pack(self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_un_reserved) + self.icmpv4_un_raw_data
 
         if self.icmpv4_type == ICMP4_ECHOREQUEST:
             return (
-                struct.pack("! BBH HH", self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_ec_id, self.icmpv4_ec_seq) + self.icmpv4_ec_raw_data
+                ICMP4_ECHO_STRUCT.pack(self.icmpv4_type, self.icmpv4_code, self.icmpv4_cksum, self.icmpv4_ec_id, self.icmpv4_ec_seq) + self.icmpv4_ec_raw_data
             )
 
         return None
@@ -212,10 +214,23 @@ class Icmp4Packet:
     def get_raw_packet(self):
         """ Get packet in raw format ready to be processed by lower level protocol """
 
-        self.icmpv4_cksum = inet_cksum.compute_cksum(self.raw_packet)
+        # Echo reply carries the same id, seq and data as the request it answers so its checksum can be derived from request's checksum
+        # by accounting for type change only
+        if self.icmpv4_type == ICMP4_ECHOREPLY and getattr(self, "icmpv4_ec_request_cksum", None) is not None:
+            self.icmpv4_cksum = inet_cksum.update_cksum(
+                self.icmpv4_ec_request_cksum, bytes((ICMP4_ECHOREQUEST, self.icmpv4_code)), bytes((self.icmpv4_type, self.icmpv4_code))
+            )
+
+        else:
+            self.icmpv4_cksum = inet_cksum.compute_cksum(self.raw_packet)
 
         return self.raw_packet
 
+    def get_tx_buffer(self):
+        """ Get buffer with packet ready to be processed by lower level protocol, ICMP messages are small enough to be built in one piece """
+
+        return TxBuffer(self.get_raw_packet())
+
     def validate_cksum(self):
         """ Validate packet checksum """
 
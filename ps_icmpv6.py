@@ -45,7 +45,10 @@ import struct
 from ipaddress import IPv6Address, IPv6Network
 
 import inet_cksum
+from lazy_fields import LazyFields
+from mac_address import MacAddress
 from tracker import Tracker
+from tx_buffer import TxBuffer
 
 # Destination Unreachable message (1/[0,1,3,4])
 
@@ -285,8 +288,28 @@ ICMP6_MART_CHANGE_TO_EXCLUDE = 4
 ICMP6_MART_ALLOW_NEW_SOURCES = 5
 ICMP6_MART_BLOCK_OLD_SOURCES = 6
 
-
-class Icmp6Packet:
+ICMP6_HEADER_STRUCT = struct.Struct("! BBH")
+ICMP6_UNREACHABLE_STRUCT = struct.Struct("! BBH L")
+ICMP6_ECHO_STRUCT = struct.Struct("! BBH HH")
+ICMP6_ROUTER_SOLICITATION_STRUCT = struct.Struct("! BBH L")
+ICMP6_ROUTER_ADVERTISEMENT_STRUCT = struct.Struct("! BBH BBH L L")
+ICMP6_NEIGHBOR_SOLICITATION_STRUCT = struct.Struct("! BBH L 16s")
+ICMP6_NEIGHBOR_ADVERTISEMENT_STRUCT = struct.Struct("! BBH L 16s")
+ICMP6_MULTICAST_LISTENER_REPORT_V2_STRUCT = struct.Struct("! BBH HH")
+
+ICMP6_MESSAGE_STRUCT = {
+    ICMP6_UNREACHABLE: ICMP6_UNREACHABLE_STRUCT,
+    ICMP6_ECHOREQUEST: ICMP6_ECHO_STRUCT,
+    ICMP6_ECHOREPLY: ICMP6_ECHO_STRUCT,
+    ICMP6_ROUTER_SOLICITATION: ICMP6_ROUTER_SOLICITATION_STRUCT,
+    ICMP6_ROUTER_ADVERTISEMENT: ICMP6_ROUTER_ADVERTISEMENT_STRUCT,
+    ICMP6_NEIGHBOR_SOLICITATION: ICMP6_NEIGHBOR_SOLICITATION_STRUCT,
+    ICMP6_NEIGHBOR_ADVERTISEMENT: ICMP6_NEIGHBOR_ADVERTISEMENT_STRUCT,
+    ICMP6_MULTICAST_LISTENER_REPORT_V2: ICMP6_MULTICAST_LISTENER_REPORT_V2_STRUCT,
+}
+
+
+class Icmp6Packet(LazyFields):
     """ ICMPv6 packet support class """
 
     protocol = "ICMPv6"
@@ -300,6 +323,8 @@ class Icmp6Packet:
         icmpv6_ec_id=None,
         icmpv6_ec_seq=None,
         icmpv6_ec_raw_data=b"",
+        icmpv6_ec_request_cksum=None,
+        icmpv6_ec_request_ip_pseudo_header=None,
         icmpv6_ra_hop=None,
         icmpv6_ra_flag_m=False,
         icmpv6_ra_flag_o=False,
@@ -321,74 +346,8 @@ class Icmp6Packet:
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
-
-            # from binascii import hexlify
-            # print(hexlify(raw_packet))
-
-            self.icmpv6_type = raw_packet[0]
-            self.icmpv6_code = raw_packet[1]
-            self.icmpv6_cksum = struct.unpack("!H", raw_packet[2:4])[0]
-
-            self.icmpv6_nd_options = []
-
-            if self.icmpv6_type == ICMP6_UNREACHABLE and self.icmpv6_code in range(0, 7):
-                self.icmpv6_un_reserved = struct.unpack("!L", raw_packet[4:8])[0]
-                self.icmpv6_un_raw_data = raw_packet[8:]
-                return
-
-            if self.icmpv6_type == ICMP6_ECHOREQUEST and self.icmpv6_code == 0:
-                self.icmpv6_ec_id = struct.unpack("!H", raw_packet[4:6])[0]
-                self.icmpv6_ec_seq = struct.unpack("!H", raw_packet[6:8])[0]
-                self.icmpv6_ec_raw_data = raw_packet[8:]
-                return
-
-            if self.icmpv6_type == ICMP6_ECHOREPLY and self.icmpv6_code == 0:
-                self.icmpv6_ec_id = struct.unpack("!H", raw_packet[4:6])[0]
-                self.icmpv6_ec_seqq = struct.unpack("!H", raw_packet[6:8])[0]
-                self.icmpv6_ec_raw_data = raw_packet[8:]
-                return
-
-            if self.icmpv6_type == ICMP6_ROUTER_SOLICITATION and self.icmpv6_code == 0:
-                self.icmpv6_rs_reserved = struct.unpack("!L", raw_packet[4:8])[0]
-                self.icmpv6_nd_options = self.__read_nd_options(raw_packet[12:])
-                return
-
-            if self.icmpv6_type == ICMP6_ROUTER_ADVERTISEMENT and self.icmpv6_code == 0:
-                self.icmpv6_ra_hop = raw_packet[4]
-                self.icmpv6_ra_flag_m = bool(raw_packet[5] & 0b10000000)
-                self.icmpv6_ra_flag_o = bool(raw_packet[5] & 0b01000000)
-                self.icmpv6_ra_reserved = raw_packet[5] & 0b00111111
-                self.icmpv6_ra_router_lifetime = struct.unpack("!H", raw_packet[6:8])[0]
-                self.icmpv6_ra_reachable_time = struct.unpack("!L", raw_packet[8:12])[0]
-                self.icmpv6_ra_retrans_timer = struct.unpack("!L", raw_packet[12:16])[0]
-                self.icmpv6_nd_options = self.__read_nd_options(raw_packet[16:])
-                return
-
-            if self.icmpv6_type == ICMP6_NEIGHBOR_SOLICITATION and self.icmpv6_code == 0:
-                self.icmpv6_ns_reserved = struct.unpack("!L", raw_packet[4:8])[0]
-                self.icmpv6_ns_target_address = IPv6Address(raw_packet[8:24])
-                self.icmpv6_nd_options = self.__read_nd_options(raw_packet[24:])
-                return
-
-            if self.icmpv6_type == ICMP6_NEIGHBOR_ADVERTISEMENT and self.icmpv6_code == 0:
-                self.icmpv6_na_flag_r = bool(raw_packet[4] & 0b10000000)
-                self.icmpv6_na_flag_s = bool(raw_packet[4] & 0b01000000)
-                self.icmpv6_na_flag_o = bool(raw_packet[4] & 0b00100000)
-                self.icmpv6_na_reserved = struct.unpack("!L", raw_packet[4:8])[0] & 0b00011111111111111111111111111111
-                self.icmpv6_na_target_address = IPv6Address(raw_packet[8:24])
-                self.icmpv6_nd_options = self.__read_nd_options(raw_packet[24:])
-                return
-
-            if self.icmpv6_type == ICMP6_MULTICAST_LISTENER_REPORT_V2:
-                self.icmpv6_mlr2_reserved = struct.unpack("!H", raw_packet[4:6])[0]
-                self.icmpv6_mlr2_number_of_multicast_address_records = struct.unpack("!H", raw_packet[6:8])[0]
-                self.icmpv6_mlr2_multicast_address_record = []
-                raw_records = raw_packet[8:]
-                for _ in range(self.icmpv6_mlr2_number_of_multicast_address_records):
-                    record = MulticastAddressRecord(raw_records)
-                    raw_records = raw_records[len(record) :]
-                    self.icmpv6_mlr2_multicast_address_record.append(record)
+            # Fields are decoded on first access out of the zero copy view of the packet, only fields relevant to packet's type should be accessed
+            self._packet = memoryview(parent_packet.raw_data)
 
         # Packet building
         else:
@@ -415,6 +374,8 @@ class Icmp6Packet:
                 self.icmpv6_ec_id = icmpv6_ec_id
                 self.icmpv6_ec_seq = icmpv6_ec_seq
                 self.icmpv6_ec_raw_data = icmpv6_ec_raw_data
+                self.icmpv6_ec_request_cksum = icmpv6_ec_request_cksum
+                self.icmpv6_ec_request_ip_pseudo_header = icmpv6_ec_request_ip_pseudo_header
                 return
 
             if self.icmpv6_type == ICMP6_ROUTER_SOLICITATION:
@@ -499,25 +460,24 @@ class Icmp6Packet:
         """ Get packet in raw format """
 
         if self.icmpv6_type == ICMP6_UNREACHABLE:
-            return struct.pack("! BBH L", self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_un_reserved) + self.icmpv6_un_raw_data
+            return ICMP6_UNREACHABLE_STRUCT.pack(self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_un_reserved) + self.icmpv6_un_raw_data
 
         if self.icmpv6_type == ICMP6_ECHOREQUEST:
             return (
-                struct.pack("! BBH HH", self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_ec_id, self.icmpv6_ec_seq) + self.icmpv6_ec_raw_data
+                ICMP6_ECHO_STRUCT.pack(self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_ec_id, self.icmpv6_ec_seq) + self.icmpv6_ec_raw_data
             )
 
         if self.icmpv6_type == ICMP6_ECHOREPLY:
             return (
-                struct.pack("! BBH HH", self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_ec_id, self.icmpv6_ec_seq) + self.icmpv6_ec_raw_data
+                ICMP6_ECHO_STRUCT.pack(self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_ec_id, self.icmpv6_ec_seq) + self.icmpv6_ec_raw_data
             )
 
         if self.icmpv6_type == ICMP6_ROUTER_SOLICITATION:
-            return struct.pack("! BBH L", self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_rs_reserved) + self.raw_nd_options
+            return ICMP6_ROUTER_SOLICITATION_STRUCT.pack(self.icmpv6_type, self.icmpv6_code, self.icmpv6_cksum, self.icmpv6_rs_reserved) + self.raw_nd_options
 
         if self.icmpv6_type == ICMP6_ROUTER_ADVERTISEMENT:
             return (
-                struct.pack(
-                    "! BBH BBH L L",
+                ICMP6_ROUTER_ADVERTISEMENT_STRUCT.pack(
                     self.icmpv6_type,
                     self.icmpv6_code,
                     self.icmpv6_cksum,
@@ -532,8 +492,7 @@ class Icmp6Packet:
 
         if self.icmpv6_type == ICMP6_NEIGHBOR_SOLICITATION:
             return (
-                struct.pack(
-                    "! BBH L 16s",
+                ICMP6_NEIGHBOR_SOLICITATION_STRUCT.pack(
                     self.icmpv6_type,
                     self.icmpv6_code,
                     self.icmpv6_cksum,
@@ -545,8 +504,7 @@ class Icmp6Packet:
 
         if self.icmpv6_type == ICMP6_NEIGHBOR_ADVERTISEMENT:
             return (
-                struct.pack(
-                    "! BBH L 16s",
+                ICMP6_NEIGHBOR_ADVERTISEMENT_STRUCT.pack(
                     self.icmpv6_type,
                     self.icmpv6_code,
                     self.icmpv6_cksum,
@@ -558,8 +516,7 @@ class Icmp6Packet:
 
         if self.icmpv6_type == ICMP6_MULTICAST_LISTENER_REPORT_V2:
             return (
-                struct.pack(
-                    "! BBH HH",
+                ICMP6_MULTICAST_LISTENER_REPORT_V2_STRUCT.pack(
                     self.icmpv6_type,
                     self.icmpv6_code,
                     self.icmpv6_cksum,
@@ -574,10 +531,25 @@ class Icmp6Packet:
     def get_raw_packet(self, ip_pseudo_header):
         """ Get packet in raw format ready to be processed by lower level protocol """
 
-        self.icmpv6_cksum = inet_cksum.compute_cksum(ip_pseudo_header + self.raw_packet)
+        # Echo reply carries the same id, seq and data as the request it answers so its checksum can be derived from request's checksum by accounting
+        # for type change and for the pseudo header change (reply may be sent from different address than the one request was addressed to)
+        if self.icmpv6_type == ICMP6_ECHOREPLY and getattr(self, "icmpv6_ec_request_cksum", None) is not None:
+            self.icmpv6_cksum = inet_cksum.update_cksum(
+                self.icmpv6_ec_request_cksum,
+                bytes(self.icmpv6_ec_request_ip_pseudo_header) + bytes((ICMP6_ECHOREQUEST, self.icmpv6_code)),
+                bytes(ip_pseudo_header) + bytes((self.icmpv6_type, self.icmpv6_code)),
+            )
+
+        else:
+            self.icmpv6_cksum = inet_cksum.compute_cksum(self.raw_packet, init=inet_cksum.compute_sum(ip_pseudo_header))
 
         return self.raw_packet
 
+    def get_tx_buffer(self, ip_pseudo_header):
+        """ Get buffer with packet ready to be processed by lower level protocol, ICMP messages are small enough to be built in one piece """
+
+        return TxBuffer(self.get_raw_packet(ip_pseudo_header))
+
     @property
     def raw_nd_options(self):
         """ ICMPv6 ND packet options in raw format """
@@ -590,12 +562,9 @@ class Icmp6Packet:
         return raw_nd_options
 
     def validate_cksum(self, ip_pseudo_header):
-        """ Validate packet checksum """
+        """ Validate checksum of parsed packet """
 
-        # from binascii import hexlify
-        # print(hexlify(self.raw_packet))
-
-        return not bool(inet_cksum.compute_cksum(ip_pseudo_header + self.raw_packet))
+        return not inet_cksum.compute_cksum(self._packet, init=inet_cksum.compute_sum(ip_pseudo_header))
 
     @staticmethod
     def __read_nd_options(raw_nd_options):
@@ -616,6 +585,64 @@ class Icmp6Packet:
 
         return nd_options
 
+    def __decode_icmpv6_nd_options(self):
+        """ Decode Neighbor Discovery options of parsed packet """
+
+        nd_options_offset = {
+            ICMP6_ROUTER_SOLICITATION: 12,
+            ICMP6_ROUTER_ADVERTISEMENT: 16,
+            ICMP6_NEIGHBOR_SOLICITATION: 24,
+            ICMP6_NEIGHBOR_ADVERTISEMENT: 24,
+        }.get(self.icmpv6_type) if self.icmpv6_code == 0 else None
+
+        if nd_options_offset is None:
+            return []
+
+        return self.__read_nd_options(bytes(self._packet[nd_options_offset:]))
+
+    def __decode_icmpv6_mlr2_multicast_address_record(self):
+        """ Decode Multicast Address Records of parsed MLDv2 Report packet """
+
+        multicast_address_record = []
+        raw_records = bytes(self._packet[8:])
+        for _ in range(self.icmpv6_mlr2_number_of_multicast_address_records):
+            record = MulticastAddressRecord(raw_records)
+            raw_records = raw_records[len(record) :]
+            multicast_address_record.append(record)
+        return multicast_address_record
+
+    # Decoders of the fields of parsed packet, each field is decoded on first access
+    _decoders = {
+        "_header": lambda self: ICMP6_MESSAGE_STRUCT.get(self._packet[0], ICMP6_HEADER_STRUCT).unpack_from(self._packet),
+        "icmpv6_type": lambda self: self._header[0],
+        "icmpv6_code": lambda self: self._header[1],
+        "icmpv6_cksum": lambda self: self._header[2],
+        "icmpv6_nd_options": __decode_icmpv6_nd_options,
+        "icmpv6_un_reserved": lambda self: self._header[3],
+        "icmpv6_un_raw_data": lambda self: self._packet[ICMP6_UNREACHABLE_STRUCT.size :],
+        "icmpv6_ec_id": lambda self: self._header[3],
+        "icmpv6_ec_seq": lambda self: self._header[4],
+        "icmpv6_ec_raw_data": lambda self: self._packet[ICMP6_ECHO_STRUCT.size :],
+        "icmpv6_rs_reserved": lambda self: self._header[3],
+        "icmpv6_ra_hop": lambda self: self._header[3],
+        "icmpv6_ra_flag_m": lambda self: bool(self._header[4] & 0b10000000),
+        "icmpv6_ra_flag_o": lambda self: bool(self._header[4] & 0b01000000),
+        "icmpv6_ra_reserved": lambda self: self._header[4] & 0b00111111,
+        "icmpv6_ra_router_lifetime": lambda self: self._header[5],
+        "icmpv6_ra_reachable_time": lambda self: self._header[6],
+        "icmpv6_ra_retrans_timer": lambda self: self._header[7],
+        "icmpv6_ns_reserved": lambda self: self._header[3],
+        "icmpv6_ns_target_address": lambda self: IPv6Address(self._header[4]),
+        "icmpv6_na_flag_r": lambda self: bool(self._header[3] & 0b10000000000000000000000000000000),
+        "icmpv6_na_flag_s": lambda self: bool(self._header[3] & 0b01000000000000000000000000000000),
+        "icmpv6_na_flag_o": lambda self: bool(self._header[3] & 0b00100000000000000000000000000000),
+        "icmpv6_na_reserved": lambda self: self._header[3] & 0b00011111111111111111111111111111,
+        "icmpv6_na_target_address": lambda self: IPv6Address(self._header[4]),
+        "icmpv6_mlr2_reserved": lambda self: self._header[3],
+        "icmpv6_mlr2_number_of_multicast_address_records": lambda self: self._header[4],
+        "icmpv6_mlr2_multicast_address_record": __decode_icmpv6_mlr2_multicast_address_record,
+    }
+
     @property
     def icmpv6_nd_opt_slla(self):
         """ ICMPv6 ND option - Source Link Layer Address (1) """
@@ -657,23 +684,25 @@ class Icmp6Packet:
 ICMP6_ND_OPT_SLLA = 1
 ICMP6_ND_OPT_SLLA_LEN = 8
 
+ICMP6_ND_OPT_SLLA_STRUCT = struct.Struct("! BB 6s")
+
 
 class ICMPv6NdOptSLLA:
     """ ICMPv6 ND option - Source Link Layer Address (1) """
 
     def __init__(self, raw_option=None, opt_slla=None):
         if raw_option:
-            self.opt_code = raw_option[0]
-            self.opt_len = raw_option[1] << 3
-            self.opt_slla = ":".join([f"{_:0>2x}" for _ in raw_option[2:8]])
+            self.opt_code, opt_len, opt_slla = ICMP6_ND_OPT_SLLA_STRUCT.unpack_from(raw_option)
+            self.opt_len = opt_len << 3
+            self.opt_slla = MacAddress(opt_slla)
         else:
             self.opt_code = ICMP6_ND_OPT_SLLA
             self.opt_len = ICMP6_ND_OPT_SLLA_LEN
-            self.opt_slla = opt_slla
+            self.opt_slla = MacAddress(opt_slla)
 
     @property
     def raw_option(self):
-        return struct.pack("! BB 6s", self.opt_code, self.opt_len >> 3, bytes.fromhex(self.opt_slla.replace(":", "")))
+        return ICMP6_ND_OPT_SLLA_STRUCT.pack(self.opt_code, self.opt_len >> 3, self.opt_slla)
 
     def __str__(self):
         return f"slla {self.opt_slla}"
@@ -690,23 +719,25 @@ class ICMPv6NdOptSLLA:
 ICMP6_ND_OPT_TLLA = 2
 ICMP6_ND_OPT_TLLA_LEN = 8
 
+ICMP6_ND_OPT_TLLA_STRUCT = struct.Struct("! BB 6s")
+
 
 class ICMPv6NdOptTLLA:
     """ ICMPv6 ND option - Target Link Layer Address (2) """
 
     def __init__(self, raw_option=None, opt_tlla=None):
         if raw_option:
-            self.opt_code = raw_option[0]
-            self.opt_len = raw_option[1] << 3
-            self.opt_tlla = ":".join([f"{_:0>2x}" for _ in raw_option[2:8]])
+            self.opt_code, opt_len, opt_tlla = ICMP6_ND_OPT_TLLA_STRUCT.unpack_from(raw_option)
+            self.opt_len = opt_len << 3
+            self.opt_tlla = MacAddress(opt_tlla)
         else:
             self.opt_code = ICMP6_ND_OPT_TLLA
             self.opt_len = ICMP6_ND_OPT_TLLA_LEN
-            self.opt_tlla = opt_tlla
+            self.opt_tlla = MacAddress(opt_tlla)
 
     @property
     def raw_option(self):
-        return struct.pack("! BB 6s", self.opt_code, self.opt_len >> 3, bytes.fromhex(self.opt_tlla.replace(":", "")))
+        return ICMP6_ND_OPT_TLLA_STRUCT.pack(self.opt_code, self.opt_len >> 3, self.opt_tlla)
 
     def __str__(self):
         return f"tlla {self.opt_tlla}"
@@ -734,6 +765,9 @@ class ICMPv6NdOptTLLA:
 
 ICMP6_ND_OPT_PI = 3
 ICMP6_ND_OPT_PI_LEN = 32
+ICMP6_ND_OPT_PI_LIFETIME_INFINITY = 0xFFFFFFFF
+
+ICMP6_ND_OPT_PI_STRUCT = struct.Struct("! BB BB L L L 16s")
 
 
 class ICMPv6NdOptPI:
@@ -750,16 +784,22 @@ class ICMPv6NdOptPI:
         opt_prefix=None,
     ):
         if raw_option:
-            self.opt_code = raw_option[0]
-            self.opt_len = raw_option[1] << 3
-            self.opt_flag_l = bool(raw_option[3] & 0b10000000)
-            self.opt_flag_a = bool(raw_option[3] & 0b01000000)
-            self.opt_flag_r = bool(raw_option[3] & 0b00100000)
-            self.opt_reserved_1 = raw_option[3] & 0b00011111
-            self.opt_valid_lifetime = struct.unpack("!L", raw_option[4:8])[0]
-            self.opt_preferred_lifetime = struct.unpack("!L", raw_option[8:12])[0]
-            self.opt_reserved_2 = struct.unpack("!L", raw_option[12:16])[0]
-            self.opt_prefix = IPv6Network((raw_option[16:32], raw_option[2]))
+            (
+                self.opt_code,
+                opt_len,
+                opt_prefix_len,
+                opt_flags,
+                self.opt_valid_lifetime,
+                self.opt_preferred_lifetime,
+                self.opt_reserved_2,
+                opt_prefix,
+            ) = ICMP6_ND_OPT_PI_STRUCT.unpack_from(raw_option)
+            self.opt_len = opt_len << 3
+            self.opt_flag_l = bool(opt_flags & 0b10000000)
+            self.opt_flag_a = bool(opt_flags & 0b01000000)
+            self.opt_flag_r = bool(opt_flags & 0b00100000)
+            self.opt_reserved_1 = opt_flags & 0b00011111
+            self.opt_prefix = IPv6Network((opt_prefix, opt_prefix_len))
         else:
             self.opt_code = ICMP6_ND_OPT_PI
             self.opt_len = ICMP6_ND_OPT_PI_LEN
@@ -774,8 +814,7 @@ class ICMPv6NdOptPI:
 
     @property
     def raw_option(self):
-        return struct.pack(
-            "! BB BB L L L 16s",
+        return ICMP6_ND_OPT_PI_STRUCT.pack(
             self.opt_code,
             self.opt_len >> 3,
             self.opt_prefix.prefixlen,
@@ -814,6 +853,9 @@ class ICMPv6NdOptUnk:
 #
 
 
+MULTICAST_ADDRESS_RECORD_STRUCT = struct.Struct("! BBH 16s")
+
+
 class MulticastAddressRecord:
     """ Multicast Address Record used by MLDv2 Report message """
 
@@ -822,12 +864,10 @@ class MulticastAddressRecord:
 
         # Record parsing
         if raw_record:
-            self.record_type = raw_record[0]
-            self.aux_data_len = raw_record[1]
-            self.number_of_sources = struct.unpack("!H", raw_record[2:4])[0]
-            self.multicast_address = IPv6Address(raw_record[4:8])
-            self.source_address = [IPv6Address(raw_record[8 + 16 * _ : 8 + 16 * (_ + 1)]) for _ in range(self.number_of_sources)]
-            self.aux_data = raw_record[8 + 16 * self.number_of_sources :]
+            self.record_type, self.aux_data_len, self.number_of_sources, multicast_address = MULTICAST_ADDRESS_RECORD_STRUCT.unpack_from(raw_record)
+            self.multicast_address = IPv6Address(multicast_address)
+            self.source_address = [IPv6Address(bytes(raw_record[20 + 16 * _ : 20 + 16 * (_ + 1)])) for _ in range(self.number_of_sources)]
+            self.aux_data = raw_record[20 + 16 * self.number_of_sources :]
 
         # Record building
         else:
@@ -858,7 +898,7 @@ class MulticastAddressRecord:
         """ Get record in raw format """
 
         return (
-            struct.pack("! BBH 16s", self.record_type, self.aux_data_len, self.number_of_sources, self.multicast_address.packed)
+            MULTICAST_ADDRESS_RECORD_STRUCT.pack(self.record_type, self.aux_data_len, self.number_of_sources, self.multicast_address.packed)
             + b"".join([_.packed for _ in self.source_address])
             + self.aux_data
         )
@@ -45,6 +45,9 @@ import struct
 from ipaddress import IPv4Address
 
 import inet_cksum
+from lazy_fields import LazyFields
+from ps_vnet import VNET_GSO_TCPV4
+from tx_buffer import TxBuffer
 
 # IPv4 protocol header
 
@@ -65,6 +68,9 @@ import inet_cksum
 
 IP4_HEADER_LEN = 20
 
+IP4_HEADER_STRUCT = struct.Struct("! BBH HH BBH 4s 4s")
+IP4_PSEUDO_HEADER_STRUCT = struct.Struct("! 4s 4s BBH")
+
 IP4_PROTO_ICMP4 = 1
 IP4_PROTO_TCP = 6
 IP4_PROTO_UDP = 17
@@ -122,11 +128,13 @@ DSCP_TABLE = {
 ECN_TABLE = {0b00: "Non-ECT", 0b10: "ECT(0)", 0b01: "ECT(1)", 0b11: "CE"}
 
 
-class Ip4Packet:
+class Ip4Packet(LazyFields):
     """ IPv4 packet support class """
 
     protocol = "IPv4"
 
+    vnet_header = None
+
     def __init__(
         self,
         parent_packet=None,
@@ -151,46 +159,9 @@ class Ip4Packet:
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
-            raw_header = raw_packet[:IP4_HEADER_LEN]
-            raw_options = raw_packet[IP4_HEADER_LEN : (raw_packet[0] & 0b00001111) << 2]
-
-            self.raw_data = raw_packet[(raw_packet[0] & 0b00001111) << 2 : struct.unpack("!H", raw_header[2:4])[0]]
-
-            self.ipv4_ver = raw_header[0] >> 4
-            self.ipv4_hlen = (raw_header[0] & 0b00001111) << 2
-            self.ipv4_dscp = (raw_header[1] & 0b11111100) >> 2
-            self.ipv4_ecn = raw_header[1] & 0b00000011
-            self.ipv4_plen = struct.unpack("!H", raw_header[2:4])[0]
-            self.ipv4_packet_id = struct.unpack("!H", raw_header[4:6])[0]
-            self.ipv4_frag_df = bool(struct.unpack("!H", raw_header[6:8])[0] & 0b0100000000000000)
-            self.ipv4_frag_mf = bool(struct.unpack("!H", raw_header[6:8])[0] & 0b0010000000000000)
-            self.ipv4_frag_offset = (struct.unpack("!H", raw_header[6:8])[0] & 0b0001111111111111) << 3
-            self.ipv4_ttl = raw_header[8]
-            self.ipv4_proto = raw_header[9]
-            self.ipv4_cksum = struct.unpack("!H", raw_header[10:12])[0]
-            self.ipv4_src = IPv4Address(raw_header[12:16])
-            self.ipv4_dst = IPv4Address(raw_header[16:20])
-
-            self.ipv4_options = []
-
-            opt_cls = {}
-
-            i = 0
-
-            while i < len(raw_options):
-
-                if raw_options[i] == IP4_OPT_EOL:
-                    self.ipv4_options.append(IpOptEol())
-                    break
-
-                if raw_options[i] == IP4_OPT_NOP:
-                    self.ipv4_options.append(IpOptNop())
-                    i += IP4_OPT_NOP_LEN
-                    continue
-
-                self.ipv4_options.append(opt_cls.get(raw_options[i], IpOptUnk)(raw_options[i : i + raw_options[i + 1]]))
-                i += self.raw_options[i + 1]
+            # Fields are decoded on first access out of the zero copy view of the packet
+            self._packet = memoryview(parent_packet.raw_data)
+            self.vnet_header = parent_packet.vnet_header
 
         # Packet building
         else:
@@ -224,22 +195,27 @@ class Ip4Packet:
 
                 if child_packet.protocol == "ICMPv4":
                     self.ipv4_proto = IP4_PROTO_ICMP4
-                    self.raw_data = child_packet.get_raw_packet()
-                    self.ipv4_plen = self.ipv4_hlen + len(self.raw_data)
+                    self.tx_buffer = child_packet.get_tx_buffer()
+                    self.ipv4_plen = self.ipv4_hlen + len(self.tx_buffer)
+
+                if child_packet.protocol in {"UDP", "TCP"}:
+                    self.ipv4_proto = IP4_PROTO_UDP if child_packet.protocol == "UDP" else IP4_PROTO_TCP
+                    self.ipv4_plen = self.ipv4_hlen + len(child_packet)
+                    self.tx_buffer = child_packet.get_tx_buffer(self.ip_pseudo_header)
 
-                if child_packet.protocol == "UDP":
-                    self.ipv4_proto = IP4_PROTO_UDP
-                    self.ipv4_plen = self.ipv4_hlen + child_packet.udp_plen
-                    self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
+                self.raw_data = self.tx_buffer.data
 
-                if child_packet.protocol == "TCP":
-                    self.ipv4_proto = IP4_PROTO_TCP
-                    self.ipv4_plen = self.ipv4_hlen + child_packet.tcp_hlen + len(child_packet.raw_data)
-                    self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
+                # Account for IPv4 header in the offload information passed to kernel
+                self.vnet_header = getattr(child_packet, "vnet_header", None)
+                if self.vnet_header:
+                    self.vnet_header.add_header_len(self.ipv4_hlen)
+                    if self.vnet_header.vnet_gso_size:
+                        self.vnet_header.vnet_gso_type = VNET_GSO_TCPV4
 
             else:
                 self.ipv4_proto = ipv4_proto
-                self.raw_data = raw_data
+                self.tx_buffer = TxBuffer(raw_data)
+                self.raw_data = self.tx_buffer.data
                 self.ipv4_plen = self.ipv4_hlen + len(self.raw_data)
 
     def __str__(self):
@@ -254,14 +230,22 @@ class Ip4Packet:
     def __len__(self):
         """ Length of the packet """
 
-        return len(self.raw_packet)
+        return self.ipv4_plen
 
     @property
     def raw_header(self):
         """ Packet header in raw form """
 
-        return struct.pack(
-            "! BBH HH BBH 4s 4s",
+        raw_header = bytearray(IP4_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
+
+    def pack_header_into(self, buffer, offset=0):
+        """ Write packet header into buffer at given offset """
+
+        IP4_HEADER_STRUCT.pack_into(
+            buffer,
+            offset,
             self.ipv4_ver << 4 | self.ipv4_hlen >> 2,
             self.ipv4_dscp << 2 | self.ipv4_ecn,
             self.ipv4_plen,
@@ -295,15 +279,28 @@ class Ip4Packet:
     def ip_pseudo_header(self):
         """ Returns IPv4 pseudo header that is used by TCP and UDP to compute their checksums """
 
-        return struct.pack("! 4s 4s BBH", self.ipv4_src.packed, self.ipv4_dst.packed, 0, self.ipv4_proto, self.ipv4_plen - self.ipv4_hlen)
+        return IP4_PSEUDO_HEADER_STRUCT.pack(self.ipv4_src.packed, self.ipv4_dst.packed, 0, self.ipv4_proto, self.ipv4_plen - self.ipv4_hlen)
 
     def get_raw_packet(self):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+        """ Get packet in raw format """
 
         self.ipv4_cksum = inet_cksum.compute_cksum(self.raw_header + self.raw_options)
 
         return self.raw_packet
 
+    def get_tx_buffer(self):
+        """ Get buffer with packet ready to be processed by lower level protocol, header is put in front of the data already in it """
+
+        offset = self.tx_buffer.push(self.ipv4_hlen)
+        self.tx_buffer.buffer[offset + IP4_HEADER_LEN : offset + self.ipv4_hlen] = self.raw_options
+
+        self.ipv4_cksum = 0
+        self.pack_header_into(self.tx_buffer.buffer, offset)
+        self.ipv4_cksum = inet_cksum.compute_cksum(self.tx_buffer.data[: self.ipv4_hlen])
+
+        self.pack_header_into(self.tx_buffer.buffer, offset)
+        return self.tx_buffer
+
     def get_option(self, name):
         """ Find specific option by its name """
 
@@ -313,9 +310,57 @@ class Ip4Packet:
         return None
 
     def validate_cksum(self):
-        """ Validate packet checksum """
+        """ Validate checksum of parsed packet """
+
+        return not inet_cksum.compute_cksum(self._packet[: self.ipv4_hlen])
+
+    def __decode_ipv4_options(self):
+        """ Decode options of parsed packet """
+
+        raw_options = self._packet[IP4_HEADER_LEN : self.ipv4_hlen]
+
+        ipv4_options = []
+
+        opt_cls = {}
+
+        i = 0
+
+        while i < len(raw_options):
+
+            if raw_options[i] == IP4_OPT_EOL:
+                ipv4_options.append(IpOptEol())
+                break
+
+            if raw_options[i] == IP4_OPT_NOP:
+                ipv4_options.append(IpOptNop())
+                i += IP4_OPT_NOP_LEN
+                continue
+
+            ipv4_options.append(opt_cls.get(raw_options[i], IpOptUnk)(raw_options[i : i + raw_options[i + 1]]))
+            i += raw_options[i + 1]
+
+        return ipv4_options
 
-        return not bool(inet_cksum.compute_cksum(self.raw_header + self.raw_options))
+    # Decoders of the fields of parsed packet, each field is decoded on first access
+    _decoders = {
+        "raw_data": lambda self: self._packet[self.ipv4_hlen : self.ipv4_plen],
+        "_header": lambda self: IP4_HEADER_STRUCT.unpack_from(self._packet),
+        "ipv4_ver": lambda self: self._header[0] >> 4,
+        "ipv4_hlen": lambda self: (self._header[0] & 0b00001111) << 2,
+        "ipv4_dscp": lambda self: (self._header[1] & 0b11111100) >> 2,
+        "ipv4_ecn": lambda self: self._header[1] & 0b00000011,
+        "ipv4_plen": lambda self: self._header[2],
+        "ipv4_packet_id": lambda self: self._header[3],
+        "ipv4_frag_df": lambda self: bool(self._header[4] & 0b0100000000000000),
+        "ipv4_frag_mf": lambda self: bool(self._header[4] & 0b0010000000000000),
+        "ipv4_frag_offset": lambda self: (self._header[4] & 0b0001111111111111) << 3,
+        "ipv4_ttl": lambda self: self._header[5],
+        "ipv4_proto": lambda self: self._header[6],
+        "ipv4_cksum": lambda self: self._header[7],
+        "ipv4_src": lambda self: IPv4Address(self._header[8]),
+        "ipv4_dst": lambda self: IPv4Address(self._header[9]),
+        "ipv4_options": __decode_ipv4_options,
+    }
 
 
 #
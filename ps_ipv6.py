@@ -44,6 +44,10 @@
 import struct
 from ipaddress import IPv6Address
 
+from lazy_fields import LazyFields
+from ps_vnet import VNET_GSO_TCPV6
+from tx_buffer import TxBuffer
+
 # IPv6 protocol header
 
 # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
@@ -71,6 +75,9 @@ from ipaddress import IPv6Address
 
 IP6_HEADER_LEN = 40
 
+IP6_HEADER_STRUCT = struct.Struct("! L HBB 16s 16s")
+IP6_PSEUDO_HEADER_STRUCT = struct.Struct("! 16s 16s L BBBB")
+
 IP6_NEXT_HEADER_TCP = 6
 IP6_NEXT_HEADER_UDP = 17
 IP6_NEXT_HEADER_ICMP6 = 58
@@ -126,11 +133,13 @@ DSCP_TABLE = {
 ECN_TABLE = {0b00: "Non-ECT", 0b10: "ECT(0)", 0b01: "ECT(1)", 0b11: "CE"}
 
 
-class Ip6Packet:
+class Ip6Packet(LazyFields):
     """ IPv6 packet support class """
 
     protocol = "IPv6"
 
+    vnet_header = None
+
     def __init__(
         self,
         parent_packet=None,
@@ -151,20 +160,9 @@ class Ip6Packet:
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
-            raw_header = raw_packet[:IP6_HEADER_LEN]
-
-            self.raw_data = raw_packet[IP6_HEADER_LEN : IP6_HEADER_LEN + struct.unpack("!H", raw_header[4:6])[0]]
-
-            self.ipv6_ver = raw_header[0] >> 4
-            self.ipv6_dscp = ((raw_header[0] & 0b00001111) << 2) | ((raw_header[1] & 0b11000000) >> 6)
-            self.ipv6_ecn = (raw_header[1] & 0b00110000) >> 4
-            self.ipv6_flow = ((raw_header[1] & 0b00001111) << 16) | (raw_header[2] << 8) | raw_header[3]
-            self.ipv6_dlen = struct.unpack("!H", raw_header[4:6])[0]
-            self.ipv6_next = raw_header[6]
-            self.ipv6_hop = raw_header[7]
-            self.ipv6_src = IPv6Address(raw_header[8:24])
-            self.ipv6_dst = IPv6Address(raw_header[24:40])
+            # Fields are decoded on first access out of the zero copy view of the packet
+            self._packet = memoryview(parent_packet.raw_data)
+            self.vnet_header = parent_packet.vnet_header
 
         # Packet building
         else:
@@ -194,13 +192,22 @@ class Ip6Packet:
                 if child_packet.protocol == "TCP":
                     self.ipv6_next = IP6_NEXT_HEADER_TCP
 
-                self.ipv6_dlen = len(child_packet.raw_packet)
-                self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
+                self.ipv6_dlen = len(child_packet)
+                self.tx_buffer = child_packet.get_tx_buffer(self.ip_pseudo_header)
+                self.raw_data = self.tx_buffer.data
+
+                # Account for IPv6 header in the offload information passed to kernel
+                self.vnet_header = getattr(child_packet, "vnet_header", None)
+                if self.vnet_header:
+                    self.vnet_header.add_header_len(IP6_HEADER_LEN)
+                    if self.vnet_header.vnet_gso_size:
+                        self.vnet_header.vnet_gso_type = VNET_GSO_TCPV6
 
             else:
                 self.ipv6_next = ipv6_next
                 self.ipv6_dlen = len(raw_data)
-                self.raw_data = raw_data
+                self.tx_buffer = TxBuffer(raw_data)
+                self.raw_data = self.tx_buffer.data
 
     def __str__(self):
         """ Short packet log string """
@@ -213,18 +220,23 @@ class Ip6Packet:
     def __len__(self):
         """ Length of the packet """
 
-        return len(self.raw_packet)
+        return IP6_HEADER_LEN + self.ipv6_dlen
 
     @property
     def raw_header(self):
         """ Packet header in raw form """
 
-        return struct.pack(
-            "! BBBB HBB 16s 16s",
-            self.ipv6_ver << 4 | self.ipv6_dscp >> 4,
-            self.ipv6_dscp << 6 | self.ipv6_ecn << 4 | ((self.ipv6_flow & 0b000011110000000000000000) >> 16),
-            (self.ipv6_flow & 0b000000001111111100000000) >> 8,
-            self.ipv6_flow & 0b000000000000000011111111,
+        raw_header = bytearray(IP6_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
+
+    def pack_header_into(self, buffer, offset=0):
+        """ Write packet header into buffer at given offset """
+
+        IP6_HEADER_STRUCT.pack_into(
+            buffer,
+            offset,
+            self.ipv6_ver << 28 | self.ipv6_dscp << 22 | self.ipv6_ecn << 20 | self.ipv6_flow,
             self.ipv6_dlen,
             self.ipv6_next,
             self.ipv6_hop,
@@ -243,9 +255,30 @@ class Ip6Packet:
         """ Returns IPv6 pseudo header that is used by TCP to compute its checksum """
 
         # *** in the UDP/TCP length field need to account for IPv6 optional headers, current implementation assumes TCP/UDP is put right after IPv6 header ***
-        return struct.pack("! 16s 16s L BBBB", self.ipv6_src.packed, self.ipv6_dst.packed, self.ipv6_dlen, 0, 0, 0, self.ipv6_next)
+        return IP6_PSEUDO_HEADER_STRUCT.pack(self.ipv6_src.packed, self.ipv6_dst.packed, self.ipv6_dlen, 0, 0, 0, self.ipv6_next)
 
     def get_raw_packet(self):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+        """ Get packet in raw format """
 
         return self.raw_packet
+
+    def get_tx_buffer(self):
+        """ Get buffer with packet ready to be processed by lower level protocol, header is put in front of the data already in it """
+
+        self.pack_header_into(self.tx_buffer.buffer, self.tx_buffer.push(IP6_HEADER_LEN))
+        return self.tx_buffer
+
+    # Decoders of the fields of parsed packet, each field is decoded on first access
+    _decoders = {
+        "raw_data": lambda self: self._packet[IP6_HEADER_LEN : IP6_HEADER_LEN + self.ipv6_dlen],
+        "_header": lambda self: IP6_HEADER_STRUCT.unpack_from(self._packet),
+        "ipv6_ver": lambda self: self._header[0] >> 28,
+        "ipv6_dscp": lambda self: (self._header[0] >> 22) & 0b111111,
+        "ipv6_ecn": lambda self: (self._header[0] >> 20) & 0b11,
+        "ipv6_flow": lambda self: self._header[0] & 0b11111111111111111111,
+        "ipv6_dlen": lambda self: self._header[1],
+        "ipv6_next": lambda self: self._header[2],
+        "ipv6_hop": lambda self: self._header[3],
+        "ipv6_src": lambda self: IPv6Address(self._header[4]),
+        "ipv6_dst": lambda self: IPv6Address(self._header[5]),
+    }
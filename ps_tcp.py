@@ -44,7 +44,10 @@
 import struct
 
 import inet_cksum
+from lazy_fields import LazyFields
+from ps_vnet import VNET_F_NEEDS_CSUM, VnetHeader
 from tracker import Tracker
+from tx_buffer import TxBuffer
 
 # TCP packet header (RFC 793)
 
@@ -65,12 +68,16 @@ from tracker import Tracker
 
 TCP_HEADER_LEN = 20
 
+TCP_HEADER_STRUCT = struct.Struct("! HH L L BBH HH")
 
-class TcpPacket:
+
+class TcpPacket(LazyFields):
     """ TCP packet support class """
 
     protocol = "TCP"
 
+    vnet_header = None
+
     def __init__(
         self,
         parent_packet=None,
@@ -93,6 +100,8 @@ class TcpPacket:
         raw_data=b"",
         tracker=None,
         echo_tracker=None,
+        tcp_cksum_offload=False,
+        tcp_gso_size=0,
     ):
         """ Class constructor """
 
@@ -100,56 +109,10 @@ class TcpPacket:
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
-            raw_header = raw_packet[:TCP_HEADER_LEN]
-            raw_options = raw_packet[TCP_HEADER_LEN : (raw_header[12] & 0b11110000) >> 2]
-
-            self.raw_data = raw_packet[(raw_header[12] & 0b11110000) >> 2 :]
-            self.ip_pseudo_header = parent_packet.ip_pseudo_header
-
-            self.tcp_sport = struct.unpack("!H", raw_header[0:2])[0]
-            self.tcp_dport = struct.unpack("!H", raw_header[2:4])[0]
-            self.tcp_seq = struct.unpack("!L", raw_header[4:8])[0]
-            self.tcp_ack = struct.unpack("!L", raw_header[8:12])[0]
-            self.tcp_hlen = (raw_header[12] & 0b11110000) >> 2
-            self.tcp_reserved = raw_header[12] & 0b00001110
-            self.tcp_flag_ns = bool(raw_header[12] & 0b00000001)
-            self.tcp_flag_crw = bool(raw_header[13] & 0b10000000)
-            self.tcp_flag_ece = bool(raw_header[13] & 0b01000000)
-            self.tcp_flag_urg = bool(raw_header[13] & 0b00100000)
-            self.tcp_flag_ack = bool(raw_header[13] & 0b00010000)
-            self.tcp_flag_psh = bool(raw_header[13] & 0b00001000)
-            self.tcp_flag_rst = bool(raw_header[13] & 0b00000100)
-            self.tcp_flag_syn = bool(raw_header[13] & 0b00000010)
-            self.tcp_flag_fin = bool(raw_header[13] & 0b00000001)
-            self.tcp_win = struct.unpack("!H", raw_header[14:16])[0]
-            self.tcp_cksum = struct.unpack("!H", raw_header[16:18])[0]
-            self.tcp_urp = struct.unpack("!H", raw_header[18:20])[0]
-
-            self.tcp_options = []
-
-            opt_cls = {
-                TCP_OPT_MSS: TcpOptMss,
-                TCP_OPT_WSCALE: TcpOptWscale,
-                TCP_OPT_SACKPERM: TcpOptSackPerm,
-                TCP_OPT_TIMESTAMP: TcpOptTimestamp,
-            }
-
-            i = 0
-
-            while i < len(raw_options):
-
-                if raw_options[i] == TCP_OPT_EOL:
-                    self.tcp_options.append(TcpOptEol())
-                    break
-
-                if raw_options[i] == TCP_OPT_NOP:
-                    self.tcp_options.append(TcpOptNop())
-                    i += TCP_OPT_NOP_LEN
-                    continue
-
-                self.tcp_options.append(opt_cls.get(raw_options[i], TcpOptUnk)(raw_options[i : i + raw_options[i + 1]]))
-                i += self.raw_options[i + 1]
+            # Fields are decoded on first access out of the zero copy view of the packet
+            self._packet = memoryview(parent_packet.raw_data)
+            self._parent_packet = parent_packet
+            self.vnet_header = parent_packet.vnet_header
 
         # Packet building
         else:
@@ -184,12 +147,24 @@ class TcpPacket:
 
             assert self.tcp_hlen % 4 == 0, "TCP header len is not multiplcation of 4 bytes, check options"
 
+            # Leave checksum computation and segmentation of packets larger than 'tcp_gso_size' to kernel
+            if tcp_cksum_offload:
+                self.vnet_header = VnetHeader(vnet_flags=VNET_F_NEEDS_CSUM, vnet_hdr_len=self.tcp_hlen, vnet_gso_size=tcp_gso_size, vnet_csum_offset=16)
+
     @property
     def raw_header(self):
         """ Packet header in raw format """
 
-        return struct.pack(
-            "! HH L L BBH HH",
+        raw_header = bytearray(TCP_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
+
+    def pack_header_into(self, buffer, offset=0):
+        """ Write packet header into buffer at given offset """
+
+        TCP_HEADER_STRUCT.pack_into(
+            buffer,
+            offset,
             self.tcp_sport,
             self.tcp_dport,
             self.tcp_seq,
@@ -226,7 +201,7 @@ class TcpPacket:
     def __len__(self):
         """ Length of the packet """
 
-        return len(self.raw_packet)
+        return self.tcp_hlen + len(self.raw_data)
 
     @property
     def raw_options(self):
@@ -245,17 +220,30 @@ class TcpPacket:
 
         return self.raw_header + self.raw_options + self.raw_data
 
-    def get_raw_packet(self, ip_pseudo_header):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+    def get_tx_buffer(self, ip_pseudo_header):
+        """ Get buffer with packet ready to be processed by lower level protocol, data is copied into it once and header is put in front of it """
 
-        self.tcp_cksum = inet_cksum.compute_cksum(ip_pseudo_header + self.raw_packet)
+        tx_buffer = TxBuffer(self.raw_data)
+        offset = tx_buffer.push(self.tcp_hlen)
+        tx_buffer.buffer[offset + TCP_HEADER_LEN : offset + self.tcp_hlen] = self.raw_options
 
-        return self.raw_packet
+        ip_pseudo_header_sum = inet_cksum.compute_sum(ip_pseudo_header)
+
+        # In case of checksum offload kernel expects checksum field to carry the pseudo header sum only
+        if self.vnet_header:
+            self.tcp_cksum = ip_pseudo_header_sum
+        else:
+            self.tcp_cksum = 0
+            self.pack_header_into(tx_buffer.buffer, offset)
+            self.tcp_cksum = inet_cksum.compute_cksum(tx_buffer.data, init=ip_pseudo_header_sum)
+
+        self.pack_header_into(tx_buffer.buffer, offset)
+        return tx_buffer
 
     def validate_cksum(self, ip_pseudo_header):
-        """ Validate packet checksum """
+        """ Validate checksum of parsed packet """
 
-        return not bool(inet_cksum.compute_cksum(ip_pseudo_header + self.raw_packet))
+        return not inet_cksum.compute_cksum(self._packet, init=inet_cksum.compute_sum(ip_pseudo_header))
 
     @property
     def tcp_mss(self):
@@ -284,6 +272,15 @@ class TcpPacket:
                 return True
         return None
 
+    @property
+    def tcp_sack(self):
+        """ TCP option - Selective Acknowledgment (5) """
+
+        for option in self.tcp_options:
+            if option.opt_kind == TCP_OPT_SACK:
+                return option.opt_blocks
+        return None
+
     @property
     def tcp_timestamp(self):
         """ TCP option - Timestamp (8) """
@@ -293,6 +290,65 @@ class TcpPacket:
                 return option.opt_tsval, option.opt_tsecr
         return None
 
+    def __decode_tcp_options(self):
+        """ Decode options of parsed packet """
+
+        raw_options = bytes(self._packet[TCP_HEADER_LEN : self.tcp_hlen])
+
+        tcp_options = []
+
+        opt_cls = {
+            TCP_OPT_MSS: TcpOptMss,
+            TCP_OPT_WSCALE: TcpOptWscale,
+            TCP_OPT_SACKPERM: TcpOptSackPerm,
+            TCP_OPT_SACK: TcpOptSack,
+            TCP_OPT_TIMESTAMP: TcpOptTimestamp,
+        }
+
+        i = 0
+
+        while i < len(raw_options):
+
+            if raw_options[i] == TCP_OPT_EOL:
+                tcp_options.append(TcpOptEol())
+                break
+
+            if raw_options[i] == TCP_OPT_NOP:
+                tcp_options.append(TcpOptNop())
+                i += TCP_OPT_NOP_LEN
+                continue
+
+            tcp_options.append(opt_cls.get(raw_options[i], TcpOptUnk)(raw_options[i : i + raw_options[i + 1]]))
+            i += raw_options[i + 1]
+
+        return tcp_options
+
+    # Decoders of the fields of parsed packet, each field is decoded on first access
+    _decoders = {
+        "raw_data": lambda self: self._packet[self.tcp_hlen :],
+        "ip_pseudo_header": lambda self: self._parent_packet.ip_pseudo_header,
+        "_header": lambda self: TCP_HEADER_STRUCT.unpack_from(self._packet),
+        "tcp_sport": lambda self: self._header[0],
+        "tcp_dport": lambda self: self._header[1],
+        "tcp_seq": lambda self: self._header[2],
+        "tcp_ack": lambda self: self._header[3],
+        "tcp_hlen": lambda self: (self._header[4] & 0b11110000) >> 2,
+        "tcp_reserved": lambda self: self._header[4] & 0b00001110,
+        "tcp_flag_ns": lambda self: bool(self._header[4] & 0b00000001),
+        "tcp_flag_crw": lambda self: bool(self._header[5] & 0b10000000),
+        "tcp_flag_ece": lambda self: bool(self._header[5] & 0b01000000),
+        "tcp_flag_urg": lambda self: bool(self._header[5] & 0b00100000),
+        "tcp_flag_ack": lambda self: bool(self._header[5] & 0b00010000),
+        "tcp_flag_psh": lambda self: bool(self._header[5] & 0b00001000),
+        "tcp_flag_rst": lambda self: bool(self._header[5] & 0b00000100),
+        "tcp_flag_syn": lambda self: bool(self._header[5] & 0b00000010),
+        "tcp_flag_fin": lambda self: bool(self._header[5] & 0b00000001),
+        "tcp_win": lambda self: self._header[6],
+        "tcp_cksum": lambda self: self._header[7],
+        "tcp_urp": lambda self: self._header[8],
+        "tcp_options": __decode_tcp_options,
+    }
+
 
 #
 # TCP options
@@ -344,15 +400,15 @@ class TcpOptNop:
 TCP_OPT_MSS = 2
 TCP_OPT_MSS_LEN = 4
 
+TCP_OPT_MSS_STRUCT = struct.Struct("! BB H")
+
 
 class TcpOptMss:
     """ TCP option - Maximum Segment Size (2) """
 
     def __init__(self, raw_option=None, opt_mss=None):
         if raw_option:
-            self.opt_kind = raw_option[0]
-            self.opt_len = raw_option[1]
-            self.opt_mss = struct.unpack("!H", raw_option[2:4])[0]
+            self.opt_kind, self.opt_len, self.opt_mss = TCP_OPT_MSS_STRUCT.unpack_from(raw_option)
         else:
             self.opt_kind = TCP_OPT_MSS
             self.opt_len = TCP_OPT_MSS_LEN
@@ -360,7 +416,7 @@ class TcpOptMss:
 
     @property
     def raw_option(self):
-        return struct.pack("! BB H", self.opt_kind, self.opt_len, self.opt_mss)
+        return TCP_OPT_MSS_STRUCT.pack(self.opt_kind, self.opt_len, self.opt_mss)
 
     def __str__(self):
         return f"mss {self.opt_mss}"
@@ -418,21 +474,53 @@ class TcpOptSackPerm:
         return "sack_perm"
 
 
+# TCP option - Selective Acknowledgment (5)
+
+TCP_OPT_SACK = 5
+TCP_OPT_SACK_LEN = 2
+TCP_OPT_SACK_BLOCK_LEN = 8
+TCP_OPT_SACK_MAX_BLOCKS = 4
+
+TCP_OPT_SACK_BLOCK_STRUCT = struct.Struct("! LL")
+
+
+class TcpOptSack:
+    """ TCP option - Selective Acknowledgment (5) """
+
+    def __init__(self, raw_option=None, opt_blocks=None):
+        if raw_option:
+            self.opt_kind = raw_option[0]
+            self.opt_len = raw_option[1]
+            self.opt_blocks = [
+                TCP_OPT_SACK_BLOCK_STRUCT.unpack_from(raw_option, offset) for offset in range(TCP_OPT_SACK_LEN, len(raw_option) - 7, TCP_OPT_SACK_BLOCK_LEN)
+            ]
+        else:
+            self.opt_kind = TCP_OPT_SACK
+            self.opt_len = TCP_OPT_SACK_LEN + len(opt_blocks) * TCP_OPT_SACK_BLOCK_LEN
+            self.opt_blocks = opt_blocks
+
+    @property
+    def raw_option(self):
+        return struct.pack("! BB", self.opt_kind, self.opt_len) + b"".join(TCP_OPT_SACK_BLOCK_STRUCT.pack(*_) for _ in self.opt_blocks)
+
+    def __str__(self):
+        return "sack " + " ".join(f"{_[0]}-{_[1]}" for _ in self.opt_blocks)
+
+
 # TCP option - Timestamp
 
 TCP_OPT_TIMESTAMP = 8
 TCP_OPT_TIMESTAMP_LEN = 10
 
+TCP_OPT_TIMESTAMP_STRUCT = struct.Struct("! BB LL")
+
 
 class TcpOptTimestamp:
     """ TCP option - Timestamp (8) """
 
     def __init__(self, raw_option=None, opt_tsval=None, opt_tsecr=None):
         if raw_option:
-            self.opt_kind = raw_option[0]
-            self.opt_len = raw_option[1]
-            self.opt_tsval = struct.unpack("!L", raw_option[2:6])[0]
-            self.opt_tsecr = struct.unpack("!L", raw_option[6:10])[0]
+            self.opt_kind, self.opt_len, self.opt_tsval, self.opt_tsecr = TCP_OPT_TIMESTAMP_STRUCT.unpack_from(raw_option)
         else:
             self.opt_kind = TCP_OPT_TIMESTAMP
             self.opt_len = TCP_OPT_TIMESTAMP_LEN
@@ -441,7 +529,7 @@ class TcpOptTimestamp:
 
     @property
     def raw_option(self):
-        return struct.pack("! BB LL", self.opt_kind, self.opt_len, self.opt_tsval, self.opt_tsecr)
+        return TCP_OPT_TIMESTAMP_STRUCT.pack(self.opt_kind, self.opt_len, self.opt_tsval, self.opt_tsecr)
 
     def __str__(self):
         return f"ts {self.opt_tsval}/{self.opt_tsecr}"
@@ -44,7 +44,10 @@
 import struct
 
 import inet_cksum
+from lazy_fields import LazyFields
+from ps_vnet import VNET_F_NEEDS_CSUM, VnetHeader
 from tracker import Tracker
+from tx_buffer import TxBuffer
 
 # UDP packet header (RFC 768)
 
@@ -57,29 +60,27 @@ from tracker import Tracker
 
 UDP_HEADER_LEN = 8
 
+UDP_HEADER_STRUCT = struct.Struct("! HH HH")
 
-class UdpPacket:
+
+class UdpPacket(LazyFields):
     """ UDP packet support class """
 
     protocol = "UDP"
 
-    def __init__(self, parent_packet=None, udp_sport=None, udp_dport=None, raw_data=None, echo_tracker=None):
+    vnet_header = None
+
+    def __init__(self, parent_packet=None, udp_sport=None, udp_dport=None, raw_data=None, echo_tracker=None, udp_cksum_offload=False):
         """ Class constructor """
 
         # Packet parsing
         if parent_packet:
             self.tracker = parent_packet.tracker
 
-            raw_packet = parent_packet.raw_data
-            raw_header = raw_packet[:UDP_HEADER_LEN]
-
-            self.raw_data = raw_packet[UDP_HEADER_LEN : struct.unpack("!H", raw_header[4:6])[0]]
-            self.ip_pseudo_header = parent_packet.ip_pseudo_header
-
-            self.udp_sport = struct.unpack("!H", raw_header[0:2])[0]
-            self.udp_dport = struct.unpack("!H", raw_header[2:4])[0]
-            self.udp_plen = struct.unpack("!H", raw_header[4:6])[0]
-            self.udp_cksum = struct.unpack("!H", raw_header[6:8])[0]
+            # Fields are decoded on first access out of the zero copy view of the packet
+            self._packet = memoryview(parent_packet.raw_data)
+            self._parent_packet = parent_packet
+            self.vnet_header = parent_packet.vnet_header
 
         # Packet building
         else:
@@ -92,6 +93,10 @@ class UdpPacket:
 
             self.raw_data = raw_data
 
+            # Leave checksum computation to kernel
+            if udp_cksum_offload:
+                self.vnet_header = VnetHeader(vnet_flags=VNET_F_NEEDS_CSUM, vnet_hdr_len=UDP_HEADER_LEN, vnet_csum_offset=6)
+
     def __str__(self):
         """ Short packet log string """
 
@@ -100,13 +105,20 @@ class UdpPacket:
     def __len__(self):
         """ Length of the packet """
 
-        return len(self.raw_packet)
+        return self.udp_plen
 
     @property
     def raw_header(self):
         """ Packet header in raw format """
 
-        return struct.pack("! HH HH", self.udp_sport, self.udp_dport, self.udp_plen, self.udp_cksum)
+        raw_header = bytearray(UDP_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
+
+    def pack_header_into(self, buffer, offset=0):
+        """ Write packet header into buffer at given offset """
+
+        UDP_HEADER_STRUCT.pack_into(buffer, offset, self.udp_sport, self.udp_dport, self.udp_plen, self.udp_cksum)
 
     @property
     def raw_packet(self):
@@ -114,18 +126,41 @@ class UdpPacket:
 
         return self.raw_header + self.raw_data
 
-    def get_raw_packet(self, ip_pseudo_header):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+    def get_tx_buffer(self, ip_pseudo_header):
+        """ Get buffer with packet ready to be processed by lower level protocol, data is copied into it once and header is put in front of it """
+
+        tx_buffer = TxBuffer(self.raw_data)
+        offset = tx_buffer.push(UDP_HEADER_LEN)
+
+        ip_pseudo_header_sum = inet_cksum.compute_sum(ip_pseudo_header)
 
-        self.udp_cksum = inet_cksum.compute_cksum(ip_pseudo_header + self.raw_packet)
+        # In case of checksum offload kernel expects checksum field to carry the pseudo header sum only
+        if self.vnet_header:
+            self.udp_cksum = ip_pseudo_header_sum
+        else:
+            self.udp_cksum = 0
+            self.pack_header_into(tx_buffer.buffer, offset)
+            self.udp_cksum = inet_cksum.compute_cksum(tx_buffer.data, init=ip_pseudo_header_sum)
 
-        return self.raw_packet
+        self.pack_header_into(tx_buffer.buffer, offset)
+        return tx_buffer
 
     def validate_cksum(self, ip_pseudo_header):
-        """ Validate packet checksum """
+        """ Validate checksum of parsed packet """
 
         # Return valid checksum if checksum is not used
         if not self.udp_cksum:
             return True
 
-        return not bool(inet_cksum.compute_cksum(ip_pseudo_header + self.raw_packet))
+        return not inet_cksum.compute_cksum(self._packet[: self.udp_plen], init=inet_cksum.compute_sum(ip_pseudo_header))
+
+    # Decoders of the fields of parsed packet, each field is decoded on first access
+    _decoders = {
+        "raw_data": lambda self: self._packet[UDP_HEADER_LEN : self.udp_plen],
+        "ip_pseudo_header": lambda self: self._parent_packet.ip_pseudo_header,
+        "_header": lambda self: UDP_HEADER_STRUCT.unpack_from(self._packet),
+        "udp_sport": lambda self: self._header[0],
+        "udp_dport": lambda self: self._header[1],
+        "udp_plen": lambda self: self._header[2],
+        "udp_cksum": lambda self: self._header[3],
+    }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# ps_vnet.py - protocol support libary for virtio-net header used by TAP interface in IFF_VNET_HDR mode
+#
+
+
+import struct
+
+# Virtio-net header (virtio spec, legacy layout, fields in host byte order)
+
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |     Flags     |   GSO type    |          Header length        |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |            GSO size           |        Checksum start         |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |        Checksum offset        |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+
+
+VNET_HEADER_LEN = 10
+
+VNET_HEADER_STRUCT = struct.Struct("= BBHHHH")
+
+VNET_F_NEEDS_CSUM = 0x01  # Checksum needs to be computed starting at 'csum_start' and placed at 'csum_start + csum_offset'
+VNET_F_DATA_VALID = 0x02  # Checksum has been already validated by the kernel
+
+VNET_GSO_NONE = 0
+VNET_GSO_TCPV4 = 1
+VNET_GSO_UDP = 3
+VNET_GSO_TCPV6 = 4
+
+VNET_GSO_TABLE = {VNET_GSO_NONE: "NONE", VNET_GSO_TCPV4: "TCPv4", VNET_GSO_UDP: "UDP", VNET_GSO_TCPV6: "TCPv6"}
+
+
+class VnetHeader:
+    """ Virtio-net header support class """
+
+    def __init__(self, raw_header=None, vnet_flags=0, vnet_gso_type=VNET_GSO_NONE, vnet_hdr_len=0, vnet_gso_size=0, vnet_csum_start=0, vnet_csum_offset=0):
+        """ Class constructor """
+
+        # Header parsing
+        if raw_header:
+            (
+                self.vnet_flags,
+                self.vnet_gso_type,
+                self.vnet_hdr_len,
+                self.vnet_gso_size,
+                self.vnet_csum_start,
+                self.vnet_csum_offset,
+            ) = VNET_HEADER_STRUCT.unpack_from(raw_header)
+
+        # Header building, offsets are relative to the header of protocol that created it and get adjusted by each of lower level protocols
+        else:
+            self.vnet_flags = vnet_flags
+            self.vnet_gso_type = vnet_gso_type
+            self.vnet_hdr_len = vnet_hdr_len
+            self.vnet_gso_size = vnet_gso_size
+            self.vnet_csum_start = vnet_csum_start
+            self.vnet_csum_offset = vnet_csum_offset
+
+    def __str__(self):
+        """ Short header log string """
+
+        return (
+            f"VNET{' NEEDS_CSUM' if self.vnet_flags & VNET_F_NEEDS_CSUM else ''}{' DATA_VALID' if self.vnet_flags & VNET_F_DATA_VALID else ''}"
+            + f", gso {VNET_GSO_TABLE.get(self.vnet_gso_type, '???')}, gso_size {self.vnet_gso_size}, hdr_len {self.vnet_hdr_len}"
+            + f", csum_start {self.vnet_csum_start}, csum_offset {self.vnet_csum_offset}"
+        )
+
+    def __len__(self):
+        """ Length of the header """
+
+        return VNET_HEADER_LEN
+
+    @property
+    def raw_header(self):
+        """ Header in raw format """
+
+        raw_header = bytearray(VNET_HEADER_LEN)
+        self.pack_header_into(raw_header)
+        return bytes(raw_header)
+
+    def pack_header_into(self, buffer, offset=0):
+        """ Write header into buffer at given offset """
+
+        VNET_HEADER_STRUCT.pack_into(
+            buffer, offset, self.vnet_flags, self.vnet_gso_type, self.vnet_hdr_len, self.vnet_gso_size, self.vnet_csum_start, self.vnet_csum_offset
+        )
+
+    @property
+    def cksum_valid(self):
+        """ Check if kernel already validated checksum or the packet never left host so it has only partial checksum in it """
+
+        return bool(self.vnet_flags & (VNET_F_NEEDS_CSUM | VNET_F_DATA_VALID))
+
+    def add_header_len(self, header_len):
+        """ Account for header of lower level protocol being put in front of the packet """
+
+        self.vnet_csum_start += header_len
+        self.vnet_hdr_len += header_len
+
+
+VNET_HEADER_NONE = VnetHeader().raw_header
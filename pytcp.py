@@ -54,9 +54,11 @@ import stack
 from arp_cache import ArpCache
 from client_icmpv4_echo import ClientICMPv4Echo
 from client_tcp_echo import ClientTcpEcho
+from flow_cache import FlowCache
 from icmpv6_nd_cache import ICMPv6NdCache
 from ipv6_helper import ipv6_eui64
 from ph import PacketHandler
+from routing_table import RoutingTable
 from rx_ring import RxRing
 from service_tcp_daytime import ServiceTcpDaytime
 from service_tcp_discard import ServiceTcpDiscard
@@ -70,6 +72,10 @@ from tx_ring import TxRing
 TUNSETIFF = 0x400454CA
 IFF_TAP = 0x0002
 IFF_NO_PI = 0x1000
+IFF_MULTI_QUEUE = 0x0100
+IFF_VNET_HDR = 0x4000
+TUNSETOFFLOAD = 0x400454D0
+TUN_F_CSUM = 0x01
 
 
 ########################################################
@@ -102,15 +108,32 @@ def main():
         + "|</level> <level> <normal><cyan>{extra[object_name]}{function}:</cyan></normal> {message}</level>",
     )
 
-    tap = os.open("/dev/net/tun", os.O_RDWR)
-    fcntl.ioctl(tap, TUNSETIFF, struct.pack("16sH", stack.interface, IFF_TAP | IFF_NO_PI))
+    # Open tap interface, in multi-queue mode each open file descriptor attached to the interface represents separate queue
+    taps = []
+    for _ in range(stack.tap_queue_count):
+        tap = os.open("/dev/net/tun", os.O_RDWR)
+        fcntl.ioctl(
+            tap,
+            TUNSETIFF,
+            struct.pack(
+                "16sH",
+                stack.interface,
+                IFF_TAP | IFF_NO_PI | (IFF_MULTI_QUEUE if stack.tap_queue_count > 1 else 0) | (IFF_VNET_HDR if stack.tap_vnet_hdr else 0),
+            ),
+        )
+        # Let kernel hand us packets with partial checksums, TSO for inbound packets is not enabled as RX buffers are sized for MTU frames
+        if stack.tap_vnet_hdr:
+            fcntl.ioctl(tap, TUNSETOFFLOAD, TUN_F_CSUM)
+        taps.append(tap)
 
     # Initialize stack components
     StackTimer()
-    RxRing(tap)
-    TxRing(tap)
+    RxRing(taps)
+    TxRing(taps)
     ArpCache()
     ICMPv6NdCache()
+    RoutingTable()
+    FlowCache()
     PacketHandler()
 
     # Set proper local IP address pattern for services depending on whch version of IP is enabled
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# routing_table.py - module contains class supporting IPv4 and IPv6 routing table
+#
+
+
+import threading
+
+import loguru
+
+import stack
+
+ROUTE_CACHE_MAX_SIZE = 4096
+
+ROUTE_CONNECTED = "connected"
+ROUTE_STATIC = "static"
+ROUTE_DHCP = "dhcp"
+ROUTE_RA = "ra"
+
+
+class RoutingTable:
+    """ Support for routing table operations, each stack address has its own table (acts as separate VRF) and there is one shared table per IP version """
+
+    class Route:
+        """ Container class for routing table entries """
+
+        def __init__(self, prefix, gateway=None, egress_address=None, origin=ROUTE_STATIC):
+            self.prefix = prefix
+            self.gateway = gateway
+            self.egress_address = egress_address
+            self.origin = origin
+            self.expiry_task = None
+
+        def __str__(self):
+            """ Route log string """
+
+            return (
+                f"{self.prefix}"
+                + (f" via {self.gateway}" if self.gateway else " directly connected")
+                + (f", dev {self.egress_address}" if self.egress_address else "")
+                + f", {self.origin}"
+            )
+
+        @property
+        def table_id(self):
+            """ Id of the table route belongs to, either address of its egress interface or IP version for shared table """
+
+            return self.egress_address.ip if self.egress_address else self.prefix.version
+
+    def __init__(self):
+        """ Class constructor """
+
+        stack.routing_table = self
+
+        # Each table maps prefix length to dictionary of routes keyed by network part of the prefix, prefix lengths are kept in descending order
+        # so the first match found during lookup is the longest one
+        self.tables = {}
+
+        self.route_cache = {}
+
+        self.lock = threading.Lock()
+
+        self.logger = loguru.logger.bind(object_name="routing_table.")
+
+        self.logger.debug("Started routing table")
+
+    def add_route(self, prefix, gateway=None, egress_address=None, origin=ROUTE_STATIC, lifetime=None):
+        """ Add / replace route in routing table, route with lifetime (in seconds) gets removed once it runs out unless it's been refreshed """
+
+        route = self.Route(prefix, gateway, egress_address, origin)
+
+        with self.lock:
+            table = dict(self.tables.get(route.table_id, {}))
+            prefixes = dict(table.get(prefix.prefixlen, {}))
+            old_route = prefixes.get(int(prefix.network_address) >> (prefix.max_prefixlen - prefix.prefixlen))
+            prefixes[int(prefix.network_address) >> (prefix.max_prefixlen - prefix.prefixlen)] = route
+            table[prefix.prefixlen] = prefixes
+            self.tables[route.table_id] = dict(sorted(table.items(), reverse=True))
+            self.route_cache = {}
+
+        if old_route and old_route.expiry_task:
+            stack.stack_timer.cancel(old_route.expiry_task)
+
+        if lifetime is not None:
+            route.expiry_task = stack.stack_timer.register_method(method=self.__expire_route, args=[route], delay=lifetime * 1000, repeat_count=0)
+
+        stack.flow_cache.invalidate()
+
+        self.logger.debug(f"Added route {route}" + (f", lifetime {lifetime}s" if lifetime is not None else ""))
+
+    def remove_route(self, prefix, gateway=None, egress_address=None, origin=None):
+        """ Remove route from routing table, if origin or gateway is specified route gets removed only if it matches them """
+
+        self.__remove_route(prefix, egress_address, lambda _: (origin is None or _.origin == origin) and (gateway is None or _.gateway == gateway))
+
+    def __expire_route(self, route):
+        """ Remove route whose lifetime ran out unless it has been replaced in the meantime """
+
+        self.logger.debug(f"Route {route} expired")
+
+        self.__remove_route(route.prefix, route.egress_address, lambda _: _ is route)
+
+    def __remove_route(self, prefix, egress_address, match):
+        """ Remove route from routing table if it satisfies match condition """
+
+        table_id = egress_address.ip if egress_address else prefix.version
+
+        with self.lock:
+            table = dict(self.tables.get(table_id, {}))
+            prefixes = dict(table.get(prefix.prefixlen, {}))
+            route = prefixes.get(int(prefix.network_address) >> (prefix.max_prefixlen - prefix.prefixlen))
+            if route is None or not match(route):
+                return
+            del prefixes[int(prefix.network_address) >> (prefix.max_prefixlen - prefix.prefixlen)]
+            if prefixes:
+                table[prefix.prefixlen] = prefixes
+            else:
+                table.pop(prefix.prefixlen)
+            self.tables[table_id] = table
+            self.route_cache = {}
+
+        if route.expiry_task:
+            stack.stack_timer.cancel(route.expiry_task)
+
+        stack.flow_cache.invalidate()
+
+        self.logger.debug(f"Removed route {route}")
+
+    def find_route(self, ip_dst, ip_src=None):
+        """ Find longest prefix match route for destination, routes from source address table take precedence over shared ones with the same prefix length """
+
+        # Cache gets replaced on every routing table change, keeping reference to it makes sure route found in old table never lands in the new cache
+        route_cache = self.route_cache
+
+        if route := route_cache.get((ip_src, ip_dst)):
+            return route
+
+        best_route = None
+        ip_dst_int = int(ip_dst)
+
+        for table_id in (ip_src, ip_dst.version):
+            for prefixlen, prefixes in self.tables.get(table_id, {}).items():
+                if best_route and prefixlen <= best_route.prefix.prefixlen:
+                    break
+                if route := prefixes.get(ip_dst_int >> (ip_dst.max_prefixlen - prefixlen)):
+                    best_route = route
+                    break
+
+        if best_route:
+            if len(route_cache) >= ROUTE_CACHE_MAX_SIZE:
+                route_cache.clear()
+            route_cache[(ip_src, ip_dst)] = best_route
+
+        return best_route
+
+    @property
+    def routes(self):
+        """ List of all routes in routing table """
+
+        return [route for table in self.tables.values() for prefixes in table.values() for route in prefixes.values()]
@@ -42,56 +42,170 @@
 
 
 import os
+import select
 import threading
 
 import loguru
 
 import ps_ether
+import ps_vnet
 import stack
+from flow_hash import flow_hash
+from packet_ring import PacketRing
+
+RX_BUFFER_SIZE = 2048  # Size of single RX buffer, needs to fit the largest frame TAP interface can deliver
 
 
 class RxRing:
     """ Support for receiving packets from the network """
 
-    def __init__(self, tap):
-        """ Initialize access to tap interface and the inbound queue """
+    def __init__(self, taps):
+        """ Initialize access to tap interface queues and the inbound queue of each packet handler worker """
 
         stack.rx_ring = self
 
-        self.tap = tap
-        self.rx_ring = []
+        self.taps = taps
+        self.rx_queues = [
+            PacketRing(stack.rx_ring_size, stack.rx_ring_urgent_size, stack.rx_ring_overflow_policy) for _ in range(stack.packet_handler_worker_count)
+        ]
         self.logger = loguru.logger.bind(object_name="rx_ring.")
 
-        self.packet_enqueued = threading.Semaphore(0)
+        # Counters used to measure RX performance, buffer allocations count the buffer pool along with every frame copied out of it
+        # Each tap queue has its own set of counters so RX threads never update the same counter
+        self.stats_frames = [0] * len(self.taps)
+        self.stats_bytes = [0] * len(self.taps)
+        self.stats_wakeups = [0] * len(self.taps)
+        self.stats_buffer_allocations = [0] * len(self.taps)
+
+        for queue_id, tap in enumerate(self.taps):
+            if stack.rx_ring_batch_mode:
+                os.set_blocking(tap, False)
+                threading.Thread(target=self.__thread_receive_batch, args=(queue_id,)).start()
+            else:
+                threading.Thread(target=self.__thread_receive, args=(queue_id,)).start()
+
+        self.logger.debug(
+            f"Started RX ring, {len(self.taps)} tap queue(s), {len(self.rx_queues)} worker queue(s){', batch mode' if stack.rx_ring_batch_mode else ''}"
+        )
+
+    @staticmethod
+    def __parse_frame(frame):
+        """ Parse frame read from tap interface, in virtio-net header mode frame is preceded by the header """
+
+        if not stack.tap_vnet_hdr:
+            return ps_ether.EtherPacket(frame)
 
-        threading.Thread(target=self.__thread_receive).start()
-        self.logger.debug("Started RX ring")
+        ether_packet_rx = ps_ether.EtherPacket(frame[ps_vnet.VNET_HEADER_LEN :])
+        ether_packet_rx.vnet_header = ps_vnet.VnetHeader(frame[: ps_vnet.VNET_HEADER_LEN])
+        return ether_packet_rx
+
+    def __worker_id(self, ether_packet_rx):
+        """ Pick packet handler worker for given packet based on its flow hash """
+
+        if len(self.rx_queues) == 1:
+            return 0
+
+        return flow_hash(ether_packet_rx.ether_type, ether_packet_rx.raw_data) % len(self.rx_queues)
 
     def __enqueue(self, ether_packet_rx):
         """ Enqueue packet for further processing """
 
-        if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_ARP:
-            self.rx_ring.insert(0, ether_packet_rx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, priority: Urgent, queue len: {len(self.rx_ring)}")
+        rx_queue = self.rx_queues[self.__worker_id(ether_packet_rx)]
+        urgent = ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_ARP
+
+        if not rx_queue.enqueue(ether_packet_rx, urgent=urgent):
+            self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, RX ring full, packet dropped, drops: {rx_queue.drops}")
+            return
+
+        self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, priority: {'Urgent' if urgent else 'Normal'}, queue len: {len(rx_queue)}")
+
+    def __enqueue_batch(self, ether_packet_rx_batch):
+        """ Enqueue batch of packets for further processing, ARP packets go to the urgent lane """
+
+        if len(self.rx_queues) == 1:
+            worker_batches = {0: ether_packet_rx_batch}
         else:
-            self.rx_ring.append(ether_packet_rx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, priority: Normal, queue len: {len(self.rx_ring)}")
+            worker_batches = {}
+            for ether_packet_rx in ether_packet_rx_batch:
+                worker_batches.setdefault(self.__worker_id(ether_packet_rx), []).append(ether_packet_rx)
 
-        self.packet_enqueued.release()
+        for worker_id, worker_batch in worker_batches.items():
+            if drops := self.rx_queues[worker_id].enqueue_batch(worker_batch, lambda _: _.ether_type == ps_ether.ETHER_TYPE_ARP):
+                self.logger.debug(f"RX ring full, {drops} packets dropped, worker {worker_id} drops: {self.rx_queues[worker_id].drops}")
 
-    def __thread_receive(self):
+    def __thread_receive(self, queue_id):
         """ Thread responsible for receiving and enqueuing incoming packets """
 
+        tap = self.taps[queue_id]
+
         while True:
 
             # Wait till there is any packet comming and pick it up
-            ether_packet_rx = ps_ether.EtherPacket(os.read(self.tap, 2048))
-            self.logger.opt(ansi=True).debug(f"<green>[RX]</green> {ether_packet_rx.tracker} - {len(ether_packet_rx)} bytes")
+            frame = os.read(tap, RX_BUFFER_SIZE)
+            ether_packet_rx = self.__parse_frame(frame)
+            self.stats_frames[queue_id] += 1
+            self.stats_bytes[queue_id] += len(frame)
+            self.stats_wakeups[queue_id] += 1
+            self.stats_buffer_allocations[queue_id] += 1
+            self.logger.opt(ansi=True).debug(f"<green>[RX]</green> {ether_packet_rx.tracker} - {len(frame)} bytes")
             self.__enqueue(ether_packet_rx)
 
-    def dequeue(self):
-        """ Dequeue inboutd packet from RX ring """
+    def __thread_receive_batch(self, queue_id):
+        """ Thread responsible for draining all the frames available on tap interface in single wakeup and enqueuing them as one batch """
 
-        self.packet_enqueued.acquire()
+        tap = self.taps[queue_id]
+
+        # Preallocate pool of RX buffers, each frame read in single wakeup gets its own buffer slot
+        rx_buffer_pool = [bytearray(RX_BUFFER_SIZE) for _ in range(stack.rx_ring_batch_size)]
+        rx_buffer_views = [memoryview(_) for _ in rx_buffer_pool]
+        self.stats_buffer_allocations[queue_id] += len(rx_buffer_pool)
+
+        poll = select.poll()
+        poll.register(tap, select.POLLIN)
+
+        while True:
 
-        return self.rx_ring.pop(0)
+            # Wait till there is any packet comming
+            poll.poll()
+            self.stats_wakeups[queue_id] += 1
+
+            # Read all the available frames into preallocated buffers, the frame content is copied out of the buffer when packet is being parsed
+            ether_packet_rx_batch = []
+            batch_bytes = 0
+            for rx_buffer_view in rx_buffer_views:
+                try:
+                    frame_len = os.readv(tap, [rx_buffer_view])
+                except BlockingIOError:
+                    break
+                ether_packet_rx_batch.append(self.__parse_frame(rx_buffer_view[:frame_len]))
+                batch_bytes += frame_len
+
+            if not ether_packet_rx_batch:
+                continue
+
+            self.stats_frames[queue_id] += len(ether_packet_rx_batch)
+            self.stats_bytes[queue_id] += batch_bytes
+            # Buffer slot gets reused in the next wakeup so parsed packet holds its own copy of the frame
+            self.stats_buffer_allocations[queue_id] += len(ether_packet_rx_batch)
+            self.logger.opt(ansi=True).debug(f"<green>[RX]</green> Queue {queue_id}, batch of {len(ether_packet_rx_batch)} frames - {batch_bytes} bytes")
+            self.__enqueue_batch(ether_packet_rx_batch)
+
+    def dequeue(self, worker_id=0):
+        """ Dequeue batch of all the inbound packets currently waiting in RX ring of given packet handler worker """
+
+        return self.rx_queues[worker_id].dequeue_batch()
+
+    @property
+    def stats(self):
+        """ RX performance counters """
+
+        frames = sum(self.stats_frames)
+        wakeups = sum(self.stats_wakeups)
+
+        return {
+            "frames": frames,
+            "bytes": sum(self.stats_bytes),
+            "frames_per_wakeup": frames / wakeups if wakeups else 0,
+            "buffer_allocations_per_frame": sum(self.stats_buffer_allocations) / frames if frames else 0,
+            "drops": [_.drops for _ in self.rx_queues],
+        }
@@ -56,7 +56,7 @@ mac_address_candidate = ["02:00:00:77:77:77"]
 # IPv6 address auto configuration is implemented using EUI64 addressing and ICMPv6 Router Advertisement messages
 ipv6_address_autoconfig_enabled = True
 
-# There is no IPv6 routing implemented yet so we do not care about the IPv6 default gateway address
+# IPv6 default route is learned from ICMPv6 Router Advertisement messages so there is no need to configure gateway address here
 ipv6_address_candidate = [
     # IPv6Interface("FE80::7/64"),
     # IPv6Interface("FE80::77/64"),
@@ -90,10 +90,72 @@ ipv4_address_candidate = [
     # ("10.10.10.7/24", "10.10.10.1"),
 ]
 
+# Static routes may be configured here, each entry is a tuple of destination prefix and gateway address, routes are shared by all stack addresses
+# Default gateway of each stack IPv4 address is installed in its own routing table so each address acts as separate VRF
+ipv4_static_routes = [
+    # ("10.0.0.0/8", "192.168.9.254"),
+]
+ipv6_static_routes = [
+    # ("2001:db8::/32", "fe80::1"),
+]
+
 mtu = 1500  # TAP interface MTU
 
+# RX ring batch mode, all frames available on TAP interface are read in single wakeup into preallocated buffers and handed to packet handler at once
+rx_ring_batch_mode = True
+rx_ring_batch_size = 64  # Maximum number of frames read in single wakeup, this is also the size of RX buffer pool
+
+# TX ring batch mode, all the frames queued for transmission are dequeued at once and written to TAP interface back to back
+# Optionally ring can wait till at least 'flush threshold' frames are queued but no longer than 'max latency' seconds, urgent frames are always flushed
+# right away, this coalesces more frames into single write at the cost of added latency so by default frames are flushed as soon as they are queued
+tx_ring_batch_mode = True
+tx_ring_batch_size = 64  # Maximum number of frames written in single batch
+tx_ring_flush_threshold = 1  # Set above 1 (eg. 16) to hold frames back till that many of them are queued
+tx_ring_max_latency = 0  # Longest time frames can be held back (eg. 0.0005)
+
+# RX and TX ring queue sizes, each ring has separate high priority lane for urgent packets (ARP and TCP control packets)
+# Overflow policy can be set to 'tail_drop' (drop new packet), 'head_drop' (drop oldest packet) or 'block' (block producer till there is room in queue)
+rx_ring_size = 1024
+rx_ring_urgent_size = 256
+rx_ring_overflow_policy = "tail_drop"
+tx_ring_size = 1024
+tx_ring_urgent_size = 256
+tx_ring_overflow_policy = "block"
+
+# Multi-queue TAP support, when queue count is above 1 TAP interface is opened with IFF_MULTI_QUEUE flag and each queue gets its own RX thread
+# and its own TX ring, inbound packets are steered to packet handler workers by flow hash so all packets of given session are processed by the same worker
+tap_queue_count = 1
+packet_handler_worker_count = 1
+
+# Virtio-net header mode, TAP interface is opened with IFF_VNET_HDR flag so kernel computes TCP/UDP checksums for outbound packets, segments outbound
+# TCP packets up to 'tap_vnet_hdr_gso_max' bytes into MSS sized ones (TSO/GSO) and marks inbound packets which checksum it has already validated
+tap_vnet_hdr = False
+tap_vnet_hdr_gso_max = 65000
+
 local_tcp_mss = 1460  # Maximum segment peer can send to us
-local_tcp_win = 65535  # Maximum amount of data peer can send to us without confirmation
+
+# TCP socket buffers, default sizes of the send (SO_SNDBUF) and receive (SO_RCVBUF) buffer, socket can change them with its 'sndbuf' and 'rcvbuf'
+# attributes before connection is made, window advertised to peer is the space left in receive buffer and windows above 65535 bytes need window scaling
+tcp_sndbuf = 4194304
+tcp_rcvbuf = 4194304
+
+# TCP Window Scale (RFC 7323), when peer agrees to use it windows are advertised in units of 2^wscale bytes so they can grow past 64 KB,
+# with scaling disabled or not supported by peer the advertised window is limited to 65535 bytes
+tcp_wscale_support = True
+
+# TCP burst transmission, single FSM pass sends out as many data segments as the usable sending window allows
+# Pacing can be enabled by limiting number of segments sent in single pass, remaining ones are then sent in following passes spaced out to match
+# pacing rate of session's congestion control (one milisecond apart till session measures its RTT)
+tcp_tx_burst_size = 0  # Maximum number of segments sent in single pass, 0 means no limit
+
+# TCP Selective Acknowledgment (RFC 2018 / RFC 6675), when peer agrees to use it only the holes peer reported are retransmitted after data loss
+tcp_sack_support = True
+
+# TCP Timestamps (RFC 7323), when peer agrees to use them every ACK gives RTT sample for the retransmit timeout calculation (RFC 6298)
+tcp_timestamps_support = True
+
+# TCP congestion control algorithm used by default, 'newreno' or 'cubic', socket can pick different one before it connects or starts listening
+tcp_congestion_control = "cubic"
 
 # Test services and clients, for detailed configuation of each reffer to pytcp.py and respective service/client file
 # Those are being used for testing various stack components are therefore their 'default' funcionality may be altered fro specific tst needs
@@ -111,6 +173,8 @@ client_icmpv4_echo = True
 rx_ring = None
 tx_ring = None
 arp_cache = None
+routing_table = None
+flow_cache = None
 icmpv6_nd_cache = None
 packet_handler = None
 stack_timer = None
@@ -41,6 +41,8 @@
 #
 
 
+import heapq
+import itertools
 import threading
 import time
 
@@ -50,7 +52,7 @@ import stack
 
 
 class StackTimerTask:
-    """ Timer task support class """
+    """ Timer task support class, also serves as handle that can be used to cancel the task """
 
     def __init__(self, method, args, kwargs, delay, delay_exp, repeat_count, stop_condition):
         """ Class constructor, repeat_count = -1 means infinite, delay_exp means to raise delay time exponentialy after each method execution """
@@ -63,32 +65,30 @@ class StackTimerTask:
         self.repeat_count = repeat_count
         self.stop_condition = stop_condition
 
-        self.remaining_delay = delay
         self.delay_exp_factor = 0
+        self.cancelled = False
 
-    def tick(self):
-        """ Tick input from timer """
+    def run(self):
+        """ Execute task's method, return delay after which it should run again or None if it's done """
 
-        self.remaining_delay -= 1
+        if self.cancelled or (self.stop_condition and self.stop_condition()):
+            return None
 
-        if self.stop_condition and self.stop_condition():
-            self.remaining_delay = 0
-            return
+        self.method(*self.args, **self.kwargs)
 
-        if self.remaining_delay:
-            return
+        if not self.repeat_count or self.cancelled:
+            return None
 
-        self.method(*self.args, **self.kwargs)
+        delay = self.delay * (1 << self.delay_exp_factor) if self.delay_exp else self.delay
+        self.delay_exp_factor += 1
+        if self.repeat_count > 0:
+            self.repeat_count -= 1
 
-        if self.repeat_count:
-            self.remaining_delay = self.delay * (1 << self.delay_exp_factor) if self.delay_exp else self.delay
-            self.delay_exp_factor += 1
-            if self.repeat_count > 0:
-                self.repeat_count -= 1
+        return delay
 
 
 class StackTimer:
-    """ Support for stack timer """
+    """ Support for stack timer, tasks are kept in deadline ordered heap and timer thread sleeps till the earliest of them is due """
 
     def __init__(self):
         """ Class constructor """
@@ -99,47 +99,82 @@ class StackTimer:
 
         self.run_stack_timer = True
 
-        self.tasks = []
-        self.timers = {}
+        self.tasks = []  # Heap of (deadline, sequence number, task) entries, cancelled tasks are discarded when they come up
+        self.task_seq = itertools.count()
+        self.timers = {}  # Named timer deadlines, expired ones are removed by cleanup task scheduled along with them
+
+        self.condition = threading.Condition()
 
         threading.Thread(target=self.__thread_timer).start()
         self.logger.debug("Started stack timer")
 
     def __thread_timer(self):
-        """ Thread responsible for executing registered methods on every timer tick """
+        """ Thread responsible for executing registered methods when they become due """
 
         while self.run_stack_timer:
-            time.sleep(0.001)
+            with self.condition:
+                if not self.tasks:
+                    self.condition.wait()
+                    continue
 
-            # Tck registered timers
-            for name in self.timers:
-                self.timers[name] -= 1
+                if (timeout := self.tasks[0][0] - time.monotonic()) > 0:
+                    self.condition.wait(timeout)
+                    continue
 
-            # Cleanup expired timers
-            self.timers = {_: __ for _, __ in self.timers.items() if __}
+                _, _, task = heapq.heappop(self.tasks)
 
-            # Tick registered methods
-            for task in self.tasks:
-                task.tick()
+            # Run the method without holding the lock so it can register or cancel tasks itself
+            if (delay := task.run()) is not None:
+                self.__schedule(task, delay)
 
-            # Cleanup expired methods
-            self.tasks = [_ for _ in self.tasks if _.remaining_delay]
+    def __schedule(self, task, delay):
+        """ Put task on the heap, wake up timer thread if task became the earliest one """
+
+        with self.condition:
+            heapq.heappush(self.tasks, (time.monotonic() + delay / 1000, next(self.task_seq), task))
+            if self.tasks[0][2] is task:
+                self.condition.notify()
 
     def register_method(self, method, args=None, kwargs=None, delay=1, delay_exp=False, repeat_count=-1, stop_condition=None):
-        """ Register method to be executed by timer """
+        """ Register method to be executed by timer, returns handle that can be used to cancel it """
 
-        self.tasks.append(
-            StackTimerTask(method, [] if args is None else args, {} if kwargs is None else kwargs, delay, delay_exp, repeat_count, stop_condition)
-        )
+        task = StackTimerTask(method, [] if args is None else args, {} if kwargs is None else kwargs, delay, delay_exp, repeat_count, stop_condition)
+        self.__schedule(task, delay)
+        return task
 
     def register_timer(self, name, timeout):
-        """ Register delay timer """
+        """ Register delay timer, returns handle that can be used to cancel it """
+
+        deadline = time.monotonic() + timeout / 1000
+        with self.condition:
+            self.timers[name] = deadline
+        return self.register_method(method=self.__cleanup_timer, args=[name, deadline], delay=timeout, repeat_count=0)
+
+    def __cleanup_timer(self, name, deadline):
+        """ Remove expired timer unless it has been registered again in the meantime """
 
-        self.timers[name] = timeout
+        # Compare and delete under lock so timer re-registered by other thread is not lost
+        with self.condition:
+            if self.timers.get(name) == deadline:
+                del self.timers[name]
+
+    def cancel(self, task):
+        """ Cancel registered method or timer using handle returned when it was registered """
+
+        task.cancelled = True
+
+        # Cancelled timer counts as expired
+        if task.method == self.__cleanup_timer:
+            self.__cleanup_timer(*task.args)
 
     def timer_expired(self, name):
         """ Check if timer expired """
 
         self.logger.opt(ansi=True).trace(f"<red>Active timers: {self.timers}</>")
 
-        return not self.timers.get(name, None)
+        return (deadline := self.timers.get(name)) is None or time.monotonic() >= deadline
+
+    def timer_remaining(self, name):
+        """ Get time remaining till timer expires in miliseconds, expired or unknown timer has no time remaining """
+
+        return max(((self.timers.get(name) or 0) - time.monotonic()) * 1000, 0)
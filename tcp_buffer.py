@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# tcp_buffer.py - module contains class used as TCP session's send and receive buffer
+#
+
+
+from collections import deque
+
+TCP_BUFFER_COALESCE_SIZE = 4096  # Small writes get merged into chunks of up to this size so segments rarely span multiple chunks
+
+
+class TcpBuffer:
+    """ Byte stream buffer, data is kept in queue of immutable chunks so appending and consuming it is O(1) and slices of it are zero copy """
+
+    def __init__(self):
+        """ Class constructor """
+
+        self.chunks = deque()
+        self.offset = 0  # Number of bytes already consumed from the first chunk
+        self.length = 0
+
+    def __len__(self):
+        """ Number of bytes in buffer """
+
+        return self.length
+
+    def append(self, data):
+        """ Append data to the end of buffer """
+
+        if not data:
+            return
+
+        # Merge small write with the last chunk if that is small too
+        if self.chunks and len(data) + len(self.chunks[-1]) <= TCP_BUFFER_COALESCE_SIZE:
+            self.chunks[-1] += data
+        else:
+            self.chunks.append(bytes(data))
+
+        self.length += len(data)
+
+    def peek(self, start, length):
+        """ Get 'length' bytes starting at 'start' without consuming them, view into single chunk is returned if possible """
+
+        length = min(length, self.length - start)
+        if length <= 0:
+            return b""
+
+        start += self.offset
+        for chunk in self.chunks:
+            if start < len(chunk):
+                break
+            start -= len(chunk)
+
+        if start + length <= len(chunk):
+            return memoryview(chunk)[start : start + length]
+
+        return self.__join(chunk, start, length)
+
+    def consume(self, length):
+        """ Drop 'length' bytes from the beginning of buffer """
+
+        length = min(length, self.length)
+        self.length -= length
+        length += self.offset
+
+        while self.chunks and length >= len(self.chunks[0]):
+            length -= len(self.chunks.popleft())
+
+        self.offset = length if self.chunks else 0
+
+    def read(self, length=None):
+        """ Get 'length' bytes from the beginning of buffer and consume them """
+
+        data = bytes(self.peek(0, self.length if length is None else length))
+        self.consume(len(data))
+        return data
+
+    def __join(self, first_chunk, start, length):
+        """ Copy data spanning multiple chunks into single bytes object, 'start' is relative to the first chunk that contains the data """
+
+        parts = []
+        chunks = iter(self.chunks)
+        for chunk in chunks:
+            if chunk is first_chunk:
+                break
+
+        while True:
+            parts.append(memoryview(chunk)[start : start + length])
+            length -= len(parts[-1])
+            if not length:
+                return b"".join(parts)
+            start = 0
+            chunk = next(chunks)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# tcp_congestion_control.py - module contains congestion control algorithms used by TCP session
+#
+
+
+import time
+from abc import ABC, abstractmethod
+
+TCP_CC_SSTHRESH_INIT = 0x7FFFFFFF  # Initial slow start threshold is arbitrarily high (RFC 5681)
+
+CUBIC_C = 0.4  # Scaling constant determining aggressiveness of window growth (RFC 9438)
+CUBIC_BETA = 0.7  # Multiplicative window decrease factor (RFC 9438)
+CUBIC_ALPHA = 3 * (1 - CUBIC_BETA) / (1 + CUBIC_BETA)  # Additive increase factor of the Reno-friendly window estimate (RFC 9438)
+
+
+class TcpCongestionControl(ABC):
+    """ Base class for TCP congestion control algorithms, session calls its hooks and uses 'cwnd' to limit amount of data in flight """
+
+    name = None
+
+    def __init__(self, mss=536):
+        """ Class constructor """
+
+        self.mss = mss  # Maximum segment size used by session
+        self.cwnd = self.initial_window  # Congestion window (bytes)
+        self.ssthresh = TCP_CC_SSTHRESH_INIT  # Slow start threshold (bytes)
+
+    def __str__(self):
+        """ String representation """
+
+        return f"{self.name} cwnd {self.cwnd}, ssthresh {self.ssthresh}"
+
+    @property
+    def initial_window(self):
+        """ Initial congestion window (RFC 5681) """
+
+        return min(4 * self.mss, max(2 * self.mss, 4380))
+
+    def on_init(self, mss):
+        """ Session got established and learned peer's MSS """
+
+        self.mss = mss
+        self.cwnd = self.initial_window
+
+    @abstractmethod
+    def on_ack(self, acked, rtt=None):
+        """ Peer acked new data outside of loss recovery, 'rtt' is session's smoothed RTT (ms) if it has been measured already """
+
+    @abstractmethod
+    def on_loss(self, flight):
+        """ Loss got detected by duplicate ACKs / SACK information, 'flight' is amount of data outstanding at that moment """
+
+    @abstractmethod
+    def on_rto(self, flight):
+        """ Retransmit timeout expired, 'flight' is amount of data outstanding at that moment """
+
+    def pacing_rate(self, rtt=None):
+        """ Rate (bytes per second) session should pace its transmission at, None if RTT has not been measured yet """
+
+        if not rtt:
+            return None
+
+        # Same as Linux, leave room for window growth, twice as much in early slow start
+        return (2 if self.cwnd < self.ssthresh / 2 else 1.2) * self.cwnd * 1000 / rtt
+
+
+class TcpNewReno(TcpCongestionControl):
+    """ NewReno congestion control (RFC 5681, RFC 6582) """
+
+    name = "newreno"
+
+    def __init__(self, mss=536):
+        """ Class constructor """
+
+        super().__init__(mss)
+        self.bytes_acked = 0  # Data acked during congestion avoidance since cwnd was last enlarged
+
+    def on_ack(self, acked, rtt=None):
+        """ Slow start grows cwnd by amount of acked data, congestion avoidance by one MSS per cwnd of acked data (RFC 3465) """
+
+        if self.cwnd < self.ssthresh:
+            self.cwnd = min(self.cwnd + acked, self.ssthresh)
+            return
+
+        self.bytes_acked += acked
+        if self.bytes_acked >= self.cwnd:
+            self.bytes_acked -= self.cwnd
+            self.cwnd += self.mss
+
+    def on_loss(self, flight):
+        """ Halve the window """
+
+        self.ssthresh = max(flight // 2, 2 * self.mss)
+        self.cwnd = self.ssthresh
+        self.bytes_acked = 0
+
+    def on_rto(self, flight):
+        """ Halve the slow start threshold and start over with single segment """
+
+        self.ssthresh = max(flight // 2, 2 * self.mss)
+        self.cwnd = self.mss
+        self.bytes_acked = 0
+
+
+class TcpCubic(TcpCongestionControl):
+    """ CUBIC congestion control (RFC 9438) """
+
+    name = "cubic"
+
+    def __init__(self, mss=536):
+        """ Class constructor """
+
+        super().__init__(mss)
+        self.w_max = 0  # Window size just before the last window reduction (bytes)
+        self.w_est = 0  # Window estimate of Reno-friendly region (bytes)
+        self.cwnd_origin = 0  # Plateau of the cubic function (bytes)
+        self.k = 0  # Time it takes the cubic function to reach its plateau (s)
+        self.epoch_start = None  # Time current congestion avoidance stage started
+
+    def on_ack(self, acked, rtt=None):
+        """ Slow start same as in NewReno, in congestion avoidance follow the cubic function unless Reno would grow the window faster """
+
+        if self.cwnd < self.ssthresh:
+            self.cwnd = min(self.cwnd + acked, self.ssthresh)
+            return
+
+        now = time.monotonic()
+
+        if self.epoch_start is None:
+            self.epoch_start = now
+            self.w_est = self.cwnd
+            if self.cwnd < self.w_max:
+                self.k = ((self.w_max - self.cwnd) / self.mss / CUBIC_C) ** (1 / 3)
+                self.cwnd_origin = self.w_max
+            else:
+                self.k = 0
+                self.cwnd_origin = self.cwnd
+
+        # Window the cubic function expects one RTT from now, growth is limited to 50% per RTT
+        t = now - self.epoch_start + (rtt or 0) / 1000
+        target = min(max(self.cwnd_origin + CUBIC_C * (t - self.k) ** 3 * self.mss, self.cwnd), 1.5 * self.cwnd)
+
+        self.w_est += CUBIC_ALPHA * self.mss * acked / self.cwnd
+
+        if target < self.w_est:
+            self.cwnd = int(self.w_est)
+        else:
+            self.cwnd = int(self.cwnd + (target - self.cwnd) * acked / self.cwnd)
+
+    def on_loss(self, flight):
+        """ Reduce the window by beta factor, remember where the reduction happened so the cubic function can plateau there """
+
+        self.epoch_start = None
+        # Fast convergence, release some bandwidth to new flows when window keeps getting smaller
+        self.w_max = int(self.cwnd * (1 + CUBIC_BETA) / 2) if self.cwnd < self.w_max else self.cwnd
+        self.ssthresh = max(int(self.cwnd * CUBIC_BETA), 2 * self.mss)
+        self.cwnd = self.ssthresh
+
+    def on_rto(self, flight):
+        """ Reduce the slow start threshold same as on loss and start over with single segment """
+
+        self.on_loss(flight)
+        self.cwnd = self.mss
+
+
+TCP_CONGESTION_CONTROL = {_.name: _ for _ in (TcpNewReno, TcpCubic)}
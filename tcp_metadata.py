@@ -59,6 +59,9 @@ class TcpMetadata:
         win,
         wscale,
         mss,
+        sackperm,
+        sack,
+        timestamp,
         raw_data,
         tracker,
     ):
@@ -75,6 +78,9 @@ class TcpMetadata:
         self.win = win
         self.wscale = wscale
         self.mss = mss
+        self.sackperm = sackperm
+        self.sack = sack
+        self.timestamp = timestamp
         self.raw_data = raw_data
         self.tracker = tracker
 
@@ -41,19 +41,39 @@
 #
 
 
+import collections
 import random
 import threading
+import time
 
 import loguru
 
 import stack
-
-PACKET_RETRANSMIT_TIMEOUT = 1000  # Retransmit data if ACK not received
+from ps_tcp import TCP_OPT_SACK_MAX_BLOCKS
+from tcp_buffer import TcpBuffer
+from tcp_congestion_control import TCP_CONGESTION_CONTROL
+
+PACKET_RETRANSMIT_TIMEOUT = 1000  # Retransmit data if ACK not received, this is initial value used till first RTT measurement is taken
+PACKET_RETRANSMIT_TIMEOUT_MIN = 200  # Lower bound of the RTT variation term of the retransmit timeout computed from RTT measurements
+PACKET_RETRANSMIT_TIMEOUT_MAX = 60000  # Upper bound of the retransmit timeout, applies to backed off timeout as well
+RTT_SAMPLE_HISTORY = 64  # Number of the most recent RTT samples session keeps for instrumentation purposes
 PACKET_RETRANSMIT_MAX_COUNT = 3  # If data is not acked, retransit it 5 times
 DELAYED_ACK_DELAY = 100  # Delay between consecutive delayed ACK outbound packets
 TIME_WAIT_DELAY = 30000  # 30s delay for the TIME_WAIT state, default is 30-120s
 
 
+def timestamp_clock():
+    """ Current value of the TCP timestamp clock, it ticks every milisecond """
+
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+def window_scale(win):
+    """ Smallest window scale shift count that lets given window fit into 16 bit window field, RFC 7323 caps it at 14 """
+
+    return min(max(win.bit_length() - 16, 0), 14)
+
+
 def trace_fsm(function):
     """ Decorator for tracing FSM state """
 
@@ -86,6 +106,8 @@ def trace_win(self):
     print("self.tx_buffer_seq_mod:", self.tx_buffer_seq_mod)
     print("self.tx_buffer_nxt:", self.tx_buffer_nxt)
     print("self.tx_buffer_una:", self.tx_buffer_una)
+    print("self.cc.cwnd:", self.cc.cwnd)
+    print("self.cc.ssthresh:", self.cc.ssthresh)
 
 
 class TcpSession:
@@ -103,16 +125,19 @@ class TcpSession:
 
         self.socket = socket  # Keeps track of the socket that owns this session for the session -> socket communication purposes
 
-        self.rx_buffer = []  # Keeps data received from peer and not received by application yet
-        self.tx_buffer = []  # Keeps data sent by application but not acknowledged by peer yet
+        self.rx_buffer = TcpBuffer()  # Keeps data received from peer and not received by application yet
+        self.tx_buffer = TcpBuffer()  # Keeps data sent by application but not acknowledged by peer yet
+        self.rx_buffer_size = socket.rcvbuf if socket else stack.tcp_rcvbuf  # Limit of RX buffer, window advertised to peer never exceeds space left in it
+        self.tx_buffer_size = socket.sndbuf if socket else stack.tcp_sndbuf  # Limit of TX buffer, SEND syscall waits for peer to ack data when it's full
 
         # Receiving window parameters
         self.rcv_ini = None  # Initial seq number
         self.rcv_nxt = None  # Next seq to be received
         self.rcv_una = None  # Seq we acked
         self.rcv_mss = stack.mtu - 40  # Maximum segment size
-        self.rcv_wnd = 65535  # Window size
-        self.rcv_wsc = 1  # Window scale
+        self.rcv_wnd = min(self.rx_buffer_size, 0xFFFF << 14)  # Window size, right edge of the window is at rcv_una + rcv_wnd
+        self.rcv_wsc = 1 << window_scale(self.rcv_wnd) if stack.tcp_wscale_support else 1  # Window scale, falls back to 1 if peer doesn't support scaling
+        self.wscale_enabled = False  # Both ends agreed on using window scaling during connection setup
 
         # Sending window paramters
         self.snd_ini = random.randint(0, 0xFFFFFFFF)  # Initial seq number
@@ -120,21 +145,49 @@ class TcpSession:
         self.snd_max = self.snd_ini  # Maximum seq ever sent
         self.snd_una = self.snd_ini  # Seq not yet acknowledged by peer
         self.snd_fin = None  # Seq of FIN packet
+        self.snd_rec = self.snd_ini  # Value of snd_max when loss was last detected, loss recovery lasts till peer acks it (RFC 6582)
         self.snd_mss = 536  # Maximum segment size
         self.snd_wnd = self.snd_mss  # Window size
-        self.snd_ewn = self.snd_mss  # Effective window size, used as simple congestion management mechanism
+        self.snd_ewn = self.snd_mss  # Effective window size, smaller of the congestion window and window peer advertised
         self.snd_wsc = 1  # Window scale, this is always initialized as 1 because initial SYN / SYN + ACK packets don't use wscale for backward compatibility
+        self.snd_wpb = None  # Number of zero window probes sent since peer closed its window, None if there is no need to probe it
+
+        self.cc = TCP_CONGESTION_CONTROL[socket.congestion_control if socket else stack.tcp_congestion_control]()  # Congestion control algorithm
 
         self.tx_retransmit_request_counter = {}  # Keeps track of DUP packets sent from peer to determine if any of them is a retransmit request
         self.tx_retransmit_timeout_counter = {}  # Keeps track of the timestamps for the sent out packets, used to determine when to retransmit packet
         self.rx_retransmit_request_counter = {}  # Keeps track of us sending 'fast retransmit request' packets so we can limit their count to 2
 
+        # Selective Acknowledgment parameters
+        self.sack_permitted = False  # Both ends agreed on using SACK during connection setup
+        self.sack_scoreboard = []  # Sorted list of [left, right] SEQ ranges above snd_una that peer reported as received
+        self.sack_recovery_point = None  # Value of snd_max when loss recovery started, recovery ends once peer acks it
+        self.sack_high_rxt = None  # Highest SEQ retransmitted during loss recovery
+        self.sack_rto_recovery = False  # Loss recovery was started by retransmit timeout, everything not SACKed is considered lost
+        self.sack_last_rcvd = None  # SEQ of most recently received out of order packet, block containing it is reported first
+
+        # Round trip time measurement parameters
+        self.ts_enabled = False  # Both ends agreed on using timestamps during connection setup
+        self.ts_recent = 0  # Timestamp received from peer that is echoed back in every packet we send
+        self.rtt_seq = None  # ACK number that completes measurement of timed segment, used when timestamps are not in use
+        self.rtt_time = None  # Time timed segment has been sent out
+        self.srtt = None  # Smoothed round trip time (ms)
+        self.rttvar = None  # Round trip time variation (ms)
+        self.rto = PACKET_RETRANSMIT_TIMEOUT  # Retransmit timeout (ms)
+        self.rtt_samples = collections.deque(maxlen=RTT_SAMPLE_HISTORY)  # The most recent RTT samples (ms)
+
         self.tx_buffer_seq_mod = self.snd_ini  # Used to help translate local_seq_send and snd_una numbers to TX buffer pointers
 
         self.state = None  # TCP FSM (Finite State Machine) state
 
+        self.flow = None  # Pinned flow cache entry, saves TX path from making flow lookup for every packet
+
+        self.timer_event = None  # Handle of the scheduled FSM timer event, session that has nothing to do on its own has none
+        self.timer_event_deadline = None  # Time at which scheduled FSM timer event is due
+
         self.event_connect = threading.Semaphore(0)  # Used to inform CONNECT syscall that connection related event happened
         self.event_rx_buffer = threading.Semaphore(0)  # USed to inform RECV syscall that there is new data in buffer ready to be picked up
+        self.event_tx_buffer = threading.Semaphore(0)  # Used to inform SEND syscall that peer acked data and there is free space in buffer
 
         self.lock_fsm = threading.RLock()  # Used to ensure that only single event can run FSM at given time
         self.lock_rx_buffer = threading.Lock()  # Used to ensure only single event has access to RX buffer at given time
@@ -143,13 +196,11 @@ class TcpSession:
         self.closing = False  # Indicates that CLOSE syscall is in progress, this lets to finish sending data before FIN packet is transmitted
 
         self.ooo_packet_queue = {}  # Out of order packet buffer
+        self.ooo_packet_queue_draining = False  # Packets from ooo_packet_queue are being brought back to FSM
 
         # Start session in CLOSED state
         self.__change_state("CLOSED")
 
-        # Setup timer to execute FSM time event every milisecond
-        stack.stack_timer.register_method(method=self.tcp_fsm, kwargs={"timer": True})
-
     def __str__(self):
         """ String representation """
 
@@ -161,6 +212,14 @@ class TcpSession:
 
         return f"TCP/{self.local_ip_address}/{self.local_port}/{self.remote_ip_address}/{self.remote_port}"
 
+    @property
+    def snd_seg(self):
+        """ Maximum amount of data sent in single packet, in virtio-net header mode kernel segments large packets into 'snd_mss' sized ones """
+
+        if stack.tap_vnet_hdr:
+            return max(stack.tap_vnet_hdr_gso_max // self.snd_mss, 1) * self.snd_mss
+        return self.snd_mss
+
     @property
     def tx_buffer_nxt(self):
         """ 'snd_nxt' number relative to TX buffer """
@@ -188,12 +247,26 @@ class TcpSession:
         return self.state == "ESTABLISHED"
 
     def send(self, raw_data):
-        """ SEND syscall """
+        """ SEND syscall, waits till all data fits into TX buffer, if connection gets closed in the meantime only the part already buffered is sent """
 
         if self.state in {"ESTABLISHED", "CLOSE_WAIT"}:
-            with self.lock_tx_buffer:
-                self.tx_buffer.extend(list(raw_data))
-                return len(raw_data) if self.state == "ESTABLISHED" else -1
+            established = self.state == "ESTABLISHED"
+            buffered_data_len = 0
+            while True:
+                with self.lock_tx_buffer:
+                    free_space_len = self.tx_buffer_size - len(self.tx_buffer)
+                    if free_space_len >= len(raw_data) and not buffered_data_len:
+                        self.tx_buffer.append(raw_data)
+                        buffered_data_len = len(raw_data)
+                    elif free_space_len > 0:
+                        self.tx_buffer.append(raw_data[buffered_data_len : buffered_data_len + free_space_len])
+                        buffered_data_len = min(buffered_data_len + free_space_len, len(raw_data))
+                # Let FSM know there is new data to be sent out
+                self.tcp_fsm(syscall="SEND")
+                if buffered_data_len == len(raw_data) or self.state not in {"ESTABLISHED", "CLOSE_WAIT"}:
+                    return buffered_data_len if established else -1
+                # Wait till peer acks some data
+                self.event_tx_buffer.acquire()
         return None
 
     def receive(self, byte_count=None):
@@ -207,19 +280,16 @@ class TcpSession:
             return None
 
         with self.lock_rx_buffer:
-            if byte_count is None:
-                byte_count = len(self.rx_buffer)
-            else:
-                byte_count = min(byte_count, len(self.rx_buffer))
-
-            rx_buffer = self.rx_buffer[:byte_count]
-            del self.rx_buffer[:byte_count]
+            rx_buffer = self.rx_buffer.read(byte_count)
 
             # If there is any data left in buffer or the remote end closed connection then release the rx_buffer event
             if self.rx_buffer or self.state == "CLOSE_WAIT":
                 self.event_rx_buffer.release()
 
-        return bytes(rx_buffer)
+        # Let FSM know there is more space in RX buffer so it can send window update
+        self.tcp_fsm(syscall="RECEIVE")
+
+        return rx_buffer
 
     def close(self):
         """ CLOSE syscall """
@@ -235,12 +305,24 @@ class TcpSession:
         if old_state:
             self.logger.opt(ansi=True, depth=1).info(f"{self.tcp_session_id} - State changed: <yellow> {old_state} -> {self.state}</>")
 
-    def __transmit_packet(self, seq=None, flag_syn=False, flag_ack=False, flag_fin=False, flag_rst=False, raw_data=b""):
-        """ Send out TCP packet """
+        # Session can't send data anymore, wake up SEND syscall if it's waiting for space in TX buffer
+        if self.state not in {"ESTABLISHED", "CLOSE_WAIT"} and not self.event_tx_buffer._value:
+            self.event_tx_buffer.release()
+
+    def __transmit_packet(self, seq=None, flag_syn=False, flag_ack=False, flag_fin=False, flag_rst=False, raw_data=b"", gso_size=0):
+        """ Send out TCP packet, packet carrying more than 'gso_size' bytes of data will be segmented by kernel """
 
         seq = seq if seq else self.snd_nxt
         ack = self.rcv_nxt if flag_ack else 0
 
+        # Refresh pinned flow if it got invalidated by neighbor, address or routing change
+        if not (self.flow and self.flow.valid):
+            self.flow = stack.flow_cache.find_flow(self.local_ip_address, self.remote_ip_address)
+
+        # Advertise window matching space left in RX buffer
+        if flag_ack and not flag_syn:
+            self.rcv_wnd = self.__receive_window()
+
         stack.packet_handler.phtx_tcp(
             ip_src=self.local_ip_address,
             ip_dst=self.remote_ip_address,
@@ -252,10 +334,24 @@ class TcpSession:
             tcp_flag_ack=flag_ack,
             tcp_flag_fin=flag_fin,
             tcp_flag_rst=flag_rst,
-            tcp_win=self.rcv_wnd,
+            tcp_win=min(self.rcv_wnd, 0xFFFF) if flag_syn else self.rcv_wnd // self.rcv_wsc,
             tcp_mss=self.rcv_mss if flag_syn else None,
+            tcp_wscale=self.rcv_wsc.bit_length() - 1 if flag_syn and (self.wscale_enabled if flag_ack else stack.tcp_wscale_support) else None,
+            tcp_sackperm=flag_syn and (self.sack_permitted if flag_ack else stack.tcp_sack_support),
+            tcp_sack=self.__sack_blocks() if flag_ack and self.sack_permitted and self.ooo_packet_queue else None,
+            tcp_timestamp=(timestamp_clock(), self.ts_recent) if self.ts_enabled or flag_syn and not flag_ack and stack.tcp_timestamps_support else None,
             raw_data=raw_data,
+            tcp_gso_size=gso_size,
+            flow=self.flow,
         )
+        # Without timestamps time one segment at a time, retransmission makes its measurement ambiguous (Karn's algorithm)
+        if not self.ts_enabled and (raw_data or flag_syn or flag_fin):
+            if seq < self.snd_max:
+                if self.rtt_seq is not None and seq < self.rtt_seq:
+                    self.rtt_seq = None
+            elif self.rtt_seq is None:
+                self.rtt_seq = seq + len(raw_data) + flag_syn + flag_fin
+                self.rtt_time = time.monotonic()
         self.rcv_una = self.rcv_nxt
         self.snd_nxt = seq + len(raw_data) + flag_syn + flag_fin
         self.snd_max = max(self.snd_max, self.snd_nxt)
@@ -273,7 +369,7 @@ class TcpSession:
         if raw_data or flag_syn or flag_fin:
             self.tx_retransmit_timeout_counter[seq] = self.tx_retransmit_timeout_counter.get(seq, -1) + 1
             stack.stack_timer.register_timer(
-                self.tcp_session_id + "-retransmit_seq-" + str(seq), PACKET_RETRANSMIT_TIMEOUT * (1 << self.tx_retransmit_timeout_counter[seq])
+                self.tcp_session_id + "-retransmit_seq-" + str(seq), min(self.rto << self.tx_retransmit_timeout_counter[seq], PACKET_RETRANSMIT_TIMEOUT_MAX)
             )
 
         self.logger.debug(
@@ -281,11 +377,131 @@ class TcpSession:
             + f"{'A' if flag_ack else ''}, seq {seq}, ack {ack}, dlen {len(raw_data)}"
         )
 
+    def __sack_blocks(self):
+        """ Build SACK blocks describing data sitting in ooo_packet_queue, block containing most recently received packet goes first """
+
+        blocks = []
+        for seq in sorted(self.ooo_packet_queue):
+            end = seq + len(self.ooo_packet_queue[seq].raw_data)
+            if end <= self.rcv_nxt:
+                continue
+            if blocks and seq <= blocks[-1][1]:
+                blocks[-1][1] = max(blocks[-1][1], end)
+                continue
+            blocks.append([seq, end])
+        blocks.sort(key=lambda _: not _[0] <= self.sack_last_rcvd < _[1])
+        # Timestamp option takes the space of one SACK block
+        return [tuple(_) for _ in blocks[: TCP_OPT_SACK_MAX_BLOCKS - 1 if self.ts_enabled else TCP_OPT_SACK_MAX_BLOCKS]]
+
+    def __receive_window(self):
+        """ Compute receive window from space left in RX buffer, its right edge never moves back and moves forward by at least MSS or half of buffer """
+
+        # Keeping small openings closed stops peer from filling them with tiny segments (receiver side SWS avoidance, RFC 1122)
+        remaining_window = max(self.rcv_una + self.rcv_wnd - self.rcv_nxt, 0) if self.rcv_una is not None else self.rcv_wnd
+        free_space_len = max(self.rx_buffer_size - len(self.rx_buffer), 0)
+        window = remaining_window
+        if free_space_len - remaining_window >= min(self.rx_buffer_size // 2, self.rcv_mss):
+            window = max(free_space_len // self.rcv_wsc * self.rcv_wsc, remaining_window)
+        return min(-(-window // self.rcv_wsc) * self.rcv_wsc, 0xFFFF * self.rcv_wsc)
+
+    def __window_update(self):
+        """ Send window update if application made enough space in RX buffer for peer to make use of it """
+
+        remaining_window = max(self.rcv_una + self.rcv_wnd - self.rcv_nxt, 0)
+        window = self.__receive_window()
+        if window - remaining_window >= min(self.rx_buffer_size // 2, self.rcv_mss) and window >= 2 * remaining_window:
+            self.__transmit_packet(flag_ack=True)
+            self.logger.debug(f"{self.tcp_session_id} - Sent window update, receive window {remaining_window} -> {self.rcv_wnd}")
+
+    def __window_probe(self):
+        """ Probe zero window peer advertised, otherwise losing its window update would stall the session forever """
+
+        if not (self.snd_wnd == 0 and self.snd_una == self.snd_max and len(self.tx_buffer) > self.tx_buffer_nxt):
+            self.snd_wpb = None
+            return
+
+        if self.snd_wpb is None:
+            self.snd_wpb = 0
+            stack.stack_timer.register_timer(self.tcp_session_id + "-window_probe", self.rto)
+            return
+
+        if stack.stack_timer.timer_expired(self.tcp_session_id + "-window_probe"):
+            # Probe carries SEQ peer has already seen so it gets answered with ACK advertising current window, this doesn't move snd_nxt
+            snd_nxt = self.snd_nxt
+            self.__transmit_packet(seq=self.snd_una - 1, flag_ack=True)
+            self.snd_nxt = snd_nxt
+            self.snd_wpb += 1
+            stack.stack_timer.register_timer(self.tcp_session_id + "-window_probe", min(self.rto << self.snd_wpb, PACKET_RETRANSMIT_TIMEOUT_MAX))
+            self.logger.debug(f"{self.tcp_session_id} - Sent zero window probe #{self.snd_wpb}")
+
+    def __update_rtt(self, rtt):
+        """ Update smoothed RTT and RTT variation with new measurement and recompute retransmit timeout (RFC 6298) """
+
+        self.rtt_samples.append(rtt)
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        # Variation term is kept above the minimum timeout so steady RTT (eg. one inflated by peer's delayed ACKs) doesn't collapse timeout onto it
+        self.rto = min(int(self.srtt + max(4 * self.rttvar, PACKET_RETRANSMIT_TIMEOUT_MIN)), PACKET_RETRANSMIT_TIMEOUT_MAX)
+        self.logger.debug(f"{self.tcp_session_id} - RTT sample {rtt:.3f} ms, srtt {self.srtt:.3f} ms, rttvar {self.rttvar:.3f} ms, rto {self.rto} ms")
+
+    def __update_sack_scoreboard(self, sack):
+        """ Merge SACK blocks received from peer into scoreboard """
+
+        scoreboard = []
+        for left, right in sorted(self.sack_scoreboard + [[max(left, self.snd_una), min(right, self.snd_max)] for left, right in sack]):
+            if left >= right:
+                continue
+            if scoreboard and left <= scoreboard[-1][1]:
+                scoreboard[-1][1] = max(scoreboard[-1][1], right)
+                continue
+            scoreboard.append([left, right])
+        self.sack_scoreboard = scoreboard
+
+    def __sack_hole(self):
+        """ Find next hole that needs to be retransmitted during loss recovery, return its SEQ and length or None if there is nothing to retransmit """
+
+        if self.sack_recovery_point is None:
+            return None
+
+        # Don't let retransmitted data that has not been SACKed yet exceed effective window
+        seq = max(self.snd_una, self.sack_high_rxt)
+        in_flight = seq - self.snd_una - sum(min(right, seq) - left for left, right in self.sack_scoreboard if left < seq)
+        if in_flight >= self.snd_ewn:
+            return None
+
+        # After retransmit timeout everything not SACKed is lost, otherwise holes below highest SACKed SEQ are (and the first unacked segment always is)
+        if self.sack_rto_recovery:
+            end = self.sack_recovery_point
+        else:
+            end = min(max(self.sack_scoreboard[-1][1] if self.sack_scoreboard else 0, self.snd_una + self.snd_mss), self.sack_recovery_point)
+
+        for left, right in self.sack_scoreboard:
+            if seq < left:
+                end = min(end, left)
+                break
+            seq = max(seq, right)
+
+        if seq >= end:
+            return None
+        return seq, min(end - seq, self.snd_seg)
+
+    def __enter_sack_recovery(self, rto):
+        """ Start loss recovery that retransmits only the holes in SACK scoreboard """
+
+        self.sack_recovery_point = self.snd_max
+        self.sack_high_rxt = self.snd_una
+        self.sack_rto_recovery = rto
+        self.logger.debug(f"{self.tcp_session_id} - Entered SACK loss recovery, recovery point {self.sack_recovery_point}, scoreboard {self.sack_scoreboard}")
+
     def __enqueue_rx_buffer(self, raw_data):
         """ Process the incoming segment and enqueue the data to be used by socket """
 
         with self.lock_rx_buffer:
-            self.rx_buffer.extend(list(raw_data))
+            self.rx_buffer.append(raw_data)
             # If rx_buffer event has not been realeased yet (it could be released if some data were siting in buffer already) then release it
             if not self.event_rx_buffer._value:
                 self.event_rx_buffer.release()
@@ -293,7 +509,7 @@ class TcpSession:
     def __transmit_data(self):
         """ Send out data segment from TX buffer using TCP sliding window mechanism """
 
-        assert self.snd_una <= self.snd_nxt <= self.snd_una + self.snd_ewn, "*** SEQ outside of TCP sliding window"
+        assert self.snd_una <= self.snd_nxt <= self.snd_una + self.snd_ewn or self.sack_recovery_point is not None, "*** SEQ outside of TCP sliding window"
 
         # Check if we need to (re)transmit initial SYN packet
         if self.state == "SYN_SENT" and self.snd_nxt == self.snd_ini:
@@ -309,21 +525,36 @@ class TcpSession:
 
         # Make sure we in the state that allows sending data out
         if self.state in {"ESTABLISHED", "CLOSE_WAIT"}:
+            # Retransmit holes reported by SACK before any new data goes out, this doesn't move snd_nxt
+            while hole := self.__sack_hole():
+                seq, transmit_data_len = hole
+                with self.lock_tx_buffer:
+                    transmit_data = self.tx_buffer.peek(seq - self.tx_buffer_seq_mod, transmit_data_len)
+                self.logger.debug(f"{self.tcp_session_id} - Retransmitting SACK hole: seq {seq} len {len(transmit_data)}")
+                snd_nxt = self.snd_nxt
+                self.__transmit_packet(seq=seq, flag_ack=True, raw_data=transmit_data, gso_size=self.snd_mss)
+                self.snd_nxt = snd_nxt
+                self.sack_high_rxt = seq + transmit_data_len
             remaining_data_len = len(self.tx_buffer) - self.tx_buffer_nxt
             usable_window = self.snd_ewn - self.tx_buffer_nxt
-            transmit_data_len = min(self.snd_mss, usable_window, remaining_data_len)
             if remaining_data_len:
                 self.logger.opt(ansi=True).debug(
                     f"{self.tcp_session_id} - Sliding window <yellow>[{self.snd_una}|{self.snd_nxt}|{self.snd_una + self.snd_ewn}]</>"
                 )
                 self.logger.opt(ansi=True).debug(
-                    f"{self.tcp_session_id} - {usable_window} left in window, {remaining_data_len} left in buffer, {transmit_data_len} to be sent"
+                    f"{self.tcp_session_id} - {usable_window} left in window, {remaining_data_len} left in buffer, "
+                    + f"{max(min(usable_window, remaining_data_len), 0)} to be sent"
                 )
-                if transmit_data_len:
+                # Fill the whole usable window with burst of segments, unless pacing limits number of segments sent in single pass
+                segment_count = 0
+                while (transmit_data_len := min(self.snd_seg, self.snd_ewn - self.tx_buffer_nxt, len(self.tx_buffer) - self.tx_buffer_nxt)) > 0:
                     with self.lock_tx_buffer:
-                        transmit_data = self.tx_buffer[self.tx_buffer_nxt : self.tx_buffer_nxt + transmit_data_len]
+                        transmit_data = self.tx_buffer.peek(self.tx_buffer_nxt, transmit_data_len)
                     self.logger.debug(f"{self.tcp_session_id} - Transmitting data segment: seq {self.snd_nxt} len {len(transmit_data)}")
-                    self.__transmit_packet(flag_ack=True, raw_data=bytes(transmit_data))
+                    self.__transmit_packet(flag_ack=True, raw_data=transmit_data, gso_size=self.snd_mss)
+                    segment_count += 1
+                    if segment_count == stack.tcp_tx_burst_size:
+                        break
                 return
 
         # Check if we need to (re)transmit final FIN packet
@@ -341,6 +572,72 @@ class TcpSession:
                 self.logger.debug(f"{self.tcp_session_id} - Sent out delayed ACK ({self.rcv_nxt})")
             stack.stack_timer.register_timer(self.tcp_session_id + "-delayed_ack", DELAYED_ACK_DELAY)
 
+    def __transmit_pending(self):
+        """ Check if there is SYN, data or FIN that __transmit_data would send out right now """
+
+        if self.state in {"SYN_SENT", "SYN_RCVD"}:
+            return self.snd_nxt == self.snd_ini
+
+        if self.state in {"ESTABLISHED", "CLOSE_WAIT"}:
+            return len(self.tx_buffer) > self.tx_buffer_nxt and self.snd_ewn > self.tx_buffer_nxt or self.__sack_hole() is not None
+
+        if self.state in {"FIN_WAIT_1", "LAST_ACK"}:
+            return self.snd_nxt != self.snd_fin
+
+        return False
+
+    def __timer_event_delay(self):
+        """ Find out in how many miliseconds FSM needs timer event, None if it has nothing to do till another event comes """
+
+        if self.state == "TIME_WAIT":
+            return stack.stack_timer.timer_remaining(self.tcp_session_id + "-time_wait")
+
+        if self.state not in {"SYN_SENT", "SYN_RCVD", "ESTABLISHED", "CLOSE_WAIT", "FIN_WAIT_1", "LAST_ACK"}:
+            return None
+
+        # Pending data goes out right away, with pacing enabled bursts are spaced out to match pacing rate congestion control asks for
+        if self.__transmit_pending():
+            if not stack.tcp_tx_burst_size:
+                return 0
+            if pacing_rate := self.cc.pacing_rate(self.srtt):
+                return max(int(stack.tcp_tx_burst_size * self.snd_mss * 1000 / pacing_rate), 1)
+            return 1
+
+        # CLOSE syscall waiting for TX buffer to drain
+        if self.state in {"ESTABLISHED", "CLOSE_WAIT"} and self.closing and not self.tx_buffer:
+            return 0
+
+        delays = []
+
+        # Retransmit timeout of the oldest unacknowledged segment
+        if self.snd_una in self.tx_retransmit_timeout_counter:
+            delays.append(stack.stack_timer.timer_remaining(self.tcp_session_id + "-retransmit_seq-" + str(self.snd_una)))
+
+        # Delayed ACK for the data received but not acknowledged yet
+        if self.state in {"ESTABLISHED", "CLOSE_WAIT"} and self.rcv_nxt > self.rcv_una:
+            delays.append(stack.stack_timer.timer_remaining(self.tcp_session_id + "-delayed_ack"))
+
+        # Zero window probe, its timer gets started by the next timer event
+        if self.state in {"ESTABLISHED", "CLOSE_WAIT"} and self.snd_wnd == 0 and self.snd_una == self.snd_max and len(self.tx_buffer) > self.tx_buffer_nxt:
+            delays.append(stack.stack_timer.timer_remaining(self.tcp_session_id + "-window_probe") if self.snd_wpb is not None else 0)
+
+        return min(delays, default=None)
+
+    def __schedule_timer_event(self):
+        """ Make sure timer event is scheduled for the moment FSM needs it, keep the earlier one if it's already scheduled """
+
+        if (delay := self.__timer_event_delay()) is None:
+            return
+
+        deadline = time.monotonic() + delay / 1000
+        if self.timer_event_deadline is not None and self.timer_event_deadline <= deadline:
+            return
+
+        if self.timer_event:
+            stack.stack_timer.cancel(self.timer_event)
+        self.timer_event_deadline = deadline
+        self.timer_event = stack.stack_timer.register_method(method=self.tcp_fsm, kwargs={"timer": True}, delay=delay, repeat_count=0)
+
     def __retransmit_packet_timeout(self):
         """ Retransmit packet after expired timeout """
 
@@ -361,7 +658,16 @@ class TcpSession:
                 # Change state to CLOSED
                 self.__change_state("CLOSED")
                 return
-            self.snd_ewn = self.snd_mss
+            self.cc.on_rto(flight=self.snd_max - self.snd_una)
+            self.snd_rec = self.snd_max
+            self.snd_ewn = min(self.cc.cwnd, self.snd_wnd)
+            # With SACK information available retransmit only the holes, unless the same segment timed out again which may mean peer reneged on SACKed data
+            if self.sack_scoreboard and self.tx_retransmit_timeout_counter[self.snd_una] == 0:
+                self.__enter_sack_recovery(rto=True)
+                self.logger.debug(f"{self.tcp_session_id} - Got retansmit timeout, retransmitting SACK holes, reseting snd_ewn to {self.snd_ewn}")
+                return
+            self.sack_scoreboard = []
+            self.sack_recovery_point = None
             self.snd_nxt = self.snd_una
             # In case we need to retransmit packt containing SYN flag adjust tx_buffer_seq_mod so it doesn't reflect SYN flag yet
             if self.snd_nxt == self.snd_ini or self.snd_nxt == self.snd_fin:
@@ -369,22 +675,56 @@ class TcpSession:
             self.logger.debug(f"{self.tcp_session_id} - Got retansmit timeout, sending segment {self.snd_nxt}, reseting snd_ewn to {self.snd_ewn}")
             return
 
+    def __duplicate_ack(self, packet):
+        """ Check if ACK packet is duplicate, it needs data in flight and unchanged window so window updates and probe replies don't count (RFC 5681) """
+
+        return self.snd_una != self.snd_max and packet.win * self.snd_wsc == self.snd_wnd
+
     def __retransmit_packet_request(self, packet):
         """ Retransmit packet after rceiving request from peer """
 
         self.tx_retransmit_request_counter[packet.ack] = self.tx_retransmit_request_counter.get(packet.ack, 0) + 1
+        # Let congestion control reduce its window, this happens only once per window of data (RFC 6582)
+        if self.tx_retransmit_request_counter[packet.ack] > 1 and self.snd_una >= self.snd_rec:
+            self.cc.on_loss(flight=self.snd_max - self.snd_una)
+            self.snd_rec = self.snd_max
+            self.snd_ewn = min(self.cc.cwnd, self.snd_wnd)
+        # With SACK in use recovery is started once and holes get retransmitted as SACK information arrives
+        if self.sack_permitted:
+            if self.sack_recovery_point is None and self.tx_retransmit_request_counter[packet.ack] > 1:
+                self.__enter_sack_recovery(rto=False)
+            return
         if self.tx_retransmit_request_counter[packet.ack] > 1:
             self.snd_nxt = self.snd_una
-            self.logger.debug(f"{self.tcp_session_id} - Got retransmit request, sending segment {self.snd_nxt}, keeping snd_ewn at {self.snd_ewn}")
+            self.logger.debug(f"{self.tcp_session_id} - Got retransmit request, sending segment {self.snd_nxt}, snd_ewn {self.snd_ewn}, {self.cc}")
 
     def __process_ack_packet(self, packet):
         """ Process regular data/ACK packet """
 
+        # Congestion window grows outside of loss recovery and only if it was the congestion window that limited data in flight (RFC 7661)
+        cwnd_growth = self.snd_una >= self.snd_rec and self.snd_max - self.snd_una + self.snd_mss > self.cc.cwnd
+        # Peer acking new data proves forward progress, let neighbor cache know so it doesn't need to probe next hop
+        if packet.ack > self.snd_una and self.flow:
+            self.flow.next_hop.confirm_reachability()
+        # Take RTT sample from timestamp peer echoed back or from the timed segment once it gets acked
+        if self.ts_enabled and packet.timestamp:
+            if packet.ack > self.snd_una and packet.timestamp[1]:
+                self.__update_rtt((timestamp_clock() - packet.timestamp[1]) & 0xFFFFFFFF)
+            if self.rcv_una is not None and packet.seq <= self.rcv_una and (packet.timestamp[0] - self.ts_recent) & 0xFFFFFFFF < 0x80000000:
+                self.ts_recent = packet.timestamp[0]
+        elif self.rtt_seq is not None and packet.ack >= self.rtt_seq:
+            self.__update_rtt((time.monotonic() - self.rtt_time) * 1000)
+            self.rtt_seq = None
         # Make note of the local SEQ that has been acked by peer
         self.snd_una = max(self.snd_una, packet.ack)
         # Adjust local SEQ accordingly to what peer acked (needed after the retransmit happens and peer is jumping to previously received SEQ)
         if self.snd_nxt < self.snd_una <= self.snd_max:
             self.snd_nxt = self.snd_una
+        # Drop acked ranges from SACK scoreboard and finish loss recovery once everything outstanding at its start has been acked
+        self.sack_scoreboard = [[max(left, self.snd_una), right] for left, right in self.sack_scoreboard if right > self.snd_una]
+        if self.sack_recovery_point is not None and self.snd_una >= self.sack_recovery_point:
+            self.sack_recovery_point = None
+            self.logger.debug(f"{self.tcp_session_id} - Finished SACK loss recovery")
         # Make note of the remote SEQ number
         self.rcv_nxt = packet.seq + len(packet.raw_data) + packet.flag_syn + packet.flag_fin
         # In case packet contains data enqueue it
@@ -392,17 +732,23 @@ class TcpSession:
             self.__enqueue_rx_buffer(packet.raw_data)
             self.logger.debug(f"{self.tcp_session_id} - Enqueued {len(packet.raw_data)} bytes starting at {packet.seq}")
         # Purge acked data from TX buffer
+        acked_data_len = self.tx_buffer_una
         with self.lock_tx_buffer:
-            del self.tx_buffer[: self.tx_buffer_una]
+            self.tx_buffer.consume(self.tx_buffer_una)
         self.tx_buffer_seq_mod += self.tx_buffer_una
+        if acked_data_len and not self.event_tx_buffer._value:
+            self.event_tx_buffer.release()
         self.logger.debug(f"{self.tcp_session_id} - Purged TX buffer up to SEQ {self.snd_una}")
         # Update remote window size
-        if self.snd_wnd != packet.win * self.snd_wsc:
-            self.logger.debug(f"{self.tcp_session_id} - Updated sending window size {self.snd_wnd} -> {packet.win * self.snd_wsc}")
-            self.snd_wnd = packet.win * self.snd_wsc
-        # Enlarge effective sending window
-        self.snd_ewn = min(self.snd_ewn << 1, self.snd_wnd)
-        self.logger.debug(f"{self.tcp_session_id} - Updated effective sending window to {self.snd_ewn}")
+        snd_wnd = packet.win if packet.flag_syn else packet.win * self.snd_wsc  # Window of SYN / SYN + ACK packets is never scaled
+        if self.snd_wnd != snd_wnd:
+            self.logger.debug(f"{self.tcp_session_id} - Updated sending window size {self.snd_wnd} -> {snd_wnd}")
+            self.snd_wnd = snd_wnd
+        # Let congestion control know about acked data and adjust effective sending window accordingly
+        if acked_data_len and cwnd_growth:
+            self.cc.on_ack(acked_data_len, self.srtt)
+        self.snd_ewn = min(self.cc.cwnd, self.snd_wnd)
+        self.logger.debug(f"{self.tcp_session_id} - Updated effective sending window to {self.snd_ewn}, {self.cc}")
         # Purge expired tx packet retransmit requests
         for seq in list(self.tx_retransmit_request_counter):
             if seq < packet.ack:
@@ -413,15 +759,27 @@ class TcpSession:
             if seq < packet.ack:
                 self.tx_retransmit_timeout_counter.pop(seq)
                 self.logger.debug(f"{self.tcp_session_id} - Purged expired TX packet retransmit timeout for {seq}")
+        # Restart retransmit timer of the oldest unacknowledged segment when new data got acked, otherwise with large window it would be timed from
+        # its original transmission and expire right away (RFC 6298)
+        if acked_data_len and self.snd_una in self.tx_retransmit_timeout_counter:
+            stack.stack_timer.register_timer(
+                self.tcp_session_id + "-retransmit_seq-" + str(self.snd_una),
+                min(self.rto << self.tx_retransmit_timeout_counter[self.snd_una], PACKET_RETRANSMIT_TIMEOUT_MAX),
+            )
         # Purge expired rx retransmit requests
         for seq in list(self.rx_retransmit_request_counter):
             if seq < self.rcv_nxt:
                 self.rx_retransmit_request_counter.pop(seq)
                 self.logger.debug(f"{self.tcp_session_id} - Purged expired RX packet retransmit request counter for {seq}")
-        # Bring next packet from ooo_packet_queue if available
-        if packet := self.ooo_packet_queue.pop(self.rcv_nxt, None):
-            self.logger.opt(ansi=True).debug(f"{self.tcp_session_id} - <green>Retrieving packet {self.rcv_nxt} from Out of Order queue</>")
-            self.tcp_fsm(packet)
+        # Bring next packets from ooo_packet_queue if available, only the outermost call drains the queue so long runs of queued packets don't nest FSM calls
+        if not self.ooo_packet_queue_draining:
+            self.ooo_packet_queue_draining = True
+            try:
+                while packet := self.ooo_packet_queue.pop(self.rcv_nxt, None):
+                    self.logger.opt(ansi=True).debug(f"{self.tcp_session_id} - <green>Retrieving packet {self.rcv_nxt} from Out of Order queue</>")
+                    self.tcp_fsm(packet)
+            finally:
+                self.ooo_packet_queue_draining = False
 
     def __tcp_fsm_closed(self, packet, syscall, timer):
         """ TCP FSM CLOSED state handler """
@@ -461,11 +819,18 @@ class TcpSession:
                 stack.tcp_sessions[tcp_session.tcp_session_id] = tcp_session
                 # Initialize session parameters
                 self.snd_mss = min(packet.mss, stack.mtu - 40)
-                self.snd_wnd = packet.win * self.snd_wsc  # For SYN / SYN + ACK packets this is initialized with wscale=1
-                self.snd_wsc = packet.wscale if packet.wscale else 1  # Peer's wscale set to None means that peer desn't support window scaling
-                self.logger.debug(f"{self.tcp_session_id} - Initialized remote window scale at {self.snd_wsc}")
+                self.snd_wnd = packet.win  # Window of SYN / SYN + ACK packets is never scaled
+                self.wscale_enabled = stack.tcp_wscale_support and packet.wscale is not None  # No wscale from peer means no scaling
+                self.snd_wsc = min(packet.wscale, 1 << 14) if self.wscale_enabled else 1  # Shift count above 14 is treated as 14 (RFC 7323)
+                self.rcv_wsc = self.rcv_wsc if self.wscale_enabled else 1
+                self.rcv_wnd = min(self.rcv_wnd, 0xFFFF * self.rcv_wsc)
+                self.logger.debug(f"{self.tcp_session_id} - Initialized window scale, local {self.rcv_wsc}, remote {self.snd_wsc}")
+                self.sack_permitted = stack.tcp_sack_support and bool(packet.sackperm)
+                self.ts_enabled = stack.tcp_timestamps_support and packet.timestamp is not None
+                self.ts_recent = packet.timestamp[0] if self.ts_enabled else 0
                 self.rcv_ini = packet.seq
-                self.snd_ewn = self.snd_mss
+                self.cc.on_init(mss=self.snd_mss)
+                self.snd_ewn = min(self.cc.cwnd, self.snd_wnd)
                 # Make note of the remote SEQ number
                 self.rcv_nxt = packet.seq + packet.flag_syn
                 # Send SYN + ACK packet (this actually will be done in SYN_SENT state) / change state to SYN_RCVD
@@ -492,11 +857,18 @@ class TcpSession:
             if packet.ack == self.snd_nxt and not packet.raw_data:
                 # Initialize session parameters
                 self.snd_mss = min(packet.mss, stack.mtu - 40)
-                self.snd_wnd = packet.win * self.snd_wsc  # For SYN / SYN + ACK packets this is initialized with wscale=1
-                self.snd_wsc = packet.wscale if packet.wscale else 1  # Peer's wscale set to None means that peer desn't support window scaling
-                self.logger.debug(f"{self.tcp_session_id} - Initialized remote window scale at {self.snd_wsc}")
+                self.snd_wnd = packet.win  # Window of SYN / SYN + ACK packets is never scaled
+                self.wscale_enabled = stack.tcp_wscale_support and packet.wscale is not None  # No wscale from peer means no scaling
+                self.snd_wsc = min(packet.wscale, 1 << 14) if self.wscale_enabled else 1  # Shift count above 14 is treated as 14 (RFC 7323)
+                self.rcv_wsc = self.rcv_wsc if self.wscale_enabled else 1
+                self.rcv_wnd = min(self.rcv_wnd, 0xFFFF * self.rcv_wsc)
+                self.logger.debug(f"{self.tcp_session_id} - Initialized window scale, local {self.rcv_wsc}, remote {self.snd_wsc}")
+                self.sack_permitted = stack.tcp_sack_support and bool(packet.sackperm)
+                self.ts_enabled = stack.tcp_timestamps_support and packet.timestamp is not None
+                self.ts_recent = packet.timestamp[0] if self.ts_enabled else 0
                 self.rcv_ini = packet.seq
-                self.snd_ewn = self.snd_mss
+                self.cc.on_init(mss=self.snd_mss)
+                self.snd_ewn = min(self.cc.cwnd, self.snd_wnd)
                 # Process ACK packet
                 self.__process_ack_packet(packet)
                 # Send initial ACK packet
@@ -575,27 +947,34 @@ class TcpSession:
         if timer:
             self.__retransmit_packet_timeout()
             self.__transmit_data()
+            self.__window_probe()
             self.__delayed_ack()
             if self.closing and not self.tx_buffer:
                 self.__change_state("FIN_WAIT_1")
             return
 
-        # Got packet that doesn't fit into receive window
-        if packet and not self.rcv_nxt <= packet.seq <= self.rcv_nxt + self.rcv_wnd - len(packet.raw_data):
+        # Got packet that doesn't fit into receive window -> Drop it and send ACK, peer may be retransmitting data because our previous ACK got lost
+        if packet and not self.rcv_nxt <= packet.seq <= self.rcv_una + self.rcv_wnd - len(packet.raw_data):
             self.logger.debug(f"{self.tcp_session_id} - Packet seq {packet.seq} + {len(packet.raw_data)} doesn't fit into receive window, droping")
+            if not packet.flag_rst:
+                self.__transmit_packet(flag_ack=True)
             return
 
         # Got ACK packet
         if packet and all({packet.flag_ack}) and not any({packet.flag_syn, packet.flag_rst, packet.flag_fin}):
-            # Suspected retransmit request -> Reset TX window and local SEQ number
-            if packet.seq == self.rcv_nxt and packet.ack == self.snd_una and not packet.raw_data:
+            # Update SACK scoreboard with blocks reported by peer
+            if self.sack_permitted and packet.sack:
+                self.__update_sack_scoreboard(packet.sack)
+            # Duplicate ACK, suspected retransmit request -> Reset TX window and local SEQ number
+            if packet.seq == self.rcv_nxt and packet.ack == self.snd_una and not packet.raw_data and self.__duplicate_ack(packet):
                 self.__retransmit_packet_request(packet)
                 return
-            # Packet with higher SEQ than what we are expecting -> Store it and send 'fast retransmit' request (don't send more than two)
+            # Packet with higher SEQ than what we are expecting -> Store it and send 'fast retransmit' request (don't send more than two unless SACK is used)
             if packet.seq > self.rcv_nxt and self.snd_una <= packet.ack <= self.snd_max:
                 self.ooo_packet_queue[packet.seq] = packet
+                self.sack_last_rcvd = packet.seq
                 self.rx_retransmit_request_counter[self.rcv_nxt] = self.rx_retransmit_request_counter.get(self.rcv_nxt, 0) + 1
-                if self.rx_retransmit_request_counter[self.rcv_nxt] <= 2:
+                if self.rx_retransmit_request_counter[self.rcv_nxt] <= 2 or self.sack_permitted:
                     self.__transmit_packet(flag_ack=True)
                 return
             # Regular data/ACK packet -> Process data
@@ -628,6 +1007,11 @@ class TcpSession:
                 self.__change_state("CLOSED")
             return
 
+        # Got RECEIVE syscall -> Send window update if application made enough space in RX buffer
+        if syscall == "RECEIVE":
+            self.__window_update()
+            return
+
         # Got CLOSE syscall -> Send FIN packet (this actually will be done in SYN_SENT state) / change state to FIN_WAIT_1
         if syscall == "CLOSE":
             self.closing = True
@@ -683,6 +1067,11 @@ class TcpSession:
                 self.__change_state("CLOSED")
             return
 
+        # Got RECEIVE syscall -> Send window update if application made enough space in RX buffer
+        if syscall == "RECEIVE":
+            self.__window_update()
+            return
+
     def __tcp_fsm_fin_wait_2(self, packet, syscall, timer):
         """ TCP FSM FIN_WAIT_2 state handler """
 
@@ -718,6 +1107,11 @@ class TcpSession:
                 self.__change_state("CLOSED")
             return
 
+        # Got RECEIVE syscall -> Send window update if application made enough space in RX buffer
+        if syscall == "RECEIVE":
+            self.__window_update()
+            return
+
     def __tcp_fsm_closing(self, packet, syscall, timer):
         """ TCP FSM CLOSING state handler """
 
@@ -746,6 +1140,7 @@ class TcpSession:
         if timer:
             self.__retransmit_packet_timeout()
             self.__transmit_data()
+            self.__window_probe()
             self.__delayed_ack()
             if self.closing and not self.tx_buffer:
                 self.__change_state("LAST_ACK")
@@ -753,15 +1148,19 @@ class TcpSession:
 
         # Got ACK packet
         if packet and all({packet.flag_ack}) and not any({packet.flag_syn, packet.flag_rst, packet.flag_fin}):
-            # Suspected retransmit request -> Reset TX window and local SEQ number
-            if packet.seq == self.rcv_nxt and packet.ack == self.snd_una and not packet.raw_data:
+            # Update SACK scoreboard with blocks reported by peer
+            if self.sack_permitted and packet.sack:
+                self.__update_sack_scoreboard(packet.sack)
+            # Duplicate ACK, suspected retransmit request -> Reset TX window and local SEQ number
+            if packet.seq == self.rcv_nxt and packet.ack == self.snd_una and not packet.raw_data and self.__duplicate_ack(packet):
                 self.__retransmit_packet_request(packet)
                 return
-            # Packet with higher SEQ than what we are expecting -> Store it and send 'fast retransmit' request
+            # Packet with higher SEQ than what we are expecting -> Store it and send 'fast retransmit' request (don't send more than two unless SACK is used)
             if packet.seq > self.rcv_nxt and self.snd_una <= packet.ack <= self.snd_max:
                 self.ooo_packet_queue[packet.seq] = packet
+                self.sack_last_rcvd = packet.seq
                 self.rx_retransmit_request_counter[self.rcv_nxt] = self.rx_retransmit_request_counter.get(self.rcv_nxt, 0) + 1
-                if self.rx_retransmit_request_counter[self.rcv_nxt] <= 2:
+                if self.rx_retransmit_request_counter[self.rcv_nxt] <= 2 or self.sack_permitted:
                     self.__transmit_packet(flag_ack=True)
                 return
             # Regular data/ACK packet -> Process data
@@ -820,7 +1219,12 @@ class TcpSession:
 
         # Process event
         with self.lock_fsm:
-            return {
+            # Scheduled timer event is due, the next one is going to be scheduled once this one is processed
+            if timer and self.timer_event_deadline is not None and self.timer_event_deadline <= time.monotonic():
+                self.timer_event = None
+                self.timer_event_deadline = None
+
+            retval = {
                 "CLOSED": self.__tcp_fsm_closed,
                 "LISTEN": self.__tcp_fsm_listen,
                 "SYN_SENT": self.__tcp_fsm_syn_sent,
@@ -833,3 +1237,8 @@ class TcpSession:
                 "LAST_ACK": self.__tcp_fsm_last_ack,
                 "TIME_WAIT": self.__tcp_fsm_time_wait,
             }[self.state](packet, syscall, timer)
+
+            # Schedule timer event if the FSM is going to need one
+            self.__schedule_timer_event()
+
+            return retval
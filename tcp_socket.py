@@ -68,6 +68,9 @@ class TcpSocket:
             self.local_port = tcp_session.local_port
             self.remote_ip_address = tcp_session.remote_ip_address
             self.remote_port = tcp_session.remote_port
+            self.congestion_control = tcp_session.cc.name
+            self.sndbuf = tcp_session.tx_buffer_size
+            self.rcvbuf = tcp_session.rx_buffer_size
 
         # Fresh socket initialization
         else:
@@ -75,6 +78,9 @@ class TcpSocket:
             self.local_port = None
             self.remote_ip_address = None
             self.remote_port = None
+            self.congestion_control = stack.tcp_congestion_control  # Congestion control algorithm used by sessions this socket creates
+            self.sndbuf = stack.tcp_sndbuf  # Send buffer size (SO_SNDBUF) of sessions this socket creates
+            self.rcvbuf = stack.tcp_rcvbuf  # Receive buffer size (SO_RCVBUF) of sessions this socket creates
 
         self.event_tcp_session_established = threading.Semaphore(0)
 
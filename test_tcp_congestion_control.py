@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# test_tcp_congestion_control.py - test checking congestion window and slow start threshold transitions of TCP congestion control algorithms
+#
+
+
+import sys
+
+import pytest
+
+import tcp_congestion_control
+from tcp_congestion_control import TcpCongestionControl, TcpCubic, TcpNewReno
+
+MSS = 1460
+
+
+class Clock:
+    """ Replacement of time module letting test control the time CUBIC sees """
+
+    def __init__(self):
+        """ Class constructor """
+
+        self.now = 1000.0
+
+    def monotonic(self):
+        """ Current time (s) """
+
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ Make CUBIC use test controlled clock """
+
+    clock = Clock()
+    monkeypatch.setattr(tcp_congestion_control, "time", clock)
+    return clock
+
+
+def test_incomplete_algorithm():
+    """ Algorithm missing any of the hooks can't be instantiated """
+
+    class TcpIncomplete(TcpCongestionControl):
+        def on_ack(self, acked, rtt=None):
+            pass
+
+    with pytest.raises(TypeError):
+        TcpIncomplete(MSS)
+
+
+@pytest.mark.parametrize("algorithm", [TcpNewReno, TcpCubic])
+def test_slow_start(algorithm):
+    """ Window starts at RFC 5681 initial window and grows by amount of acked data till it reaches slow start threshold """
+
+    cc = algorithm(MSS)
+    assert cc.cwnd == 3 * MSS and cc.ssthresh == tcp_congestion_control.TCP_CC_SSTHRESH_INIT
+
+    cc.on_ack(MSS)
+    assert cc.cwnd == 4 * MSS
+
+    cc.ssthresh = 5 * MSS
+    cc.on_ack(2 * MSS)
+    assert cc.cwnd == 5 * MSS
+
+
+def test_newreno_congestion_avoidance():
+    """ Window grows by one MSS per window worth of acked data """
+
+    cc = TcpNewReno(MSS)
+    cc.cwnd = cc.ssthresh = 10 * MSS
+
+    for _ in range(9):
+        cc.on_ack(MSS)
+    assert cc.cwnd == 10 * MSS
+
+    cc.on_ack(MSS)
+    assert cc.cwnd == 11 * MSS and cc.bytes_acked == 0
+
+
+def test_newreno_loss():
+    """ Loss halves the data in flight and continues in congestion avoidance """
+
+    cc = TcpNewReno(MSS)
+    cc.cwnd = 20 * MSS
+    cc.bytes_acked = MSS
+
+    cc.on_loss(20 * MSS)
+    assert cc.ssthresh == cc.cwnd == 10 * MSS and cc.bytes_acked == 0
+
+    cc.on_loss(MSS)
+    assert cc.ssthresh == cc.cwnd == 2 * MSS
+
+
+def test_newreno_rto():
+    """ Timeout halves the slow start threshold and restarts slow start from single segment """
+
+    cc = TcpNewReno(MSS)
+    cc.cwnd = 20 * MSS
+
+    cc.on_rto(20 * MSS)
+    assert cc.ssthresh == 10 * MSS and cc.cwnd == MSS
+
+    cc.on_ack(MSS)
+    assert cc.cwnd == 2 * MSS
+
+
+def test_cubic_loss():
+    """ Loss reduces the window by beta factor, repeated loss below previous maximum releases some more of it (fast convergence) """
+
+    cc = TcpCubic(MSS)
+    cc.cwnd = 100 * MSS
+
+    cc.on_loss(100 * MSS)
+    assert cc.w_max == 100 * MSS and cc.ssthresh == cc.cwnd == int(100 * MSS * tcp_congestion_control.CUBIC_BETA)
+
+    cwnd = cc.cwnd
+    cc.on_loss(cwnd)
+    assert cc.w_max == int(cwnd * (1 + tcp_congestion_control.CUBIC_BETA) / 2) and cc.ssthresh == cc.cwnd == int(cwnd * tcp_congestion_control.CUBIC_BETA)
+
+    cc.cwnd = MSS
+    cc.on_loss(MSS)
+    assert cc.ssthresh == cc.cwnd == 2 * MSS
+
+
+def test_cubic_rto():
+    """ Timeout reduces the slow start threshold same as loss and restarts slow start from single segment """
+
+    cc = TcpCubic(MSS)
+    cc.cwnd = 100 * MSS
+
+    cc.on_rto(100 * MSS)
+    assert cc.w_max == 100 * MSS and cc.ssthresh == int(100 * MSS * tcp_congestion_control.CUBIC_BETA) and cc.cwnd == MSS
+
+
+def test_cubic_congestion_avoidance(clock):
+    """ After loss window grows back towards its previous maximum, plateaus around it at time K and then keeps probing above it """
+
+    cc = TcpCubic(MSS)
+    cc.cwnd = 100 * MSS
+    cc.on_loss(100 * MSS)
+    loss_time = clock.now
+
+    def ack_till(seconds, rtt=100):
+        """ Ack whole window every RTT till given time since the loss passes """
+
+        while clock.now - loss_time < seconds:
+            clock.now += rtt / 1000
+            for _ in range(cc.cwnd // MSS):
+                cc.on_ack(MSS, rtt)
+        return cc.cwnd
+
+    # Concave region, window grows but stays below previous maximum
+    assert int(100 * MSS * tcp_congestion_control.CUBIC_BETA) < ack_till(1) < 100 * MSS
+    assert cc.k == pytest.approx(((100 - 100 * tcp_congestion_control.CUBIC_BETA) / tcp_congestion_control.CUBIC_C) ** (1 / 3))
+
+    # Plateau, window reaches previous maximum around time K
+    assert 98 * MSS < ack_till(cc.k) <= 101 * MSS
+
+    # Convex region, window keeps growing above previous maximum
+    assert ack_till(8) > 110 * MSS
+
+
+def test_cubic_growth_limit(clock):
+    """ Window grows by at most 50% per RTT no matter how far the cubic function got """
+
+    cc = TcpCubic(MSS)
+    cc.cwnd = 100 * MSS
+    cc.on_loss(100 * MSS)
+    cc.on_ack(MSS, 100)
+
+    clock.now += 100
+    cwnd = cc.cwnd
+    for _ in range(cwnd // MSS):
+        cc.on_ack(MSS, 100)
+    assert cwnd < cc.cwnd <= 1.5 * cwnd
+
+
+def main():
+    return pytest.main([__file__, "-q"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# test_tcp_window_probe.py - test checking TCP session survives losing replies to its zero window probes
+#
+
+
+import sys
+import threading
+import time
+from ipaddress import IPv4Address
+
+import loguru
+
+import stack
+from flow_cache import FlowCache
+from link_emulator import LinkEmulator
+from stack_timer import StackTimer
+from tcp_socket import TcpSocket
+
+LINK_RATE = 100_000_000  # Link rate (bit/s)
+LINK_RTT = 0.01  # Round trip time of the link without queuing delay (s)
+LINK_QUEUE = 1_000_000  # Drop tail queue of the link (bytes)
+RCVBUF = 20_000  # Receive buffer of the server, small enough for the client to fill it quickly (bytes)
+DATA_LEN = 100_000  # Amount of data client sends (bytes)
+LOSS_TIME = 4  # Time server packets are being lost after it advertised zero window (s)
+
+CLIENT_IP_ADDRESS = IPv4Address("10.0.0.1")
+SERVER_IP_ADDRESS = IPv4Address("10.0.0.2")
+SERVER_PORT = 7
+
+
+class LossyLink(LinkEmulator):
+    """ Link that loses all server packets once server advertised zero window, so none of the client's window probes gets answered """
+
+    def __init__(self):
+        """ Class constructor """
+
+        super().__init__(LINK_RATE, LINK_RTT, LINK_QUEUE)
+        self.lossy = True
+        self.losing = False
+        self.probes = 0
+
+    def phtx_tcp(self, ip_src, ip_dst, tcp_sport, tcp_dport, tcp_flag_syn=False, tcp_flag_ack=False, tcp_win=0, raw_data=b"", **kwargs):
+        """ Take packet sent out by local TCP session, count client's window probes and lose server packets after its zero window ACK """
+
+        if ip_src == SERVER_IP_ADDRESS and self.lossy:
+            if self.losing:
+                return
+            self.losing = tcp_flag_ack and not tcp_flag_syn and tcp_win == 0
+
+        elif ip_src == CLIENT_IP_ADDRESS and self.losing and not raw_data:
+            self.probes += 1
+
+        super().phtx_tcp(
+            ip_src, ip_dst, tcp_sport, tcp_dport, tcp_flag_syn=tcp_flag_syn, tcp_flag_ack=tcp_flag_ack, tcp_win=tcp_win, raw_data=raw_data, **kwargs
+        )
+
+
+def test_window_probe_reply_lost():
+    """ Client keeps probing zero window without breaking its send state or the stack timer, transfer completes once server starts reading """
+
+    errors = []
+    threading.excepthook = lambda args: errors.append(f"{args.thread.name}: {args.exc_value!r}")
+
+    loguru.logger.remove()
+    StackTimer()
+    FlowCache()
+    tcp_rcvbuf, stack.tcp_rcvbuf = stack.tcp_rcvbuf, RCVBUF
+    link = stack.packet_handler = LossyLink()
+
+    try:
+        server_socket = TcpSocket()
+        server_socket.bind(SERVER_IP_ADDRESS, SERVER_PORT)
+        server_socket.listen()
+
+        accepted = []
+        threading.Thread(target=lambda: accepted.append(server_socket.accept()), daemon=True).start()
+
+        client_socket = TcpSocket()
+        client_socket.bind(CLIENT_IP_ADDRESS, 0)
+        assert client_socket.connect(SERVER_IP_ADDRESS, SERVER_PORT)
+        threading.Thread(target=client_socket.send, args=(bytes(DATA_LEN),), daemon=True).start()
+
+        time.sleep(LOSS_TIME)
+
+        assert link.losing, "server never advertised zero window"
+        assert link.probes >= 2, f"client sent {link.probes} window probes"
+        assert not errors, errors
+
+        # Timer thread has to be still alive
+        timer_fired = threading.Event()
+        stack.stack_timer.register_method(method=timer_fired.set, repeat_count=0)
+        assert timer_fired.wait(1), "stack timer thread is dead"
+
+        # Link recovers and server drains its buffer, client has to deliver all of its data
+        link.lossy = link.losing = False
+        received = [0]
+
+        def receiver():
+            while received[0] < DATA_LEN and (data := accepted[0].receive()):
+                received[0] += len(data)
+
+        receiver_thread = threading.Thread(target=receiver, daemon=True)
+        receiver_thread.start()
+        receiver_thread.join(30)
+
+        assert received[0] == DATA_LEN, f"received {received[0]} out of {DATA_LEN} bytes"
+        assert not errors, errors
+
+    finally:
+        link.running = False
+        stack.tcp_sessions.clear()
+        stack.tcp_rcvbuf = tcp_rcvbuf
+
+        # Let the timer thread exit
+        stack.stack_timer.run_stack_timer = False
+        stack.stack_timer.register_method(method=lambda: None)
+        threading.excepthook = threading.__excepthook__
+
+
+def main():
+    test_window_probe_reply_lost()
+    print("Zero window probe with lost replies: OK")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
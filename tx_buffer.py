@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# tx_buffer.py - module contains class used to build outbound packets in single buffer
+#
+
+
+TX_BUFFER_HEADROOM = 160  # Room for Virtio-net (10), Ethernet (14), IP (up to 60) and TCP (up to 60) headers
+
+
+class TxBuffer:
+    """ Buffer outbound packet is built in, payload gets copied in once and each protocol layer prepends its header in place in front of it """
+
+    def __init__(self, data=b"", headroom=TX_BUFFER_HEADROOM):
+        """ Class constructor """
+
+        self.buffer = bytearray(headroom + len(data))
+        self.buffer[headroom:] = data
+        self.start = headroom
+
+    def __len__(self):
+        """ Length of the data already put in buffer """
+
+        return len(self.buffer) - self.start
+
+    @property
+    def data(self):
+        """ Zero copy read only view of the data already put in buffer """
+
+        return memoryview(self.buffer).toreadonly()[self.start :]
+
+    def push(self, length):
+        """ Reserve space for header in front of the data, return offset header should be written at """
+
+        # Reallocate buffer in the unlikely case headroom has been exhausted, views returned earlier keep pointing to the old one
+        if length > self.start:
+            self.buffer = bytearray(TX_BUFFER_HEADROOM + length) + self.buffer[self.start :]
+            self.start = TX_BUFFER_HEADROOM + length
+
+        self.start -= length
+        return self.start
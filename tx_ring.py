@@ -42,58 +42,134 @@
 
 
 import os
+import select
 import threading
 
 import loguru
 
+import ps_vnet
 import stack
+from flow_hash import flow_hash
+from packet_ring import PacketRing
 
 
 class TxRing:
     """ Support for sending packets to the network """
 
-    def __init__(self, tap):
-        """ Initialize access to tap interface and the outbound queue """
+    def __init__(self, taps):
+        """ Initialize access to tap interface queues and the outbound queue of each of them """
 
         stack.tx_ring = self
 
-        self.tap = tap
+        self.taps = taps
 
-        self.tx_ring = []
+        self.tx_queues = [PacketRing(stack.tx_ring_size, stack.tx_ring_urgent_size, stack.tx_ring_overflow_policy) for _ in self.taps]
         self.logger = loguru.logger.bind(object_name="tx_ring.")
 
-        self.packet_enqueued = threading.Semaphore(0)
+        # Counters used to measure TX performance
+        self.stats_frames = [0] * len(self.taps)
+        self.stats_bytes = [0] * len(self.taps)
+        self.stats_flushes = [0] * len(self.taps)
 
-        threading.Thread(target=self.__thread_dequeue).start()
-        self.logger.debug("Started TX ring")
+        for queue_id in range(len(self.taps)):
+            threading.Thread(target=self.__thread_dequeue_batch if stack.tx_ring_batch_mode else self.__thread_dequeue, args=(queue_id,)).start()
+        self.logger.debug(f"Started TX ring, {len(self.taps)} tap queue(s){', batch mode' if stack.tx_ring_batch_mode else ''}")
 
-    def __thread_dequeue(self):
+    def __thread_dequeue(self, queue_id):
         """ Dequeue packet from TX ring """
 
         while True:
             # Wait till packets is avaiable int he queue the pick it up
-            self.packet_enqueued.acquire()
-            ether_packet_tx = self.tx_ring.pop(0)
+            ether_packet_tx = self.tx_queues[queue_id].dequeue()
             self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}")
-            self.__transmit(ether_packet_tx)
+            self.__transmit(queue_id, ether_packet_tx)
 
-    def __transmit(self, ether_packet_tx):
+    def __thread_dequeue_batch(self, queue_id):
+        """ Dequeue all the packets waiting in TX ring and write them out as single batch """
+
+        tap = self.taps[queue_id]
+        tx_queue = self.tx_queues[queue_id]
+
+        while True:
+            ether_packet_tx_batch = tx_queue.dequeue_batch(stack.tx_ring_batch_size, stack.tx_ring_flush_threshold, stack.tx_ring_max_latency)
+
+            # Serialize all the frames first so the write loop below does nothing else but syscalls
+            raw_packets = [self.__get_frame(_) for _ in ether_packet_tx_batch]
+
+            batch_bytes = 0
+            for raw_packet in raw_packets:
+                self.__write(tap, raw_packet)
+                batch_bytes += len(raw_packet)
+
+            self.stats_frames[queue_id] += len(raw_packets)
+            self.stats_bytes[queue_id] += batch_bytes
+            self.stats_flushes[queue_id] += 1
+            self.logger.opt(ansi=True).debug(f"<magenta>[TX]</> Queue {queue_id}, batch of {len(raw_packets)} frames - {batch_bytes} bytes")
+
+    @staticmethod
+    def __get_frame(ether_packet_tx):
+        """ Get frame ready to be written to tap interface, in virtio-net header mode frame needs to be preceded by the header """
+
+        tx_buffer = ether_packet_tx.get_tx_buffer()
+
+        if stack.tap_vnet_hdr:
+            offset = tx_buffer.push(ps_vnet.VNET_HEADER_LEN)
+            if ether_packet_tx.vnet_header:
+                ether_packet_tx.vnet_header.pack_header_into(tx_buffer.buffer, offset)
+            else:
+                tx_buffer.buffer[offset : offset + ps_vnet.VNET_HEADER_LEN] = ps_vnet.VNET_HEADER_NONE
+
+        return tx_buffer.data
+
+    @staticmethod
+    def __write(tap, raw_packet):
+        """ Write single frame to tap interface """
+
+        # Tap interface may be set to non-blocking mode by RX ring, in such case wait till it is able to accept the frame
+        while True:
+            try:
+                os.write(tap, raw_packet)
+                return
+            except BlockingIOError:
+                select.select([], [tap], [])
+
+    def __transmit(self, queue_id, ether_packet_tx):
         """ Transmit packet """
 
-        os.write(self.tap, ether_packet_tx.get_raw_packet())
+        raw_packet = self.__get_frame(ether_packet_tx)
+        self.__write(self.taps[queue_id], raw_packet)
+        self.stats_frames[queue_id] += 1
+        self.stats_bytes[queue_id] += len(raw_packet)
+        self.stats_flushes[queue_id] += 1
+
         self.logger.opt(ansi=True).debug(
             f"<magenta>[TX]</> {ether_packet_tx.tracker}<yellow>{ether_packet_tx.tracker.latency}</> - {len(ether_packet_tx)} bytes"
         )
 
     def enqueue(self, ether_packet_tx, urgent=False):
-        """ Enqueue outbound Ethernet packet to TX ring """
-
-        if urgent:
-            self.tx_ring.insert(0, ether_packet_tx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, priority: Urgent, queue len: {len(self.tx_ring)}")
+        """ Enqueue outbound Ethernet packet to TX ring, with multiple tap queues the queue is picked by flow hash to keep packets of each flow in order """
 
+        if len(self.tx_queues) == 1:
+            tx_queue = self.tx_queues[0]
         else:
-            self.tx_ring.append(ether_packet_tx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, priorty: Normal, queue len: {len(self.tx_ring)}")
+            tx_queue = self.tx_queues[flow_hash(ether_packet_tx.ether_type, ether_packet_tx.raw_data) % len(self.tx_queues)]
+
+        if not tx_queue.enqueue(ether_packet_tx, urgent=urgent):
+            self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, TX ring full, packet dropped, drops: {tx_queue.drops}")
+            return
+
+        self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, priority: {'Urgent' if urgent else 'Normal'}, queue len: {len(tx_queue)}")
+
+    @property
+    def stats(self):
+        """ TX performance counters """
+
+        frames = sum(self.stats_frames)
+        flushes = sum(self.stats_flushes)
 
-        self.packet_enqueued.release()
+        return {
+            "frames": frames,
+            "bytes": sum(self.stats_bytes),
+            "frames_per_flush": frames / flushes if flushes else 0,
+            "drops": [_.drops for _ in self.tx_queues],
+        }
@@ -65,6 +65,10 @@ class UdpSocket:
 
         self.packet_rx = []
         self.packet_rx_ready = threading.Semaphore(0)
+
+        # Pinned flow cache entry of the last peer data was sent to, saves TX path from making flow lookup for every packet
+        self.flow = None
+        self.flow_id = None
         self.logger.debug(f"Opened UDP socket {self.socket_id}")
 
     @property
@@ -79,16 +83,21 @@ class UdpSocket:
         stack.udp_sockets[self.socket_id] = self
         self.logger.debug(f"{self.socket_id} - Socket bound to local address")
 
-    @staticmethod
-    def send_to(packet):
+    def send_to(self, packet):
         """ Put data from UdpMetadata structure into TX ring """
 
+        # Refresh pinned flow if packet goes to different peer or the flow got invalidated by neighbor, address or routing change
+        if not (self.flow and self.flow.valid and self.flow_id == (packet.local_ip_address, packet.remote_ip_address)):
+            self.flow_id = (packet.local_ip_address, packet.remote_ip_address)
+            self.flow = stack.flow_cache.find_flow(*self.flow_id)
+
         stack.packet_handler.phtx_udp(
             ip_src=packet.local_ip_address,
             udp_sport=packet.local_port,
             ip_dst=packet.remote_ip_address,
             udp_dport=packet.remote_port,
             raw_data=packet.raw_data,
+            flow=self.flow,
         )
 
     def receive_from(self, timeout=None):